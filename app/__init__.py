@@ -1,17 +1,13 @@
 # app/__init__.py
-from pathlib import Path
 from flask import Flask
 from typing import Optional, Type
-import logging
-from logging.handlers import RotatingFileHandler
-import os
 from datetime import datetime
-from dotenv import load_dotenv
+import click
 from config import Config
-from .db import db, migrate
-
-# Load environment variables
-load_dotenv()
+from .db import db
+from .cache import cache
+from .pool import configure_pool, watch_engine
+from . import availability, log, metrics, profiling, replicas, search
 
 def create_app(config_class: Optional[Type[Config]] = None) -> Flask:
     """Create and configure the Flask application.
@@ -33,28 +29,24 @@ def create_app(config_class: Optional[Type[Config]] = None) -> Flask:
     app.config.from_object(config_class)
     
     # Initialize extensions
+    configure_pool(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Alembic is slow to import and only `flask db` needs it, so web
+    # workers skip it
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate # type: ignore
+        Migrate(app, db)
+    cache.init_app(app)
+    replicas.init_app(app)
+    availability.init_app(app)
+    search.init_app(app)
     
     # Create required directories
     app.config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
-    Path('logs').mkdir(exist_ok=True)
     
     # Configure logging
-    if not app.debug and not app.testing:
-        file_handler = RotatingFileHandler(
-            'logs/library.log',
-            maxBytes=10240,
-            backupCount=10
-        )
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s '
-            '[in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-        app.logger.setLevel(logging.INFO)
-        app.logger.info('Library Management System startup')
+    log.init_app(app)
+    app.logger.info('Library Management System startup')
     
     # Add template filters
     @app.template_filter('datetime')
@@ -87,23 +79,43 @@ def create_app(config_class: Optional[Type[Config]] = None) -> Flask:
     
     # Register blueprints within app context
     with app.app_context():
-        # Import routes here to avoid circular imports
-        from app.routes import main_routes, book_routes, user_routes, borrow_routes
+        for engine in db.engines.values():
+            watch_engine(engine)
+        metrics.init_app(app, db.engine)
+        for key in replicas.replica_keys():
+            metrics.watch_engine(db.engines[key])
+        profiling.init_app(app, *db.engines.values())
+        
+        # Import models and routes here to avoid circular imports; every
+        # model must be registered before the mappers are configured
+        from app.models import book, user, borrow, circulation, hold
+        from app.routes import (main_routes, book_routes, user_routes, borrow_routes, hold_routes,
+                                export_routes, availability_routes, dashboard)
         
         # Register each blueprint
         app.register_blueprint(main_routes.bp)
         app.register_blueprint(book_routes.bp)
         app.register_blueprint(user_routes.bp)
         app.register_blueprint(borrow_routes.bp)
+        app.register_blueprint(hold_routes.bp)
+        app.register_blueprint(export_routes.bp)
+        app.register_blueprint(availability_routes.bp)
+        app.register_blueprint(dashboard.bp)
         
-        # Create database tables
-        db.create_all()
+        # Register CLI commands
+        import commands
+        app.cli.add_command(commands.init_db_command)
+        app.cli.add_command(commands.add_test_user)
+        app.cli.add_command(commands.refresh_circulation_command)
+        app.cli.add_command(commands.sweep_overdue_command)
+        app.cli.add_command(commands.sweep_holds_command)
+        app.cli.add_command(commands.bulk_return_command)
+        app.cli.add_command(commands.bulk_checkout_command)
+        app.cli.add_command(commands.import_books_command)
+        app.cli.add_command(commands.import_users_command)
+        app.cli.add_command(commands.export_command)
         
         # Log successful blueprint registration
         app.logger.info('Successfully registered all blueprints')
     
     return app
-
-# Import models to ensure they are registered with SQLAlchemy
-# These imports are placed at the bottom to avoid circular dependencies
-from app.models import book, user, borrow
\ No newline at end of file
@@ -0,0 +1,201 @@
+# app/availability.py
+import hashlib
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from .db import db
+from .models.book import Book
+
+# Largest number of ISBNs answered by one lookup
+MAX_BATCH = 1000
+
+# Books changed this long before the newest change seen are fetched again on
+# refresh, covering clock skew between app servers and late commits
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def _key(isbn: str) -> str:
+    return isbn.replace('-', '').replace(' ', '').upper()
+
+
+class AvailabilitySnapshot:
+    """Available and total copies of every book, by ISBN.
+
+    Each book owns a slot in two integer arrays; ISBNs and book ids map to
+    slots, so a lookup is a dict hit and two array reads and nothing is
+    allocated per book beyond its keys. Each app in a worker process keeps
+    its own snapshot in ``app.extensions['availability']``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slots: Dict[str, int] = {}
+        self._by_id: Dict[int, int] = {}
+        self._isbns: List[Optional[str]] = []
+        self._available = array('l')
+        self._quantity = array('l')
+        self._free: List[int] = []
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self.watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _put_locked(self, book_id: int, isbn: str, available: int, quantity: int) -> None:
+        key = _key(isbn)
+        slot = self._by_id.get(book_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._isbns)
+                self._isbns.append(None)
+                self._available.append(0)
+                self._quantity.append(0)
+            self._by_id[book_id] = slot
+        elif self._isbns[slot] != key:
+            self._slots.pop(self._isbns[slot], None)
+        self._isbns[slot] = key
+        self._slots[key] = slot
+        self._available[slot] = available
+        self._quantity[slot] = quantity
+
+    def _apply_locked(self, rows: Iterable) -> None:
+        for row in rows:
+            self._put_locked(row.id, row.isbn, row.available_quantity, row.quantity)
+            if row.updated_at is not None and (self.watermark is None or row.updated_at > self.watermark):
+                self.watermark = row.updated_at
+
+    def load(self, rows: Iterable) -> None:
+        """Replace the snapshot with the given book rows."""
+        with self._lock:
+            self._reset()
+            self._apply_locked(rows)
+            self.loaded = True
+            self.loaded_at = self.refreshed_at = time.monotonic()
+
+    def apply(self, rows: Iterable) -> None:
+        """Insert or overwrite the given book rows."""
+        with self._lock:
+            self._apply_locked(rows)
+
+    def adjust(self, deltas: Dict[int, int]) -> None:
+        """Shift available copies by book id, as a committed write did."""
+        with self._lock:
+            for book_id, delta in deltas.items():
+                slot = self._by_id.get(book_id)
+                if slot is not None:
+                    self._available[slot] += delta
+
+    def discard(self, book_id: int) -> None:
+        with self._lock:
+            slot = self._by_id.pop(book_id, None)
+            if slot is not None:
+                self._slots.pop(self._isbns[slot], None)
+                self._isbns[slot] = None
+                self._free.append(slot)
+
+    def lookup(self, isbns: Iterable[str]) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+        """Counts for the given ISBNs.
+
+        Returns:
+            (available, quantity) per known ISBN, as given, and the unknown ISBNs
+        """
+        found: Dict[str, Tuple[int, int]] = {}
+        unknown: List[str] = []
+        with self._lock:
+            for isbn in isbns:
+                slot = self._slots.get(_key(isbn))
+                if slot is None:
+                    unknown.append(isbn)
+                else:
+                    found[isbn] = (self._available[slot], self._quantity[slot])
+        return found, unknown
+
+
+def init_app(app) -> None:
+    """Give the app its own snapshot, loaded lazily on first lookup."""
+    app.extensions['availability'] = AvailabilitySnapshot()
+
+
+def _snapshot() -> AvailabilitySnapshot:
+    return current_app.extensions['availability']
+
+
+def _book_rows(since: Optional[datetime] = None):
+    query = db.session.query(
+        Book.id, Book.isbn, Book.available_quantity, Book.quantity, Book.updated_at
+    )
+    if since is not None:
+        query = query.filter(Book.updated_at >= since - REFRESH_OVERLAP)
+    return query.execution_options(yield_per=1000)
+
+
+def _ensure_fresh() -> None:
+    """Load the snapshot on first use and pick up changes made by other workers.
+
+    Changes are found through the indexed ``books.updated_at`` column at most
+    every ``AVAILABILITY_REFRESH_SECONDS``, so polls between refreshes never
+    reach the database; deleted books drop out at the full reload every
+    ``AVAILABILITY_RELOAD_SECONDS``.
+    """
+    config = current_app.config
+    availability = _snapshot()
+    now = time.monotonic()
+    reload_after = config.get('AVAILABILITY_RELOAD_SECONDS', 300)
+    if not availability.loaded or (reload_after and now - availability.loaded_at >= reload_after):
+        availability.load(_book_rows())
+    elif now - availability.refreshed_at >= config.get('AVAILABILITY_REFRESH_SECONDS', 2):
+        availability.apply(_book_rows(availability.watermark))
+        availability.refreshed_at = now
+
+
+def lookup_availability(isbns: List[str]) -> Tuple[Dict[str, Tuple[int, int]], List[str], str]:
+    """Available and total copies for up to MAX_BATCH ISBNs.
+
+    Returns:
+        The counts per known ISBN, the unknown ISBNs and an entity tag that
+        changes only when one of these answers does, whichever worker serves it
+    """
+    _ensure_fresh()
+    found, unknown = _snapshot().lookup(isbns)
+    digest = hashlib.blake2b(digest_size=12)
+    for isbn in isbns:
+        counts = found.get(isbn)
+        digest.update(f'{isbn}={counts[0]}/{counts[1]};'.encode() if counts else f'{isbn}=?;'.encode())
+    return found, unknown, digest.hexdigest()
+
+
+def record_stock_changes(deltas: Dict[int, int]) -> None:
+    """Apply committed changes of available copies, keyed by book id."""
+    availability = _snapshot()
+    if availability.loaded and deltas:
+        availability.adjust(deltas)
+
+
+def refresh_book_availability(book: Book) -> None:
+    """Refresh a book after it was added or edited."""
+    availability = _snapshot()
+    if availability.loaded:
+        availability.apply([book])
+
+
+def discard_book_availability(book_id: int) -> None:
+    availability = _snapshot()
+    if availability.loaded:
+        availability.discard(book_id)
+
+
+def reload_availability() -> None:
+    """Drop the snapshot so the next lookup reloads it, e.g. after a bulk import."""
+    _snapshot().loaded = False
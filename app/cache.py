@@ -0,0 +1,225 @@
+# app/cache.py
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from .replicas import reading_from_replica
+
+_MISSING = object()
+
+
+class NullBackend:
+    """Backend that stores nothing; every lookup is a miss."""
+
+    def get(self, key: str) -> Any:
+        return _MISSING
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LRUBackend:
+    """In-process cache with per-entry TTL and least-recently-used eviction.
+
+    Each worker process has its own copy, so it suits single-process
+    deployments and development.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class FileSystemBackend:
+    """Cache shared by every worker on the host through files in a directory.
+
+    Entries are pickled with their expiry time and written atomically, so
+    concurrent gunicorn workers never read a partially written entry.
+
+    Reading an entry unpickles it, which can run arbitrary code: ``CACHE_DIR``
+    must be writable only by the user the app runs as, never shared with
+    other users or placed in a world-writable directory such as /tmp.
+    """
+
+    # Expired files are pruned every this many writes
+    PRUNE_INTERVAL = 200
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._writes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as handle:
+                expires_at, value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return _MISSING
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return _MISSING
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                pickle.dump((expires_at, value), handle, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._writes += 1
+        if self._writes % self.PRUNE_INTERVAL == 0:
+            self._prune()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for path in self.directory.iterdir():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _prune(self) -> None:
+        now = time.time()
+        for path in self.directory.iterdir():
+            if path.name.startswith('.tmp'):
+                continue
+            try:
+                with open(path, 'rb') as handle:
+                    expires_at, _ = pickle.load(handle)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+            if expires_at is not None and expires_at <= now:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+BACKENDS = ('null', 'lru', 'filesystem')
+
+
+class Cache:
+    """Data cache with TTLs and tag-based invalidation.
+
+    Cached values are grouped under tags such as ``'books'``. Every tag has a
+    generation token stored in the backend itself and mixed into the keys, so
+    ``invalidate('books')`` retires all entries for that tag at once, in every
+    worker sharing the backend. Values computed by requests reading from a
+    replica are stored under separate keys.
+
+    Configured through ``CACHE_TYPE`` (null, lru or filesystem),
+    ``CACHE_DEFAULT_TTL``, ``CACHE_MAX_ENTRIES`` and ``CACHE_DIR``.
+    """
+
+    def __init__(self) -> None:
+        self.backend = NullBackend()
+        self.default_ttl: float = 60
+
+    def init_app(self, app) -> None:
+        cache_type = app.config.get('CACHE_TYPE', 'lru')
+        if cache_type not in BACKENDS:
+            raise ValueError(f"Unknown CACHE_TYPE {cache_type!r}, expected one of {BACKENDS}")
+
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        if cache_type == 'lru':
+            self.backend = LRUBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        elif cache_type == 'filesystem':
+            self.backend = FileSystemBackend(Path(app.config.get('CACHE_DIR', 'cache')))
+        else:
+            self.backend = NullBackend()
+        app.extensions['cache'] = self
+
+    def _generation(self, tag: str) -> str:
+        generation = self.backend.get(f'tag:{tag}')
+        if generation is _MISSING:
+            generation = uuid.uuid4().hex
+            self.backend.set(f'tag:{tag}', generation)
+        return generation
+
+    def _key(self, name: str, tags: Iterable[str]) -> str:
+        generations = ','.join(f'{tag}={self._generation(tag)}' for tag in sorted(tags))
+        # A lagging replica can produce a value older than the current
+        # generation; keep those apart, so readers of the primary (including
+        # clients that just wrote) only ever get values read from it
+        source = '|replica' if reading_from_replica() else ''
+        return f'{name}|{generations}{source}'
+
+    def get_or_set(self, name: str, producer: Callable[[], Any],
+                   tags: Iterable[str] = (), ttl: Optional[float] = None) -> Any:
+        """Return the cached value for ``name``, computing and storing it on a miss."""
+        key = self._key(name, tags)
+        value = self.backend.get(key)
+        if value is _MISSING:
+            value = producer()
+            self.backend.set(key, value, ttl if ttl is not None else self.default_ttl)
+        return value
+
+    def invalidate(self, *tags: str) -> None:
+        """Retire every cached value stored under any of ``tags``."""
+        for tag in tags:
+            self.backend.set(f'tag:{tag}', uuid.uuid4().hex)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+cache = Cache()
@@ -1,6 +1,29 @@
 # app/db.py
 from flask_sqlalchemy import SQLAlchemy # type: ignore
-from flask_migrate import Migrate # type: ignore
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from .replicas import RoutingSession
 
-db = SQLAlchemy()
-migrate = Migrate()
\ No newline at end of file
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+class CurrentTimestampOnUpdate(FunctionElement):
+    """Server default of ``updated_at`` columns.
+
+    MySQL also refreshes the value on every UPDATE; other databases, such as
+    the SQLite files used for local benchmarks, get a plain CURRENT_TIMESTAMP
+    and rely on the column's ORM ``onupdate``.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(CurrentTimestampOnUpdate)
+def _compile_current_timestamp(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(CurrentTimestampOnUpdate, 'mysql')
+def _compile_current_timestamp_mysql(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'
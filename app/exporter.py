@@ -0,0 +1,121 @@
+# app/exporter.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from .db import db
+from .models.book import Book
+from .models.user import User
+from .models.borrow import BorrowRecord
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+FORMATS = ('csv', 'ndjson')
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORTS = {
+    'books': (
+        Book.id, Book.isbn, Book.title, Book.author, Book.publisher,
+        Book.publication_year, Book.quantity, Book.available_quantity,
+        Book.created_at, Book.updated_at
+    ),
+    'users': (
+        User.id, User.user_type, User.first_name, User.last_name,
+        User.email, User.phone, User.created_at, User.updated_at
+    ),
+    'borrow_records': (
+        BorrowRecord.id, BorrowRecord.book_id, Book.isbn.label('book_isbn'),
+        BorrowRecord.user_id, User.email.label('user_email'), BorrowRecord.borrow_date,
+        BorrowRecord.due_date, BorrowRecord.return_date, BorrowRecord.status
+    ),
+}
+
+
+def _value(value: Any) -> Any:
+    """Make a column value JSON and CSV friendly."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export_rows(name: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+    """Stream the rows of an exportable table.
+
+    Rows are read through a server-side cursor in batches of
+    EXPORT_BATCH_SIZE, so memory use stays flat however large the table is.
+
+    Args:
+        name: One of the EXPORTS keys
+        since: For borrow_records, only loans borrowed at or after this time
+        until: For borrow_records, only loans borrowed before this time
+
+    Returns:
+        Tuple of the column names and an iterator over the rows
+
+    Raises:
+        KeyError: If ``name`` is not exportable
+    """
+    columns = EXPORTS[name]
+    statement = select(*columns)
+    if name == 'borrow_records':
+        statement = statement.join(Book, BorrowRecord.book_id == Book.id) \
+                             .join(User, BorrowRecord.user_id == User.id)
+        if since is not None:
+            statement = statement.where(BorrowRecord.borrow_date >= since)
+        if until is not None:
+            statement = statement.where(BorrowRecord.borrow_date < until)
+    statement = statement.order_by(columns[0])
+
+    header = list(statement.selected_columns.keys())
+    result = db.session.execute(
+        statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    )
+    return header, (tuple(_value(value) for value in row) for row in result)
+
+
+def iter_csv(header: List[str], rows: Iterator[Sequence[Any]]) -> Iterator[str]:
+    """Encode rows as CSV, one chunk per EXPORT_BATCH_SIZE rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(header: List[str], rows: Iterator[Sequence[Any]]) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON objects, chunked like iter_csv."""
+    chunk: List[str] = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(header, row)), default=str))
+        if len(chunk) == EXPORT_BATCH_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def iter_export(name: str, fmt: str = 'csv', since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> Iterator[str]:
+    """Encoded chunks of an export in the given format ('csv' or 'ndjson')."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}, expected one of {FORMATS}")
+    header, rows = export_rows(name, since, until)
+    encode = iter_csv if fmt == 'csv' else iter_ndjson
+    return encode(header, rows)
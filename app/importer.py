@@ -0,0 +1,291 @@
+# app/importer.py
+import csv
+import io
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from email_validator import validate_email, EmailNotValidError
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql, sqlite
+from werkzeug.utils import secure_filename
+
+from .db import db
+from .models.book import Book
+from .models.user import User, UserType, BORROW_LIMITS
+
+# Rows validated and written per INSERT batch
+IMPORT_BATCH_SIZE = 1000
+
+# Only the first rejected rows are kept in the report
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ('csv', 'ndjson')
+
+# Columns refreshed when an imported row matches an existing one. Stock is
+# deliberately left alone for books: copies may be out on loan, so quantity
+# changes go through the edit form, which checks them.
+BOOK_UPDATE_COLUMNS = ('title', 'author', 'publisher', 'publication_year')
+# The borrow limit follows the user type, so it is refreshed along with it.
+USER_UPDATE_COLUMNS = ('first_name', 'last_name', 'phone', 'user_type', 'max_borrow_limit')
+
+
+@dataclass
+class ImportReport:
+    """Outcome of an import run."""
+    processed: int = 0
+    written: int = 0
+    rejected: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self) -> str:
+        return (f'{self.processed} rows in {self.elapsed:.2f}s '
+                f'({self.rows_per_second:.0f} rows/s): '
+                f'{self.written} imported, {self.rejected} rejected')
+
+
+def detect_format(filename: str) -> str:
+    """Guess the import format from a file name."""
+    lowered = (filename or '').lower()
+    if lowered.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+@contextmanager
+def saved_upload(upload, folder: Path) -> Iterator[Path]:
+    """Spool an uploaded file to the upload folder and remove it afterwards."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{uuid.uuid4().hex}-{secure_filename(upload.filename or 'import')}"
+    upload.save(path)
+    try:
+        yield path
+    finally:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (line number, record) pairs from a binary CSV or NDJSON stream.
+
+    The stream is decoded incrementally, so memory use does not depend on
+    the size of the file.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format {fmt!r}, expected one of {FORMATS}")
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = {'__error__': f'Invalid JSON: {e.msg}'}
+        if not isinstance(record, dict):
+            record = {'__error__': f'Expected a JSON object, got {type(record).__name__}'}
+        yield line_number, record
+
+
+def normalize_isbn(value: Any) -> str:
+    """Strip separators from an ISBN and verify its check digit.
+
+    Raises:
+        ValueError: If the value is not a valid ISBN-10 or ISBN-13
+    """
+    isbn = str(value or '').replace('-', '').replace(' ', '').upper()
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        total = sum((10 - i) * int(digit) for i, digit in enumerate(isbn[:9]))
+        check = 10 if isbn[9] == 'X' else int(isbn[9])
+        if (total + check) % 11 == 0:
+            return isbn
+    elif len(isbn) == 13 and isbn.isdigit():
+        total = sum((1 if i % 2 == 0 else 3) * int(digit) for i, digit in enumerate(isbn[:12]))
+        if (10 - total % 10) % 10 == int(isbn[12]):
+            return isbn
+    raise ValueError(f'Invalid ISBN {value!r}')
+
+
+def _text(record: Dict[str, Any], key: str, required: bool = True,
+          column=None) -> Optional[str]:
+    value = record.get(key)
+    value = str(value).strip() if value is not None else ''
+    if required and not value:
+        raise ValueError(f'Missing {key}')
+    # Checked here so one long value is rejected alone instead of failing its batch
+    max_length = getattr(getattr(column, 'type', None), 'length', None)
+    if max_length and len(value) > max_length:
+        raise ValueError(f'{key} is longer than {max_length} characters')
+    return value or None
+
+
+def _integer(record: Dict[str, Any], key: str, default: int) -> int:
+    value = record.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    # Same rules for CSV text and NDJSON numbers: 3.5, "3.5" and true are
+    # rejected rather than truncated
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{key} must be a whole number, got {value!r}')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{key} must be a whole number, got {value!r}') from None
+
+
+def book_row(record: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Validate an imported book record and turn it into a row for the books table."""
+    quantity = _integer(record, 'quantity', default=1)
+    if quantity < 1:
+        raise ValueError('Quantity must be at least 1')
+    publication_year = _integer(record, 'publication_year', default=0)
+    if not 0 < publication_year <= now.year:
+        raise ValueError(f"Invalid publication year {record.get('publication_year')!r}")
+    isbn = normalize_isbn(record.get('isbn'))
+    if len(isbn) > Book.isbn.type.length:
+        raise ValueError(f'isbn is longer than {Book.isbn.type.length} characters')
+    return {
+        'isbn': isbn,
+        'title': _text(record, 'title', column=Book.title),
+        'author': _text(record, 'author', column=Book.author),
+        'publisher': _text(record, 'publisher', required=False, column=Book.publisher),
+        'publication_year': publication_year,
+        'quantity': quantity,
+        'available_quantity': quantity,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def user_row(record: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Validate an imported user record and turn it into a row for the users table."""
+    email = _text(record, 'email', column=User.email)
+    # No DNS lookups here; one per row would dominate the import time
+    validate_email(email, check_deliverability=False)
+    user_type = UserType(_text(record, 'user_type').upper())
+    return {
+        'email': email,
+        'first_name': _text(record, 'first_name', column=User.first_name),
+        'last_name': _text(record, 'last_name', column=User.last_name),
+        'phone': _text(record, 'phone', required=False, column=User.phone),
+        'user_type': user_type,
+        'max_borrow_limit': BORROW_LIMITS[user_type],
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def _upsert(model, rows: List[Dict[str, Any]], key: str,
+            update_columns: Tuple[str, ...]) -> None:
+    """Insert a batch with executemany, updating rows whose unique key already exists."""
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        statement = mysql.insert(model)
+        statement = statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in update_columns + ('updated_at',)}
+        )
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(model)
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: statement.excluded[column] for column in update_columns + ('updated_at',)}
+        )
+    else:
+        statement = insert(model)
+    db.session.execute(statement, rows)
+
+
+def _run_import(records: Iterator[Tuple[int, Dict[str, Any]]], model,
+                to_row: Callable[[Dict[str, Any], datetime], Dict[str, Any]],
+                key: str, update_columns: Tuple[str, ...],
+                batch_size: int) -> ImportReport:
+    report = ImportReport()
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    batch: Dict[Any, Dict[str, Any]] = {}
+
+    def flush() -> None:
+        if not batch:
+            return
+        try:
+            _upsert(model, list(batch.values()), key, update_columns)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        report.written += len(batch)
+        batch.clear()
+
+    for line, record in records:
+        report.processed += 1
+        if '__error__' in record:
+            report.reject(line, record['__error__'])
+            continue
+        try:
+            row = to_row(record, now)
+        except (ValueError, TypeError, EmailNotValidError) as e:
+            report.reject(line, str(e))
+            continue
+        # A key repeated within one batch keeps its last occurrence
+        batch[row[key]] = row
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def import_books(stream: IO[bytes], fmt: str = 'csv',
+                 batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Import books from a CSV or NDJSON stream.
+
+    Expected fields are isbn, title, author, publisher, publication_year and
+    quantity. Rows are validated and upserted on ISBN in batches, each batch
+    in its own transaction; invalid rows are reported and skipped.
+
+    Args:
+        stream: Binary file object to read from
+        fmt: 'csv' or 'ndjson'
+        batch_size: Rows per INSERT batch
+
+    Returns:
+        ImportReport with counts, rejected rows and throughput
+    """
+    return _run_import(iter_records(stream, fmt), Book, book_row, 'isbn',
+                       BOOK_UPDATE_COLUMNS, batch_size)
+
+
+def import_users(stream: IO[bytes], fmt: str = 'csv',
+                 batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Import users from a CSV or NDJSON stream.
+
+    Expected fields are email, first_name, last_name, phone and user_type.
+    Rows are upserted on email, otherwise as import_books.
+    """
+    return _run_import(iter_records(stream, fmt), User, user_row, 'email',
+                       USER_UPDATE_COLUMNS, batch_size)
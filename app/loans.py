@@ -0,0 +1,674 @@
+# app/loans.py
+import functools
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import OperationalError
+
+from .availability import record_stock_changes
+from .db import db
+from .metrics import CHECKOUTS, RETURNS, LATE_FEES, HOLD_EVENTS
+from .models.book import Book
+from .models.user import User
+from .models.borrow import BorrowRecord, BorrowStatus, ACTIVE_STATUSES
+from .models.hold import Hold, HoldStatus, OPEN_HOLD_STATUSES, HOLD_PRIORITIES
+
+# MySQL error codes worth retrying: deadlock found, lock wait timeout
+RETRYABLE_ERRORS = (1213, 1205)
+MAX_ATTEMPTS = 3
+
+# How long a returned copy is kept aside for the hold it was given to
+HOLD_PICKUP_PERIOD = timedelta(days=3)
+
+
+class LoanError(Exception):
+    """A checkout or return that cannot be carried out; the message is user-facing."""
+
+
+class BookUnavailableError(LoanError):
+    pass
+
+
+class BorrowLimitError(LoanError):
+    pass
+
+
+class AlreadyReturnedError(LoanError):
+    pass
+
+
+class HoldError(LoanError):
+    pass
+
+
+class StockError(LoanError):
+    pass
+
+
+def _is_retryable(error: OperationalError) -> bool:
+    args = getattr(error.orig, 'args', None) or (None,)
+    return args[0] in RETRYABLE_ERRORS
+
+
+def retry_on_deadlock(func):
+    """Re-run a transaction that lost a deadlock or lock wait, with jittered backoff."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt == MAX_ATTEMPTS or not _is_retryable(e):
+                    raise
+                time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+    return wrapper
+
+
+def late_fee(due_date: datetime, return_date: datetime, fee_per_day: float) -> float:
+    """Fee for returning after the due date; zero when on time."""
+    if return_date <= due_date:
+        return 0.0
+    return (return_date - due_date).days * fee_per_day
+
+
+@retry_on_deadlock
+def checkout(book_id: int, user_id: int, duration: timedelta) -> BorrowRecord:
+    """Lend one copy of a book to a user.
+
+    The copy is taken with a conditional UPDATE, so two desks can never hand
+    out the last copy twice. Only the borrowing user's row is locked, which
+    keeps concurrent checkouts of the same book by different users from
+    serialising on anything but the single book row update. A copy kept
+    aside for the user's ready hold is lent instead of one from the shelf,
+    and a hold the user is still waiting on is closed, so no later copy is
+    readied for a book they already have.
+
+    Raises:
+        LookupError: If the user does not exist
+        BorrowLimitError: If the user already has the maximum number of loans
+        BookUnavailableError: If the book does not exist or has no copy left
+    """
+    try:
+        user = db.session.query(User).filter(User.id == user_id).with_for_update().one_or_none()
+        if user is None:
+            raise LookupError(f'User {user_id} not found')
+
+        limit = user.max_borrow_limit
+        if user.active_borrows_count >= limit:
+            raise BorrowLimitError(f'User has reached the maximum limit of {limit} active borrows.')
+
+        now = datetime.utcnow()
+        hold = db.session.query(Hold).filter(
+            Hold.user_id == user_id, Hold.book_id == book_id,
+            Hold.status.in_(OPEN_HOLD_STATUSES)
+        ).with_for_update().one_or_none()
+        from_hold = hold is not None and hold.status == HoldStatus.READY
+        if not from_hold:
+            taken = db.session.execute(
+                update(Book)
+                .where(Book.id == book_id, Book.available_quantity > 0)
+                .values(available_quantity=Book.available_quantity - 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if taken != 1:
+                raise BookUnavailableError('This book is not available for borrowing.')
+
+        if hold is not None:
+            hold.status = HoldStatus.FULFILLED
+            hold.closed_at = now
+
+        borrow = BorrowRecord(
+            book_id=book_id,
+            user_id=user_id,
+            borrow_date=now,
+            due_date=now + duration,
+            status=BorrowStatus.BORROWED
+        )
+        db.session.add(borrow)
+        db.session.commit()
+        CHECKOUTS.inc(mode='single')
+        if hold is not None:
+            HOLD_EVENTS.inc(event='fulfilled')
+        if not from_hold:
+            record_stock_changes({book_id: -1})
+        return borrow
+    except (LoanError, LookupError):
+        db.session.rollback()
+        raise
+
+
+@retry_on_deadlock
+def return_loan(borrow_id: int, fee_per_day: float = 1.00,
+                return_date: Optional[datetime] = None,
+                hold_pickup: timedelta = HOLD_PICKUP_PERIOD
+                ) -> Tuple[BorrowRecord, float, Optional[Hold]]:
+    """Close a loan and pass the copy to the next hold or back to the shelf.
+
+    The status change is a conditional UPDATE as well, so a double-submitted
+    return cannot put two copies back. Handing the copy to the head of the
+    book's hold queue is one index seek and one update, however long the
+    queue is.
+
+    Returns:
+        The returned borrow record, the late fee owed and the hold the copy
+        was set aside for, if any
+
+    Raises:
+        LookupError: If the borrow record does not exist
+        AlreadyReturnedError: If the loan was already closed
+    """
+    try:
+        borrow = db.session.get(BorrowRecord, borrow_id)
+        if borrow is None:
+            raise LookupError(f'Borrow record {borrow_id} not found')
+
+        return_date = return_date or datetime.utcnow()
+        closed = db.session.execute(
+            update(BorrowRecord)
+            .where(BorrowRecord.id == borrow_id,
+                   BorrowRecord.status.in_(ACTIVE_STATUSES))
+            .values(status=BorrowStatus.RETURNED, return_date=return_date)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if closed != 1:
+            raise AlreadyReturnedError('This book has already been returned.')
+
+        shelf, readied = _pass_on_copies({borrow.book_id: 1}, return_date, hold_pickup)
+        fee = late_fee(borrow.due_date, return_date, fee_per_day)
+        db.session.commit()
+        RETURNS.inc(mode='single')
+        LATE_FEES.inc(fee)
+        HOLD_EVENTS.inc(len(readied), event='ready')
+        record_stock_changes(shelf)
+        return borrow, fee, readied[0] if readied else None
+    except (LoanError, LookupError):
+        db.session.rollback()
+        raise
+
+
+def _grouped_stock_update(deltas: Dict[int, int], sign: int) -> None:
+    """Apply per-book quantity changes with one UPDATE per distinct amount.
+
+    In a batch most books move by the same amount (usually one copy), so this
+    is a handful of ``UPDATE ... WHERE id IN (...)`` statements rather than
+    one statement per book.
+    """
+    by_amount: Dict[int, List[int]] = defaultdict(list)
+    for book_id, amount in deltas.items():
+        by_amount[amount].append(book_id)
+
+    for amount, book_ids in by_amount.items():
+        statement = update(Book).where(Book.id.in_(book_ids))
+        if sign < 0:
+            # Guard against overselling even though the rows are locked
+            statement = statement.where(Book.available_quantity >= amount)
+        changed = db.session.execute(
+            statement
+            .values(available_quantity=Book.available_quantity + sign * amount)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if changed != len(book_ids):
+            raise RuntimeError('Book stock changed during a batch update')
+
+
+def _ready_next_holds(book_id: int, copies: int, now: datetime,
+                      pickup: timedelta) -> List[Hold]:
+    """Give ``copies`` returned copies of a book to the head of its hold queue.
+
+    The head is found by seeking the composite queue index, so the cost does
+    not depend on the queue's length.
+
+    Returns:
+        The holds moved to READY, at most ``copies`` of them
+    """
+    holds = db.session.query(Hold).filter(
+        Hold.book_id == book_id, Hold.status == HoldStatus.WAITING
+    ).order_by(*Hold.queue_order()).limit(copies).with_for_update().all()
+    for hold in holds:
+        hold.status = HoldStatus.READY
+        hold.ready_at = now
+        hold.expires_at = now + pickup
+    return holds
+
+
+def _pass_on_copies(copies: Dict[int, int], now: datetime,
+                    pickup: timedelta) -> Tuple[Dict[int, int], List[Hold]]:
+    """Hand copies coming back to the books' waiting holds, the rest to the shelf.
+
+    Every copy added to the stock goes through here, so none can reach the
+    shelf while someone is queued for it. The books are locked first:
+    place_hold checks the shelf under the same lock, so a new hold is
+    either queued before the copies arrive or finds them on the shelf. One
+    query finds the books that have a queue at all; only those are seeked
+    individually.
+
+    Returns:
+        The copies per book put back on the shelf, and the holds readied
+    """
+    if not copies:
+        return {}, []
+    db.session.query(Book.id).filter(Book.id.in_(copies)).order_by(Book.id).with_for_update().all()
+    queued = {book_id for (book_id,) in db.session.query(Hold.book_id).filter(
+        Hold.book_id.in_(copies), Hold.status == HoldStatus.WAITING
+    ).distinct()}
+
+    shelf = dict(copies)
+    readied: List[Hold] = []
+    for book_id in sorted(queued):
+        holds = _ready_next_holds(book_id, copies[book_id], now, pickup)
+        readied.extend(holds)
+        shelf[book_id] -= len(holds)
+    shelf = {book_id: count for book_id, count in shelf.items() if count}
+    if shelf:
+        _grouped_stock_update(shelf, sign=1)
+    return shelf, readied
+
+
+@retry_on_deadlock
+def bulk_return(borrow_ids: Iterable[int], fee_per_day: float = 1.00,
+                return_date: Optional[datetime] = None,
+                hold_pickup: timedelta = HOLD_PICKUP_PERIOD) -> List[Dict[str, Any]]:
+    """Return many loans in one transaction.
+
+    The records are loaded and locked with one query and closed with one
+    UPDATE. Copies go to waiting holds first; the rest are put back with
+    grouped UPDATEs on books.
+
+    Returns:
+        One result per requested id, in request order, with its status
+        ('returned', 'already_returned' or 'not_found'), late fee and, when
+        the copy was set aside for a hold, that hold's id
+    """
+    borrow_ids = list(dict.fromkeys(borrow_ids))
+    return_date = return_date or datetime.utcnow()
+    readied: List[Hold] = []
+    shelf: Dict[int, int] = {}
+    try:
+        rows = db.session.query(
+            BorrowRecord.id, BorrowRecord.book_id, BorrowRecord.due_date, BorrowRecord.status
+        ).filter(BorrowRecord.id.in_(borrow_ids)).with_for_update().all() if borrow_ids else []
+        found = {row.id: row for row in rows}
+
+        results = []
+        closing = []
+        copies_back: Dict[int, int] = defaultdict(int)
+        for borrow_id in borrow_ids:
+            row = found.get(borrow_id)
+            if row is None:
+                results.append({'borrow_id': borrow_id, 'status': 'not_found', 'late_fee': 0.0})
+            elif row.status not in ACTIVE_STATUSES:
+                results.append({'borrow_id': borrow_id, 'status': 'already_returned', 'late_fee': 0.0})
+            else:
+                closing.append(borrow_id)
+                copies_back[row.book_id] += 1
+                results.append({
+                    'borrow_id': borrow_id,
+                    'book_id': row.book_id,
+                    'status': 'returned',
+                    'late_fee': late_fee(row.due_date, return_date, fee_per_day)
+                })
+
+        if closing:
+            db.session.execute(
+                update(BorrowRecord)
+                .where(BorrowRecord.id.in_(closing))
+                .values(status=BorrowStatus.RETURNED, return_date=return_date)
+                .execution_options(synchronize_session=False)
+            )
+            shelf, readied = _pass_on_copies(copies_back, return_date, hold_pickup)
+
+            holds_by_book: Dict[int, List[Hold]] = defaultdict(list)
+            for hold in readied:
+                holds_by_book[hold.book_id].append(hold)
+            for result in results:
+                if result['status'] == 'returned' and holds_by_book.get(result['book_id']):
+                    result['hold_id'] = holds_by_book[result['book_id']].pop(0).id
+        db.session.commit()
+        RETURNS.inc(len(closing), mode='bulk')
+        LATE_FEES.inc(sum(result['late_fee'] for result in results))
+        HOLD_EVENTS.inc(len(readied), event='ready')
+        record_stock_changes(shelf)
+        return results
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+@retry_on_deadlock
+def bulk_checkout(items: Iterable[Dict[str, Any]], duration: timedelta) -> List[Dict[str, Any]]:
+    """Lend many books in one transaction.
+
+    Each item names a user (``user_id``) and a book by ``book_id`` or
+    ``isbn``. Users and books are loaded and locked with one query each, in
+    the same order as checkout() to avoid deadlocks, and the stock is taken
+    with grouped UPDATEs. Copies kept aside for a user's ready hold are lent
+    without touching the shelf; holds still waiting are closed by a shelf
+    copy. Items that cannot be served are reported,
+    not raised.
+
+    Returns:
+        One result per item, in request order, with its status ('borrowed',
+        'book_not_found', 'user_not_found', 'unavailable' or 'limit_reached')
+    """
+    items = list(items)
+    book_ids = {item['book_id'] for item in items if item.get('book_id') is not None}
+    isbns = {item['isbn'] for item in items if item.get('book_id') is None and item.get('isbn')}
+    user_ids = {item['user_id'] for item in items if item.get('user_id') is not None}
+
+    try:
+        users = {user.id: user for user in
+                 db.session.query(User).filter(User.id.in_(user_ids)).with_for_update()} if user_ids else {}
+        active = dict(
+            db.session.query(BorrowRecord.user_id, func.count(BorrowRecord.id))
+            .filter(BorrowRecord.user_id.in_(user_ids),
+                    BorrowRecord.status.in_(ACTIVE_STATUSES))
+            .group_by(BorrowRecord.user_id)
+        ) if user_ids else {}
+
+        book_rows = db.session.query(
+            Book.id, Book.isbn, Book.available_quantity
+        ).filter(or_(Book.id.in_(book_ids), Book.isbn.in_(isbns))).with_for_update().all() \
+            if (book_ids or isbns) else []
+        stock = {row.id: row.available_quantity for row in book_rows}
+        by_isbn = {row.isbn: row.id for row in book_rows}
+        open_holds = {(hold.user_id, hold.book_id): hold for hold in db.session.query(Hold).filter(
+            Hold.user_id.in_(user_ids), Hold.book_id.in_(stock), Hold.status.in_(OPEN_HOLD_STATUSES)
+        ).with_for_update()} if (user_ids and stock) else {}
+
+        now = datetime.utcnow()
+        results = []
+        taken: Dict[int, int] = defaultdict(int)
+        fulfilled: List[Hold] = []
+        new_records = []
+        for item in items:
+            book_id = item.get('book_id')
+            if book_id is None:
+                book_id = by_isbn.get(item.get('isbn'))
+            user = users.get(item.get('user_id'))
+            hold = open_holds.get((item.get('user_id'), book_id))
+            from_hold = hold is not None and hold.status == HoldStatus.READY
+            result = {'user_id': item.get('user_id'), 'book_id': book_id, 'isbn': item.get('isbn')}
+
+            if book_id not in stock:
+                result['status'] = 'book_not_found'
+            elif user is None:
+                result['status'] = 'user_not_found'
+            elif not from_hold and stock[book_id] - taken[book_id] <= 0:
+                result['status'] = 'unavailable'
+            elif active.get(user.id, 0) >= user.max_borrow_limit:
+                result['status'] = 'limit_reached'
+            else:
+                if hold is not None:
+                    del open_holds[(user.id, book_id)]
+                    hold.status = HoldStatus.FULFILLED
+                    hold.closed_at = now
+                    fulfilled.append(hold)
+                if not from_hold:
+                    taken[book_id] += 1
+                active[user.id] = active.get(user.id, 0) + 1
+                new_records.append(BorrowRecord(
+                    book_id=book_id, user_id=user.id, borrow_date=now,
+                    due_date=now + duration, status=BorrowStatus.BORROWED
+                ))
+                result['status'] = 'borrowed'
+                result['due_date'] = (now + duration).isoformat()
+            results.append(result)
+
+        if new_records:
+            if taken:
+                _grouped_stock_update(taken, sign=-1)
+            db.session.add_all(new_records)
+            db.session.flush()
+            records = iter(new_records)
+            for result in results:
+                if result['status'] == 'borrowed':
+                    result['borrow_id'] = next(records).id
+        db.session.commit()
+        CHECKOUTS.inc(len(new_records), mode='bulk')
+        HOLD_EVENTS.inc(len(fulfilled), event='fulfilled')
+        record_stock_changes({book_id: -count for book_id, count in taken.items()})
+        return results
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+@retry_on_deadlock
+def update_stock(book_id: int, quantity: int, hold_pickup: timedelta = HOLD_PICKUP_PERIOD,
+                 **details: Any) -> List[Hold]:
+    """Change the number of copies of a book, and optionally its other columns.
+
+    Copies added go to the book's waiting holds first, like returned ones.
+    Removed copies must come off the shelf: the change is one conditional
+    UPDATE that refuses to leave fewer copies than are out on loan or kept
+    aside for holds. The total changes as well, so callers refresh the
+    availability snapshot from the book afterwards.
+
+    Args:
+        book_id: Book to change
+        quantity: New total number of copies
+        hold_pickup: How long a copy passed to a hold is kept aside
+        details: Other Book columns to set in the same transaction
+
+    Returns:
+        The holds readied with the added copies
+
+    Raises:
+        LookupError: If the book does not exist
+        StockError: If fewer copies than are out would remain
+    """
+    try:
+        book = db.session.query(Book.quantity, Book.available_quantity).filter(
+            Book.id == book_id
+        ).with_for_update().one_or_none()
+        if book is None:
+            raise LookupError(f'Book {book_id} not found')
+
+        added = quantity - book.quantity
+        changed = db.session.execute(
+            update(Book)
+            .where(Book.id == book_id,
+                   Book.quantity - Book.available_quantity <= quantity)
+            # Added copies reach the shelf through _pass_on_copies below
+            .values(quantity=quantity,
+                    available_quantity=Book.available_quantity + min(added, 0),
+                    **details)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not changed:
+            min_quantity = book.quantity - book.available_quantity
+            raise StockError(f'Quantity cannot be less than {min_quantity} (currently borrowed copies).')
+
+        _, readied = _pass_on_copies({book_id: added} if added > 0 else {},
+                                     datetime.utcnow(), hold_pickup)
+        db.session.commit()
+        HOLD_EVENTS.inc(len(readied), event='ready')
+        return readied
+    except (LoanError, LookupError):
+        db.session.rollback()
+        raise
+
+
+@retry_on_deadlock
+def place_hold(book_id: int, user_id: int) -> Hold:
+    """Queue a user for a book that has no copy on the shelf.
+
+    Raises:
+        LookupError: If the book or user does not exist
+        HoldError: If a copy is available, the user already has the book on
+            loan or already holds it
+    """
+    try:
+        user = db.session.query(User).filter(User.id == user_id).with_for_update().one_or_none()
+        if user is None:
+            raise LookupError(f'User {user_id} not found')
+        # Locked like the copies coming back in _pass_on_copies, so a copy
+        # returned meanwhile is either seen here or readied for this hold
+        book = db.session.query(Book).filter(Book.id == book_id).with_for_update().one_or_none()
+        if book is None:
+            raise LookupError(f'Book {book_id} not found')
+        if book.available_quantity > 0:
+            raise HoldError('A copy of this book is available; check it out instead.')
+
+        on_loan = db.session.query(BorrowRecord.id).filter(
+            BorrowRecord.user_id == user_id, BorrowRecord.book_id == book_id,
+            BorrowRecord.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if on_loan is not None:
+            raise HoldError('User already has this book on loan.')
+        existing = db.session.query(Hold.id).filter(
+            Hold.user_id == user_id, Hold.book_id == book_id,
+            Hold.status.in_(OPEN_HOLD_STATUSES)
+        ).first()
+        if existing is not None:
+            raise HoldError('User already has a hold on this book.')
+
+        hold = Hold(book_id=book_id, user_id=user_id, status=HoldStatus.WAITING,
+                    priority=HOLD_PRIORITIES[user.user_type], requested_at=datetime.utcnow())
+        db.session.add(hold)
+        db.session.commit()
+        HOLD_EVENTS.inc(event='placed')
+        return hold
+    except (LoanError, LookupError):
+        db.session.rollback()
+        raise
+
+
+@retry_on_deadlock
+def cancel_hold(hold_id: int, hold_pickup: timedelta = HOLD_PICKUP_PERIOD) -> Tuple[Hold, Optional[Hold]]:
+    """Withdraw a hold; a copy kept aside for it goes to the next in line.
+
+    Returns:
+        The cancelled hold and the hold its copy was passed to, if any
+
+    Raises:
+        LookupError: If the hold does not exist
+        HoldError: If the hold was already fulfilled, cancelled or expired
+    """
+    try:
+        hold = db.session.query(Hold).filter(Hold.id == hold_id).with_for_update().one_or_none()
+        if hold is None:
+            raise LookupError(f'Hold {hold_id} not found')
+        if hold.status not in OPEN_HOLD_STATUSES:
+            raise HoldError('This hold is no longer active.')
+
+        now = datetime.utcnow()
+        had_copy = hold.status == HoldStatus.READY
+        hold.status = HoldStatus.CANCELLED
+        hold.closed_at = now
+
+        shelf, readied = _pass_on_copies({hold.book_id: 1} if had_copy else {}, now, hold_pickup)
+        db.session.commit()
+        HOLD_EVENTS.inc(event='cancelled')
+        HOLD_EVENTS.inc(len(readied), event='ready')
+        record_stock_changes(shelf)
+        return hold, readied[0] if readied else None
+    except (LoanError, LookupError):
+        db.session.rollback()
+        raise
+
+
+def cancel_user_holds(user_id: int, now: datetime,
+                      hold_pickup: timedelta = HOLD_PICKUP_PERIOD) -> Tuple[int, Dict[int, int], List[Hold]]:
+    """Cancel every open hold of a user, passing kept-aside copies on.
+
+    Runs in the caller's transaction and does not commit, so the holds can
+    be closed together with whatever made them obsolete.
+
+    Returns:
+        Number of holds cancelled, the copies per book put back on the
+        shelf and the holds readied in their place
+    """
+    holds = db.session.query(Hold).filter(
+        Hold.user_id == user_id, Hold.status.in_(OPEN_HOLD_STATUSES)
+    ).with_for_update().all()
+    copies: Dict[int, int] = defaultdict(int)
+    for hold in holds:
+        if hold.status == HoldStatus.READY:
+            copies[hold.book_id] += 1
+        hold.status = HoldStatus.CANCELLED
+        hold.closed_at = now
+    shelf, readied = _pass_on_copies(copies, now, hold_pickup)
+    return len(holds), shelf, readied
+
+
+@retry_on_deadlock
+def remove_user(user_id: int, hold_pickup: timedelta = HOLD_PICKUP_PERIOD) -> None:
+    """Delete a user with no active loans, cancelling their holds in the same transaction.
+
+    The user row is locked like at checkout, so no loan can start meanwhile.
+
+    Raises:
+        LookupError: If the user does not exist
+        LoanError: If the user still has books on loan
+    """
+    try:
+        user = db.session.query(User).filter(User.id == user_id).with_for_update().one_or_none()
+        if user is None:
+            raise LookupError(f'User {user_id} not found')
+        if user.active_borrows_count:
+            raise LoanError('Cannot delete user while they have active borrows.')
+
+        cancelled, shelf, readied = cancel_user_holds(user_id, datetime.utcnow(), hold_pickup)
+        db.session.delete(user)
+        db.session.commit()
+        HOLD_EVENTS.inc(cancelled, event='cancelled')
+        HOLD_EVENTS.inc(len(readied), event='ready')
+        record_stock_changes(shelf)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+@retry_on_deadlock
+def expire_holds(now: Optional[datetime] = None,
+                 hold_pickup: timedelta = HOLD_PICKUP_PERIOD) -> Tuple[int, int]:
+    """Expire ready holds that were not picked up in time.
+
+    Their copies move on to the next holds in line; copies nobody is waiting
+    for go back on the shelf.
+
+    Returns:
+        Number of holds expired and number of holds readied in their place
+    """
+    now = now or datetime.utcnow()
+    try:
+        expired = db.session.query(Hold).filter(
+            Hold.status == HoldStatus.READY, Hold.expires_at < now
+        ).with_for_update().all()
+        copies: Dict[int, int] = defaultdict(int)
+        for hold in expired:
+            hold.status = HoldStatus.EXPIRED
+            hold.closed_at = now
+            copies[hold.book_id] += 1
+
+        shelf, readied = _pass_on_copies(copies, now, hold_pickup)
+        db.session.commit()
+        HOLD_EVENTS.inc(len(expired), event='expired')
+        HOLD_EVENTS.inc(len(readied), event='ready')
+        record_stock_changes(shelf)
+        return len(expired), len(readied)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def queue_position(hold: Hold) -> int:
+    """1-based place of a waiting hold in its book's queue.
+
+    Counts the holds ahead of it with a range over the queue index.
+    """
+    ahead = db.session.query(func.count(Hold.id)).filter(
+        Hold.book_id == hold.book_id,
+        Hold.status == HoldStatus.WAITING,
+        or_(Hold.priority < hold.priority,
+            and_(Hold.priority == hold.priority, Hold.requested_at < hold.requested_at),
+            and_(Hold.priority == hold.priority, Hold.requested_at == hold.requested_at,
+                 Hold.id < hold.id))
+    ).scalar()
+    return ahead + 1
@@ -0,0 +1,206 @@
+# app/log.py
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+# Fields of a LogRecord that are not worth repeating in the JSON output
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+# Upper bound on buffered records; beyond it new records are dropped rather
+# than blocking the request thread
+QUEUE_SIZE = 10000
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach request id, route, method and user id to records logged in a request.
+
+    Runs in the logging thread of the caller, so the request context is
+    still available before the record is handed to the queue.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.route = request.endpoint
+            record.method = request.method
+            record.path = request.path
+            user_id = g.get('user_id')
+            if user_id is not None:
+                record.user_id = user_id
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, carrying any ``extra`` fields of the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never waits on a full queue and keeps records structured.
+
+    The stock handler formats the message into ``record.msg`` with the
+    handler's formatter; here only the arguments are merged, and a traceback
+    is rendered to text, so the listener-side formatter still sees fields.
+
+    The queue and the QueueListener draining it into ``handlers`` belong to
+    one process and are started by the first record it logs. A worker forked
+    from a preloaded app (``gunicorn --preload``) inherits neither the
+    listener thread nor a usable queue, so it starts its own.
+    """
+
+    def __init__(self, *handlers: logging.Handler) -> None:
+        super().__init__(queue.Queue(QUEUE_SIZE))
+        self.handlers = handlers
+        self.listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Inherited from the parent: its locks may have been held by
+                # the parent's listener thread at fork time
+                self.queue = queue.Queue(QUEUE_SIZE)
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self._pid = pid
+
+    def stop_listener(self) -> None:
+        """Flush and stop this process's listener, if it started one."""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+        self._pid = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def _stop_listener() -> None:
+    global _queue_handler
+    if _queue_handler is not None:
+        _queue_handler.stop_listener()
+        _queue_handler = None
+
+
+def _file_handler(app) -> logging.Handler:
+    path = Path(app.config.get('LOG_FILE', 'logs/library.log'))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=app.config.get('LOG_BACKUP_COUNT', 10),
+        encoding='utf-8'
+    )
+    if app.config.get('LOG_FORMAT', 'json') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+        ))
+    return handler
+
+
+def _start_file_logging(app) -> None:
+    global _queue_handler
+    _stop_listener()
+
+    queue_handler = NonBlockingQueueHandler(_file_handler(app))
+    queue_handler.addFilter(RequestContextFilter())
+
+    # The queue replaces Flask's synchronous stderr handler
+    for handler in list(app.logger.handlers):
+        if isinstance(handler, QueueHandler) or handler is default_handler:
+            app.logger.removeHandler(handler)
+    app.logger.addHandler(queue_handler)
+    app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+
+    _queue_handler = queue_handler
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
+
+
+def init_app(app) -> None:
+    """Structured request logging, written to file off the request path.
+
+    Request threads only enqueue records; formatting and file I/O, including
+    rotation, happen on a QueueListener thread that each process starts when
+    it first logs, so the app may be preloaded before workers fork. File
+    logging is on outside debug and testing unless ``LOG_TO_FILE`` says
+    otherwise.
+
+    Each request gets an id (taken from an incoming ``X-Request-ID`` header
+    when present), which is echoed in the response and attached to every
+    record, and a summary line with status and latency is logged when it
+    completes.
+    """
+    if app.config.get('LOG_TO_FILE', not (app.debug or app.testing)):
+        _start_file_logging(app)
+
+    access_log = app.logger.getChild('access')
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        started = g.get('log_started')
+        if started is not None and access_log.isEnabledFor(logging.INFO):
+            access_log.info('%s %s %s', request.method, request.path, response.status_code,
+                            extra={'status': response.status_code,
+                                   'latency_ms': round((time.perf_counter() - started) * 1000, 2)})
+        return response
@@ -0,0 +1,279 @@
+# app/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+from .pool import pool_status
+
+# Latency buckets in seconds, from a cache hit up to a pathological page
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for metrics kept in memory by each worker process."""
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}'
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed buckets."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Per bucket counts, then +Inf, then the running sum
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_format_number(state[-1])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Gauge(Metric):
+    """Values read from a callback when metrics are scraped.
+
+    Also used for counters kept elsewhere, such as the pool statistics,
+    by passing ``kind='counter'``.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+                 kind: str = 'gauge') -> None:
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.collect():
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}'
+
+
+class Registry:
+    """Ordered collection of metrics rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'library_http_request_duration_seconds', 'Request latency per endpoint.',
+    ('endpoint', 'method', 'status')))
+REQUEST_QUERIES = registry.register(Histogram(
+    'library_http_request_queries', 'SQL statements executed per request.',
+    ('endpoint',), buckets=QUERY_COUNT_BUCKETS))
+REQUEST_QUERY_TIME = registry.register(Histogram(
+    'library_http_request_query_seconds', 'Time spent in SQL per request.', ('endpoint',)))
+TEMPLATE_RENDER = registry.register(Histogram(
+    'library_template_render_seconds', 'Template render time.', ('template',)))
+CHECKOUTS = registry.register(Counter(
+    'library_checkouts_total', 'Copies lent out.', ('mode',)))
+RETURNS = registry.register(Counter(
+    'library_returns_total', 'Loans returned.', ('mode',)))
+LATE_FEES = registry.register(Counter(
+    'library_late_fees_total', 'Late fees charged on returns.'))
+OVERDUE_MARKED = registry.register(Counter(
+    'library_overdue_marked_total', 'Loans flagged overdue by the sweep.'))
+HOLD_EVENTS = registry.register(Counter(
+    'library_hold_events_total', 'Holds placed, readied, fulfilled, cancelled or expired.',
+    ('event',)))
+QUERY_ERRORS = registry.register(Counter(
+    'library_db_query_errors_total', 'SQL statements the database rejected, by error.',
+    ('error',)))
+
+
+def _endpoint() -> str:
+    return request.endpoint or 'unmatched'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _finish_query(conn) -> None:
+    stack = conn.info.get('query_started')
+    if not stack:
+        return
+    started = stack.pop()
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_seconds += time.perf_counter() - started
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_query(conn)
+
+
+def _handle_error(context):
+    # A failed statement skips after_cursor_execute; its start time must
+    # still come off the stack, or the next statement would be timed from it
+    if context.connection is not None and context.statement is not None:
+        _finish_query(context.connection)
+        QUERY_ERRORS.inc(error=type(context.original_exception).__name__)
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+
+def _after_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = _endpoint()
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint,
+                                method=request.method, status=str(response.status_code))
+        REQUEST_QUERIES.observe(g.get('sql_queries', 0), endpoint=endpoint)
+        REQUEST_QUERY_TIME.observe(g.get('sql_seconds', 0.0), endpoint=endpoint)
+    return response
+
+
+def _before_render(sender, template, context, **extra):
+    g.setdefault('render_started', []).append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    stack = g.get('render_started')
+    if stack:
+        TEMPLATE_RENDER.observe(time.perf_counter() - stack.pop(),
+                                template=template.name or 'string')
+
+
+def watch_engine(engine) -> None:
+    """Time every statement executed through ``engine`` and count the failed ones."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+
+def _register_pool_metrics(engine) -> None:
+    def connections():
+        status = pool_status(engine)
+        for state in ('checked_out', 'checked_in', 'overflow'):
+            if state in status:
+                yield (state,), status[state]
+
+    def counter(key):
+        return lambda: [((), pool_status(engine).get(key, 0))]
+
+    registry.register(Gauge('library_db_pool_connections',
+                            'Pooled database connections by state.', ('state',), connections))
+    registry.register(Gauge('library_db_pool_checkouts_total',
+                            'Connections handed out by the pool.', (), counter('checkouts'),
+                            kind='counter'))
+    registry.register(Gauge('library_db_pool_wait_seconds_total',
+                            'Time spent waiting for a pooled connection.', (),
+                            counter('wait_seconds_total'), kind='counter'))
+    registry.register(Gauge('library_db_pool_timeouts_total',
+                            'Connection requests that timed out.', (), counter('timeouts'),
+                            kind='counter'))
+
+
+def init_app(app, engine: Optional[object] = None) -> None:
+    """Record request, SQL and template timings for ``app``.
+
+    Metrics live in the worker process; with several gunicorn workers each
+    scrape sees the worker that answered it, so scrape every worker or run
+    the metrics endpoint in a single-worker deployment.
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    if engine is not None:
+        watch_engine(engine)
+        _register_pool_metrics(engine)
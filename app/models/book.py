@@ -1,8 +1,21 @@
 from datetime import datetime
-from ..db import db
+from ..db import db, CurrentTimestampOnUpdate
 
 class Book(db.Model):
     __tablename__ = 'books'
+    __table_args__ = (
+        # Backs keyset pagination of the catalogue on (title, id)
+        db.Index('ix_books_title_id', 'title', 'id'),
+        # Catalogue author filter and low-stock/availability filters
+        db.Index('ix_books_author', 'author'),
+        db.Index('ix_books_available_quantity', 'available_quantity'),
+        # Books changed since the availability snapshot was last refreshed
+        db.Index('ix_books_updated_at', 'updated_at'),
+        # Full-text search over the catalogue; other databases use the
+        # in-process index in app.search instead
+        db.Index('ft_books_search', 'title', 'author', 'publisher',
+                 mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     isbn = db.Column(db.String(13), unique=True, nullable=False)
@@ -20,7 +33,7 @@ class Book(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False,
                           default=datetime.utcnow,
                           onupdate=datetime.utcnow,
-                          server_default=db.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+                          server_default=CurrentTimestampOnUpdate())
 
     # Relationships
     borrow_records = db.relationship(
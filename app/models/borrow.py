@@ -1,21 +1,31 @@
 from datetime import datetime
 from enum import Enum
 from ..db import db
+from ..metrics import OVERDUE_MARKED
 
 class BorrowStatus(Enum):
     BORROWED = 'BORROWED'
     RETURNED = 'RETURNED'
     OVERDUE = 'OVERDUE'
 
+# Loans that still hold a copy; OVERDUE is set by the overdue sweep
+ACTIVE_STATUSES = (BorrowStatus.BORROWED, BorrowStatus.OVERDUE)
+
 class BorrowRecord(db.Model):
     __tablename__ = 'borrow_records'
+    __table_args__ = (
+        # Overdue sweep and status filters: status equality, due_date range
+        db.Index('ix_borrow_records_status_due_date', 'status', 'due_date'),
+        # Active loans per user
+        db.Index('ix_borrow_records_user_id_status', 'user_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    borrow_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    borrow_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     due_date = db.Column(db.DateTime, nullable=False)
-    return_date = db.Column(db.DateTime)
+    return_date = db.Column(db.DateTime, index=True)
     status = db.Column(db.Enum(BorrowStatus), nullable=False, default=BorrowStatus.BORROWED)
 
     # Relationships
@@ -26,13 +36,52 @@ class BorrowRecord(db.Model):
         return f"<BorrowRecord {self.id}>"
 
     def is_overdue(self):
+        if self.status == BorrowStatus.OVERDUE:
+            return True
         if self.status == BorrowStatus.BORROWED:
             return datetime.utcnow() > self.due_date
         return False
 
+    @property
+    def current_status(self):
+        """Status including loans that are past due but not swept yet."""
+        if self.is_overdue():
+            return BorrowStatus.OVERDUE
+        return self.status
+
+    @classmethod
+    def status_criteria(cls, status, now=None):
+        """SQL criterion matching records whose current_status is ``status``."""
+        now = now or datetime.utcnow()
+        if status == BorrowStatus.OVERDUE:
+            return db.or_(
+                cls.status == BorrowStatus.OVERDUE,
+                db.and_(cls.status == BorrowStatus.BORROWED, cls.due_date < now)
+            )
+        if status == BorrowStatus.BORROWED:
+            return db.and_(cls.status == BorrowStatus.BORROWED, cls.due_date >= now)
+        return cls.status == status
+
+    @classmethod
+    def mark_overdue(cls, now=None):
+        """Flag every past-due loan as OVERDUE with a single UPDATE.
+
+        Returns:
+            Number of records updated
+        """
+        now = now or datetime.utcnow()
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.status == BorrowStatus.BORROWED, cls.due_date < now)
+            .values(status=BorrowStatus.OVERDUE)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        OVERDUE_MARKED.inc(result.rowcount)
+        return result.rowcount
+
     def return_book(self):
         if self.status != BorrowStatus.RETURNED:
-            self.status = BorrowStatus.RETURNED
-            self.return_date = datetime.utcnow()
-            self.book.available_quantity += 1
-            db.session.commit()
\ No newline at end of file
+            # Conditional updates keep concurrent returns from double-counting
+            from ..loans import return_loan
+            return_loan(self.id)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from datetime import datetime
+from ..db import db
+from .user import UserType
+
+class CirculationDaily(db.Model):
+    """Daily circulation rollup per user type and book.
+
+    Past days never change, so reports read these pre-aggregated rows and only
+    scan raw borrow records for days the rollup has not covered yet. Rows are
+    maintained by the ``refresh-circulation`` CLI command.
+    """
+
+    __tablename__ = 'circulation_daily'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'user_type', 'book_id', name='uq_circulation_daily_key'),
+        db.Index('ix_circulation_daily_book_id', 'book_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    user_type = db.Column(db.Enum(UserType), nullable=False)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
+    borrows = db.Column(db.Integer, nullable=False, default=0)
+    returns = db.Column(db.Integer, nullable=False, default=0)
+    overdues = db.Column(db.Integer, nullable=False, default=0)
+    late_fees = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CirculationDaily {self.day} {self.user_type.value} book={self.book_id}>"
@@ -0,0 +1,65 @@
+from datetime import datetime
+from enum import Enum
+from ..db import db
+from .user import UserType
+
+class HoldStatus(Enum):
+    WAITING = 'WAITING'
+    READY = 'READY'
+    FULFILLED = 'FULFILLED'
+    CANCELLED = 'CANCELLED'
+    EXPIRED = 'EXPIRED'
+
+# Holds still in the queue or keeping a copy aside
+OPEN_HOLD_STATUSES = (HoldStatus.WAITING, HoldStatus.READY)
+
+# Lower goes first; within a priority holds are served in request order
+HOLD_PRIORITIES = {
+    UserType.FACULTY: 0,
+    UserType.STAFF: 1,
+    UserType.STUDENT: 1,
+}
+
+class Hold(db.Model):
+    """A user's place in the queue for a book with no copy on the shelf.
+
+    The queue of a book is its WAITING holds ordered by (priority,
+    requested_at, id); the composite index below makes finding the next in
+    line a single index seek however deep the queue is. A returned copy
+    moves the next hold to READY and is kept aside until it is checked out
+    or ``expires_at`` passes.
+    """
+    __tablename__ = 'holds'
+    __table_args__ = (
+        # Next in line: book_id and status equality, then the queue order
+        db.Index('ix_holds_book_id_status_priority_requested_at',
+                 'book_id', 'status', 'priority', 'requested_at', 'id'),
+        # A user's holds, and the ready hold looked up at checkout
+        db.Index('ix_holds_user_id_status', 'user_id', 'status'),
+        # Pickup expiry sweep
+        db.Index('ix_holds_status_expires_at', 'status', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.Enum(HoldStatus), nullable=False, default=HoldStatus.WAITING)
+    # Fixed when the hold is placed, so a later change of user type does
+    # not reorder a queue
+    priority = db.Column(db.SmallInteger, nullable=False)
+    requested_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ready_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    closed_at = db.Column(db.DateTime)
+
+    # Relationships
+    book = db.relationship('Book')
+    user = db.relationship('User')
+
+    def __repr__(self):
+        return f"<Hold {self.id}: Book {self.book_id} for User {self.user_id} ({self.status.value})>"
+
+    @classmethod
+    def queue_order(cls):
+        """ORDER BY clause of a book's queue, matching the composite index."""
+        return (cls.priority, cls.requested_at, cls.id)
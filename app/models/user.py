@@ -1,7 +1,8 @@
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import func, inspect, select
 from sqlalchemy.ext.hybrid import hybrid_property
-from ..db import db
+from ..db import db, CurrentTimestampOnUpdate
 
 class UserType(Enum):
     """Defines the types of users in the library system.
@@ -10,6 +11,13 @@ class UserType(Enum):
     FACULTY = 'FACULTY'
     STAFF = 'STAFF'
 
+# Concurrent loans allowed by default for each type of user
+BORROW_LIMITS = {
+    UserType.STUDENT: 3,
+    UserType.FACULTY: 5,
+    UserType.STAFF: 5,
+}
+
 class User(db.Model):
     """Represents a library user who can borrow books.
     
@@ -17,6 +25,12 @@ class User(db.Model):
     and relationships to track borrowing history."""
     
     __tablename__ = 'users'
+    __table_args__ = (
+        # User list and typeahead order; first-name prefixes; per-type counts
+        db.Index('ix_users_last_name_first_name_id', 'last_name', 'first_name', 'id'),
+        db.Index('ix_users_first_name', 'first_name'),
+        db.Index('ix_users_user_type', 'user_type'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_type = db.Column(db.Enum(UserType), nullable=False)
@@ -31,7 +45,7 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False,
                           default=datetime.utcnow,
                           onupdate=datetime.utcnow,
-                          server_default=db.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
+                          server_default=CurrentTimestampOnUpdate())
     
 
     max_borrow_limit = db.Column(db.Integer, nullable=False, default=3)
@@ -47,26 +61,64 @@ class User(db.Model):
         """Initialize a new user, setting appropriate borrowing limits based on user type."""
         super(User, self).__init__(**kwargs)
 
-        if self.user_type in (UserType.STAFF, UserType.FACULTY):
-            self.max_borrow_limit = 5
+        if 'max_borrow_limit' not in kwargs and self.user_type in BORROW_LIMITS:
+            self.max_borrow_limit = BORROW_LIMITS[self.user_type]
 
-    @hybrid_property
+    @property
     def active_borrows(self):
-        """Returns a list of currently borrowed books that haven't been returned."""
-        from .borrow import BorrowStatus
-        return [record for record in self.borrow_records 
-                if record.status == BorrowStatus.BORROWED]
+        """Returns a list of currently borrowed books that haven't been returned.
 
-    @property
+        Only the active records are fetched, not the whole borrowing history.
+        """
+        from .borrow import BorrowRecord, ACTIVE_STATUSES
+        if 'borrow_records' not in inspect(self).unloaded:
+            return [record for record in self.borrow_records
+                    if record.status in ACTIVE_STATUSES]
+        if self.id is None:
+            return []
+        return BorrowRecord.query.filter(
+            BorrowRecord.user_id == self.id,
+            BorrowRecord.status.in_(ACTIVE_STATUSES)
+        ).all()
+
+    @hybrid_property
     def active_borrows_count(self):
-        """Returns the count of currently borrowed books."""
-        return len(self.active_borrows)
+        """Returns the count of currently borrowed books.
 
-    @property
+        Counted in SQL unless the borrow records are already loaded.
+        """
+        from .borrow import BorrowRecord, ACTIVE_STATUSES
+        if 'borrow_records' not in inspect(self).unloaded:
+            return sum(1 for record in self.borrow_records
+                       if record.status in ACTIVE_STATUSES)
+        if self.id is None:
+            return 0
+        return db.session.query(func.count(BorrowRecord.id)).filter(
+            BorrowRecord.user_id == self.id,
+            BorrowRecord.status.in_(ACTIVE_STATUSES)
+        ).scalar()
+
+    @active_borrows_count.expression
+    def active_borrows_count(cls):
+        """Correlated COUNT subquery, usable in filters and ORDER BY."""
+        from .borrow import BorrowRecord, ACTIVE_STATUSES
+        return (
+            select(func.count(BorrowRecord.id))
+            .where(BorrowRecord.user_id == cls.id,
+                   BorrowRecord.status.in_(ACTIVE_STATUSES))
+            .correlate_except(BorrowRecord)
+            .scalar_subquery()
+        )
+
+    @hybrid_property
     def can_borrow(self):
         """Checks if the user can borrow more books based on their limit."""
         return self.active_borrows_count < self.max_borrow_limit
 
+    @can_borrow.expression
+    def can_borrow(cls):
+        return cls.active_borrows_count < cls.max_borrow_limit
+
     @property
     def full_name(self):
         """Returns the user's full name."""
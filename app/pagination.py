@@ -0,0 +1,115 @@
+# app/pagination.py
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of a row into an opaque, URL-safe cursor string."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """Decode a cursor produced by encode_cursor.
+
+    Returns:
+        The list of sort key values, or None if the cursor is missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+@dataclass
+class KeysetPage:
+    """A single page of keyset-paginated results."""
+    items: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def _seek_condition(columns: Sequence[Any], values: Sequence[Any], forward: bool):
+    """Build the row-value comparison (c1, c2, ...) > (v1, v2, ...) portably.
+
+    Expanded into OR/AND form so it works on both MySQL and SQLite and can
+    still be satisfied with a range scan on a composite index.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        step = column > values[i] if forward else column < values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, columns: Sequence[Any], per_page: int,
+                    after: Optional[str] = None,
+                    before: Optional[str] = None) -> KeysetPage:
+    """Paginate a query by seeking on a unique, ordered tuple of columns.
+
+    Unlike OFFSET pagination the cost of fetching a page does not grow with
+    its position, as long as an index covers ``columns`` in the same order.
+
+    Args:
+        query: Base query, already filtered but not ordered
+        columns: Ordered sort columns; the last one must make the key unique
+        per_page: Maximum number of rows per page
+        after: Cursor of the last row on the previous page (go forward)
+        before: Cursor of the first row on the next page (go backward)
+
+    Returns:
+        KeysetPage with the rows and the cursors for adjacent pages
+    """
+    def key_of(item) -> Tuple[Any, ...]:
+        return tuple(getattr(item, column.key) for column in columns)
+
+    after_values = decode_cursor(after)
+    before_values = decode_cursor(before)
+    if after_values is not None and len(after_values) != len(columns):
+        after_values = None
+    if before_values is not None and len(before_values) != len(columns):
+        before_values = None
+
+    backward = before_values is not None and after_values is None
+
+    if backward:
+        query = query.filter(_seek_condition(columns, before_values, forward=False))
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        if after_values is not None:
+            query = query.filter(_seek_condition(columns, after_values, forward=True))
+        query = query.order_by(*columns)
+
+    # Fetch one extra row to find out whether another page exists
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backward:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after_values is not None
+
+    return KeysetPage(
+        items=rows,
+        next_cursor=encode_cursor(key_of(rows[-1])) if rows and has_next else None,
+        prev_cursor=encode_cursor(key_of(rows[0])) if rows and has_prev else None,
+    )
@@ -0,0 +1,135 @@
+# app/pool.py
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Counters describing how connections are handed out by one pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.checkouts, 6)
+                                    if self.checkouts else 0.0,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that measures how long callers wait for a connection.
+
+    The wait covers queueing for a free connection when the pool is
+    exhausted as well as opening a new one, which is what a request
+    actually pays before its first query.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.increment('timeouts')
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def _uses_queue_pool(uri: str) -> bool:
+    url = make_url(uri)
+    # In-memory SQLite needs a single shared connection, not a queue
+    return not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+
+
+# Engine options only a QueuePool accepts
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def configure_pool(app) -> None:
+    """Install the instrumented pool class; call before ``db.init_app``.
+
+    In-memory SQLite (the usual test database) gets SQLAlchemy's single
+    shared connection instead, without the sizing options it rejects.
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if _uses_queue_pool(app.config['SQLALCHEMY_DATABASE_URI']):
+        options.setdefault('poolclass', TimedQueuePool)
+    else:
+        for key in QUEUE_POOL_OPTIONS:
+            options.pop(key, None)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def watch_engine(engine) -> None:
+    """Count new and invalidated connections on an engine's pool."""
+    stats = getattr(engine.pool, 'stats', None)
+    if stats is None:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment('connects')
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment('invalidations')
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Current occupancy and lifetime counters of an engine's pool.
+
+    Returns:
+        Dictionary with size, checked_out, checked_in and overflow, plus the
+        wait statistics when the pool is a TimedQueuePool
+    """
+    pool = engine.pool
+    status: Dict[str, Any] = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+        })
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,138 @@
+# app/profiling.py
+import cProfile
+import io
+import pstats
+import time
+from typing import Any, List, Tuple
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Longest statement and parameter text written to the log
+MAX_STATEMENT_LENGTH = 2000
+MAX_PARAMETERS_LENGTH = 500
+
+# Functions listed in a request profile, by cumulative time
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def _origin() -> str:
+    """Route a statement was issued from, or 'cli' outside requests."""
+    if has_request_context():
+        return f'{request.method} {request.path} ({request.endpoint or "unmatched"})'
+    return 'cli'
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def _one_line(statement: Any) -> str:
+    return ' '.join(str(statement).split())
+
+
+def _profiling() -> bool:
+    return has_request_context() and 'profile_queries' in g
+
+
+def init_app(app, *engines) -> None:
+    """Log slow statements and enable the per-request profiler.
+
+    Statements slower than ``SLOW_QUERY_THRESHOLD`` seconds are logged with
+    their parameters and originating route (0 disables this), as are
+    statements the database rejected, whatever their duration. When
+    ``PROFILER_ENABLED`` is set, or the app runs in debug mode, a request
+    carrying the ``PROFILER_HEADER`` header is profiled: its query timeline
+    and a cProfile summary are logged and a Server-Timing header is added.
+    Statements are timed on each of ``engines``, the primary and replicas.
+    """
+    threshold = app.config.get('SLOW_QUERY_THRESHOLD', 0.5)
+    header = app.config.get('PROFILER_HEADER', 'X-Profile')
+    slow_log = app.logger.getChild('slow_query')
+    profile_log = app.logger.getChild('profiler')
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+    def finish(conn, statement, parameters, error=None):
+        stack = conn.info.get('profile_started')
+        if not stack:
+            return
+        started = stack.pop()
+        duration = time.perf_counter() - started
+
+        if error is not None:
+            slow_log.warning(
+                'Failed query (%.3fs) from %s: %s; parameters: %s; error: %s',
+                duration, _origin(),
+                _truncate(_one_line(statement), MAX_STATEMENT_LENGTH),
+                _truncate(repr(parameters), MAX_PARAMETERS_LENGTH),
+                _truncate(_one_line(error), MAX_PARAMETERS_LENGTH)
+            )
+        elif threshold and duration >= threshold:
+            slow_log.warning(
+                'Slow query (%.3fs) from %s: %s; parameters: %s',
+                duration, _origin(),
+                _truncate(_one_line(statement), MAX_STATEMENT_LENGTH),
+                _truncate(repr(parameters), MAX_PARAMETERS_LENGTH)
+            )
+        if _profiling():
+            if error is not None:
+                statement = f'FAILED {statement}'
+            g.profile_queries.append((started - g.profile_started, duration, statement))
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        finish(conn, statement, parameters)
+
+    def handle_error(context):
+        # A statement that raised never reaches after_cursor_execute; without
+        # this its start time would be left on the connection and picked up
+        # by the next statement
+        if context.connection is not None and context.statement is not None:
+            finish(context.connection, context.statement, context.parameters,
+                   context.original_exception)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(engine, 'handle_error', handle_error)
+
+    @app.before_request
+    def start_profile():
+        if not (app.debug or app.config.get('PROFILER_ENABLED', False)):
+            return
+        if not request.headers.get(header):
+            return
+        g.profile_started = time.perf_counter()
+        g.profile_queries = []
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        elapsed = time.perf_counter() - g.profile_started
+        queries: List[Tuple[float, float, str]] = g.pop('profile_queries')
+
+        sql_time = sum(duration for _, duration, _ in queries)
+        response.headers['Server-Timing'] = (
+            f'sql;dur={sql_time * 1000:.1f};desc="{len(queries)} queries", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+        profile_log.info('%s', _report(_origin(), elapsed, queries, profiler))
+        return response
+
+
+def _report(origin: str, elapsed: float, queries: List[Tuple[float, float, Any]],
+            profiler: cProfile.Profile) -> str:
+    lines = [f'Profile of {origin}: {elapsed * 1000:.1f} ms, {len(queries)} queries']
+    for offset, duration, statement in queries:
+        lines.append(f'  +{offset * 1000:8.1f} ms {duration * 1000:7.1f} ms  '
+                     f'{_truncate(_one_line(statement), 160)}')
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    lines.append(stream.getvalue())
+    return '\n'.join(lines)
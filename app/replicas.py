@@ -0,0 +1,85 @@
+# app/replicas.py
+import random
+import time
+from typing import Callable, List
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+# SQLALCHEMY_BINDS keys starting with this name read replicas of the primary
+REPLICA_BIND_PREFIX = 'replica'
+
+# Session key holding the time until which a client that wrote reads from
+# the primary
+STICKY_SESSION_KEY = '_primary_until'
+
+
+def replica_keys() -> List[str]:
+    """Bind keys of the configured read replicas."""
+    binds = current_app.config.get('SQLALCHEMY_BINDS') or {}
+    return [key for key in binds if key.startswith(REPLICA_BIND_PREFIX)]
+
+
+def read_replica(view: Callable) -> Callable:
+    """Let a read-only view read from a replica.
+
+    Place it below ``@bp.route``. Only GET and HEAD requests are routed,
+    and only for clients that have not written recently.
+    """
+    view.reads_from_replica = True
+    return view
+
+
+def reading_from_replica() -> bool:
+    """Whether the current request's reads go to a replica."""
+    return has_request_context() and bool(g.get('replica_key')) and not g.get('wrote_primary')
+
+
+def _is_replica_read(clause) -> bool:
+    # Locking reads must see, and lock, the primary's rows
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of replica-routed requests to a replica.
+
+    Everything else goes to the primary: writes and flushes, locking reads,
+    raw SQL, CLI commands and views not marked with ``read_replica``. The
+    first write of a request moves its remaining reads to the primary and
+    keeps the client on the primary for ``DB_REPLICA_STICKY_SECONDS``, so
+    it sees its own changes however far the replicas lag.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.wrote_primary = True
+            elif reading_from_replica() and _is_replica_read(clause):
+                return self._db.engines[g.replica_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _choose_replica() -> None:
+    if request.method not in ('GET', 'HEAD'):
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, 'reads_from_replica', False):
+        return
+    keys = replica_keys()
+    if keys and session.get(STICKY_SESSION_KEY, 0) <= time.time():
+        # One replica per request, so its reads see a single point in time
+        g.replica_key = random.choice(keys)
+
+
+def _stick_to_primary(response):
+    if g.get('wrote_primary') and replica_keys():
+        session[STICKY_SESSION_KEY] = time.time() + current_app.config.get('DB_REPLICA_STICKY_SECONDS', 10)
+    return response
+
+
+def init_app(app) -> None:
+    """Route marked views to the replicas in ``SQLALCHEMY_BINDS``, if any."""
+    app.before_request(_choose_replica)
+    app.after_request(_stick_to_primary)
@@ -0,0 +1,132 @@
+# app/rollup.py
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, insert, or_
+
+from .db import db
+from .models.borrow import BorrowRecord
+from .models.circulation import CirculationDaily
+from .models.user import User
+
+# Rows per INSERT batch when writing the rollup
+INSERT_BATCH_SIZE = 1000
+
+
+def as_date(value) -> date:
+    """Normalise a DATE() result; SQLite returns ISO strings, MySQL dates."""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def day_start(day: date) -> datetime:
+    """Midnight at the start of ``day``."""
+    return datetime.combine(day, datetime.min.time())
+
+
+def rollup_watermark() -> Optional[date]:
+    """Last day covered by the circulation rollup, or None if it is empty."""
+    value = db.session.query(func.max(CirculationDaily.day)).scalar()
+    return as_date(value) if value is not None else None
+
+
+def _grouped_counts(date_column, start: datetime, end: datetime, *criteria):
+    """Count borrow records per (day, user type, book) for ``date_column`` in [start, end)."""
+    day = func.date(date_column)
+    return db.session.query(
+        day, User.user_type, BorrowRecord.book_id, func.count(BorrowRecord.id)
+    ).join(User, BorrowRecord.user_id == User.id).filter(
+        date_column >= start,
+        date_column < end,
+        *criteria
+    ).group_by(day, User.user_type, BorrowRecord.book_id).all()
+
+
+def refresh_circulation(start: Optional[date] = None, end: Optional[date] = None,
+                        fee_per_day: float = 1.00) -> Tuple[date, date, int]:
+    """Recompute the circulation rollup for the days in [start, end).
+
+    By default this continues from the day after the current watermark, so
+    each run only aggregates the raw rows of days not rolled up yet. The
+    current day is never rolled up because it is still changing.
+
+    Args:
+        start: First day to (re)compute; defaults to the day after the watermark
+        end: Day after the last one to compute; capped at today
+        fee_per_day: Late fee charged per day, as used by the return route
+
+    Returns:
+        Tuple of the effective start, end and the number of rollup rows written
+    """
+    today = datetime.utcnow().date()
+    end = min(end or today, today)
+
+    if start is None:
+        watermark = rollup_watermark()
+        if watermark is not None:
+            start = watermark + timedelta(days=1)
+        else:
+            first = db.session.query(func.min(BorrowRecord.borrow_date)).scalar()
+            start = first.date() if first is not None else end
+    if start >= end:
+        return start, end, 0
+
+    range_start, range_end = day_start(start), day_start(end)
+    totals: Dict[tuple, Dict[str, object]] = defaultdict(
+        lambda: {'borrows': 0, 'returns': 0, 'overdues': 0, 'late_fees': Decimal('0.00')}
+    )
+
+    for day, user_type, book_id, count in _grouped_counts(
+            BorrowRecord.borrow_date, range_start, range_end):
+        totals[(as_date(day), user_type, book_id)]['borrows'] = count
+
+    for day, user_type, book_id, count in _grouped_counts(
+            BorrowRecord.return_date, range_start, range_end):
+        totals[(as_date(day), user_type, book_id)]['returns'] = count
+
+    # A loan counts as overdue on its due day if it was not back by then
+    for day, user_type, book_id, count in _grouped_counts(
+            BorrowRecord.due_date, range_start, range_end,
+            or_(BorrowRecord.return_date.is_(None),
+                BorrowRecord.return_date > BorrowRecord.due_date)):
+        totals[(as_date(day), user_type, book_id)]['overdues'] = count
+
+    # Late fees need the day difference, which is computed here for portability
+    late_returns = db.session.query(
+        BorrowRecord.return_date, BorrowRecord.due_date, User.user_type, BorrowRecord.book_id
+    ).join(User, BorrowRecord.user_id == User.id).filter(
+        BorrowRecord.return_date >= range_start,
+        BorrowRecord.return_date < range_end,
+        BorrowRecord.return_date > BorrowRecord.due_date
+    ).execution_options(yield_per=INSERT_BATCH_SIZE)
+    fee = Decimal(str(fee_per_day))
+    for return_date, due_date, user_type, book_id in late_returns:
+        days_late = (return_date - due_date).days
+        totals[(return_date.date(), user_type, book_id)]['late_fees'] += days_late * fee
+
+    refreshed_at = datetime.utcnow()
+    rows = [
+        {'day': day, 'user_type': user_type, 'book_id': book_id,
+         'refreshed_at': refreshed_at, **values}
+        for (day, user_type, book_id), values in totals.items()
+    ]
+
+    try:
+        CirculationDaily.query.filter(
+            CirculationDaily.day >= start,
+            CirculationDaily.day < end
+        ).delete(synchronize_session=False)
+        for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+            db.session.execute(insert(CirculationDaily),
+                               rows[offset:offset + INSERT_BATCH_SIZE])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return start, end, len(rows)
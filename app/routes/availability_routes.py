@@ -0,0 +1,58 @@
+from flask import Blueprint, request, Response, current_app, jsonify
+from typing import List, Tuple, Union
+from app.availability import lookup_availability, MAX_BATCH
+
+bp = Blueprint('availability', __name__, url_prefix='/api/availability')
+
+def _requested_isbns() -> List[str]:
+    """ISBNs from ``?isbn=`` (repeated or comma separated) or a JSON ``{"isbns": [...]}`` body."""
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        isbns = payload.get('isbns')
+        if not isinstance(isbns, list) or not all(isinstance(isbn, str) for isbn in isbns):
+            raise ValueError('isbns must be a list of strings')
+    else:
+        isbns = [isbn for value in request.args.getlist('isbn') for isbn in value.split(',')]
+    return list(dict.fromkeys(isbn.strip() for isbn in isbns if isbn.strip()))
+
+def _conditional(payload: dict, etag: str) -> Response:
+    """Answer 304 when the poller already has this version of the answer."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    # Pollers may keep the answer but must revalidate it every time
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@bp.route('', methods=['GET', 'POST'])
+def lookup() -> Union[Response, Tuple[Response, int]]:
+    """Available and total copies for a batch of ISBNs, for kiosks and the OPAC.
+
+    Answers ``{"availability": {isbn: [available, quantity]}, "unknown": [...]}``
+    from the in-memory snapshot, never the database, with an ETag so
+    unchanged answers cost a 304.
+    """
+    try:
+        isbns = _requested_isbns()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not isbns:
+        return jsonify({'error': 'Pass at least one ISBN'}), 400
+    if len(isbns) > MAX_BATCH:
+        return jsonify({'error': f'At most {MAX_BATCH} ISBNs per request'}), 400
+
+    found, unknown, etag = lookup_availability(isbns)
+    return _conditional({
+        'availability': {isbn: list(counts) for isbn, counts in found.items()},
+        'unknown': unknown
+    }, etag)
+
+@bp.route('/<isbn>')
+def single(isbn: str) -> Union[Response, Tuple[Response, int]]:
+    found, _, etag = lookup_availability([isbn])
+    if isbn not in found:
+        return jsonify({'error': 'Unknown ISBN'}), 404
+    available, quantity = found[isbn]
+    return _conditional({'isbn': isbn, 'available': available, 'quantity': quantity}, etag)
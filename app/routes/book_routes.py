@@ -1,20 +1,109 @@
 # book_routes.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models.book import Book
+from app.cache import cache
+from app.pagination import keyset_paginate
+from app.stats import get_book_stats
+from app.search import search_book_ids, search_books, index_book, unindex_book, reload_book_index
+from app.importer import import_books, detect_format, saved_upload
+from app.availability import refresh_book_availability, discard_book_availability, reload_availability
+from app.replicas import read_replica
+from app.loans import update_stock, StockError, HOLD_PICKUP_PERIOD
 
 bp = Blueprint('books', __name__, url_prefix='/books')
 
+def _catalogue_filters(args):
+    """Translate the catalogue filter query parameters into SQL criteria."""
+    criteria = []
+    author = args.get('author', '').strip()
+    publisher = args.get('publisher', '').strip()
+    year = args.get('year', '').strip()
+    availability = args.get('availability', '').strip()
+
+    # Prefix matches so the filters stay index-friendly
+    if author:
+        criteria.append(Book.author.startswith(author, autoescape=True))
+    if publisher:
+        criteria.append(Book.publisher.startswith(publisher, autoescape=True))
+    if year.isdigit():
+        criteria.append(Book.publication_year == int(year))
+    if availability == 'available':
+        criteria.append(Book.available_quantity > 0)
+    elif availability == 'unavailable':
+        criteria.append(Book.available_quantity <= 0)
+    return criteria
+
+def cached_book_stats():
+    # Collection totals scan the whole books table, and every checkout and
+    # return would retire a 'books'-tagged value; the header counts only
+    # need to be roughly current, so they expire on their TTL alone
+    return cache.get_or_set('books:stats', get_book_stats,
+                            ttl=current_app.config.get('BOOK_STATS_TTL', 300))
+
 @bp.route('/')
+@read_replica
 def list_books():
+    per_page = current_app.config.get('BOOKS_PER_PAGE', 50)
+    search = request.args.get('search', '').strip()
     try:
-        books = Book.query.order_by(Book.title).all()
-        return render_template('books/list.html', books=books)
+        if search:
+            # Ranked search results replace the browsing view
+            return render_template('books/list.html',
+                                 books=search_books(search, limit=per_page),
+                                 page=None,
+                                 stats=cached_book_stats())
+
+        query = Book.query.filter(*_catalogue_filters(request.args))
+        page = keyset_paginate(
+            query,
+            (Book.title, Book.id),
+            per_page,
+            after=request.args.get('after'),
+            before=request.args.get('before')
+        )
+        return render_template('books/list.html',
+                             books=page.items,
+                             page=page,
+                             stats=cached_book_stats())
     except Exception as e:
-        current_app.logger.error(f"Error retrieving books: {str(e)}")
-        return render_template('books/list.html', books=[])
+        current_app.logger.error("Error retrieving books: %s", e)
+        return render_template('books/list.html', books=[], page=None, stats=None)
+
+@bp.route('/search')
+def search():
+    """Typeahead search over title, author, publisher and ISBN as JSON."""
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int) or 10, 50)
+    try:
+        ranked = search_book_ids(query, limit=limit)
+        if not ranked:
+            return jsonify({'results': []})
+
+        rows = db.session.query(
+            Book.id, Book.isbn, Book.title, Book.author, Book.available_quantity
+        ).filter(Book.id.in_([book_id for book_id, _ in ranked])).all()
+        by_id = {row.id: row for row in rows}
+
+        results = []
+        for book_id, score in ranked:
+            row = by_id.get(book_id)
+            if row is None:
+                continue
+            results.append({
+                'id': row.id,
+                'isbn': row.isbn,
+                'title': row.title,
+                'author': row.author,
+                'available_quantity': row.available_quantity,
+                'score': round(score, 3)
+            })
+        return jsonify({'results': results})
+    except Exception as e:
+        current_app.logger.error("Error searching books: %s", e)
+        return jsonify({'results': [], 'error': 'Search is unavailable'}), 500
 
 @bp.route('/add', methods=['GET', 'POST'])
 def add_book():
@@ -32,6 +121,9 @@ def add_book():
             
             db.session.add(book)
             db.session.commit()
+            index_book(book)
+            refresh_book_availability(book)
+            cache.invalidate('books')
             flash('Book added successfully!', 'success')
             return redirect(url_for('books.list_books'))
             
@@ -42,7 +134,7 @@ def add_book():
             flash('Please enter valid numeric values for year and quantity.', 'error')
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error adding book: {str(e)}")
+            current_app.logger.error("Error adding book: %s", e)
             flash('Error adding book. Please try again.', 'error')
     
     return render_template('books/add.html', current_year=datetime.now().year)
@@ -53,34 +145,30 @@ def edit_book(id):
     
     if request.method == 'POST':
         try:
-            # Get the minimum allowed quantity (currently borrowed copies)
-            min_quantity = book.quantity - book.available_quantity
             new_quantity = int(request.form['quantity'])
-            
-            if new_quantity < min_quantity:
-                flash(f'Quantity cannot be less than {min_quantity} (currently borrowed copies).', 'error')
-                return render_template('books/edit.html', book=book, current_year=datetime.now().year)
-            
-            # Update book attributes
-            book.title = request.form['title'].strip()
-            book.author = request.form['author'].strip()
-            book.publisher = request.form.get('publisher', '').strip()
-            book.publication_year = int(request.form['publication_year'])
-            
-            # Update quantity and available_quantity
-            quantity_difference = new_quantity - book.quantity
-            book.quantity = new_quantity
-            book.available_quantity += quantity_difference
-            
-            db.session.commit()
+            publication_year = int(request.form['publication_year'])
+
+            # Added copies go to waiting holds before the shelf
+            pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+            update_stock(book.id, new_quantity, pickup,
+                         title=request.form['title'].strip(),
+                         author=request.form['author'].strip(),
+                         publisher=request.form.get('publisher', '').strip(),
+                         publication_year=publication_year)
+            index_book(book)
+            refresh_book_availability(book)
+            cache.invalidate('books')
             flash('Book updated successfully!', 'success')
             return redirect(url_for('books.list_books'))
             
+        except StockError as e:
+            db.session.refresh(book)
+            flash(str(e), 'error')
         except ValueError:
             flash('Please enter valid numeric values for year and quantity.', 'error')
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error updating book: {str(e)}")
+            current_app.logger.error("Error updating book: %s", e)
             flash('Error updating book. Please try again.', 'error')
     
     return render_template('books/edit.html', book=book, current_year=datetime.now().year)
@@ -96,10 +184,42 @@ def delete_book(id):
     try:
         db.session.delete(book)
         db.session.commit()
+        unindex_book(id)
+        discard_book_availability(id)
+        cache.invalidate('books', 'borrows')
         flash('Book deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error deleting book: {str(e)}")
+        current_app.logger.error("Error deleting book: %s", e)
         flash('Error deleting book. Please try again.', 'error')
     
-    return redirect(url_for('books.list_books'))
\ No newline at end of file
+    return redirect(url_for('books.list_books'))
+
+@bp.route('/import', methods=['GET', 'POST'])
+def import_books_upload():
+    """Bulk import books from an uploaded CSV or NDJSON file."""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            flash('Please choose a file to import.', 'error')
+            return redirect(url_for('books.import_books_upload'))
+        try:
+            with saved_upload(upload, current_app.config['UPLOAD_FOLDER']) as path:
+                with open(path, 'rb') as stream:
+                    report = import_books(stream, detect_format(upload.filename))
+            current_app.logger.info("Book import: %s", report.summary())
+            reload_book_index()
+            reload_availability()
+            cache.invalidate('books')
+            flash(f'Import finished: {report.summary()}.',
+                  'success' if not report.rejected else 'warning')
+            for line, message in report.errors[:10]:
+                flash(f'Line {line}: {message}', 'error')
+            return redirect(url_for('books.list_books'))
+        except Exception as e:
+            current_app.logger.error("Error importing books: %s", e)
+            flash('Error importing books. Please check the file and try again.', 'error')
+
+    return render_template('import.html', title='Import Books',
+                         fields=('isbn', 'title', 'author', 'publisher', 'publication_year', 'quantity'),
+                         cancel_url=url_for('books.list_books'))
@@ -1,25 +1,53 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, current_app
-from typing import Union, List, Optional
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, current_app, jsonify, abort, g
+from typing import Union, List
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 from app import db
 from app.models.book import Book
-from app.models.user import User, UserType  # Added UserType import
+from app.models.user import User
 from app.models.borrow import BorrowRecord, BorrowStatus
+from app.cache import cache
+from app.loans import (checkout, return_loan, bulk_checkout, bulk_return, LoanError,
+                       BookUnavailableError, HOLD_PICKUP_PERIOD)
+from app.pagination import keyset_paginate
+from app.search import search_book_ids, tokenize
+from app.replicas import read_replica
 from config import Config
 
 bp = Blueprint('borrows', __name__, url_prefix='/borrows')
 
+# Bounds for the typeahead lookups used by the borrow form
+LOOKUP_LIMIT = 20
+LOOKUP_MAX_LIMIT = 50
+
+# Largest batch accepted by the bulk endpoints
+BULK_MAX_ITEMS = 1000
+
+def _lookup_limit() -> int:
+    limit = request.args.get('limit', LOOKUP_LIMIT, type=int) or LOOKUP_LIMIT
+    return max(1, min(limit, LOOKUP_MAX_LIMIT))
+
 @bp.route('/')
+@read_replica
 def list_borrows() -> str:
     try:
         status = request.args.get('status')
         user_id = request.args.get('user_id')
         
-        query = BorrowRecord.query
+        # Load the book and user columns the table shows in the same query
+        query = BorrowRecord.query.options(
+            joinedload(BorrowRecord.book).load_only(Book.title, Book.isbn),
+            joinedload(BorrowRecord.user).load_only(
+                User.first_name, User.last_name, User.email
+            )
+        )
         
+        # Past-due loans count as overdue even before the sweep-overdue job
+        # persists it, so this view never has to write
         if status:
-            query = query.filter(BorrowRecord.status == BorrowStatus(status))
+            query = query.filter(BorrowRecord.status_criteria(BorrowStatus(status)))
         if user_id:
             query = query.filter(BorrowRecord.user_id == int(user_id))
         
@@ -27,14 +55,6 @@ def list_borrows() -> str:
             BorrowRecord.borrow_date.desc()
         ).all()
         
-        current_time = datetime.utcnow()
-        for borrow in borrows:
-            if (borrow.status == BorrowStatus.BORROWED and 
-                current_time > borrow.due_date):
-                borrow.status = BorrowStatus.OVERDUE
-        
-        db.session.commit()
-        
         today = datetime.utcnow().date()
         
         return render_template('borrows/list.html', 
@@ -43,7 +63,7 @@ def list_borrows() -> str:
                              today=today)
                              
     except Exception as e:
-        current_app.logger.error(f"Error retrieving borrows: {str(e)}")
+        current_app.logger.error("Error retrieving borrows: %s", e)
         flash("Unable to retrieve borrowing records at this time.", "error")
         return render_template('borrows/list.html', 
                              borrows=[],
@@ -56,82 +76,136 @@ def add_borrow() -> Union[str, Response]:
         try:
             book_id = int(request.form['book_id'])
             user_id = int(request.form['user_id'])
-            
-            book: Optional[Book] = Book.query.get_or_404(book_id)
-            user: Optional[User] = User.query.get_or_404(user_id)
-            
-            if book.available_quantity <= 0:
-                flash('This book is not available for borrowing.', 'error')
-                return redirect(url_for('borrows.add_borrow'))
-            
-            max_borrows = 3 if user.user_type == UserType.STUDENT else 5
-            if len(user.active_borrows) >= max_borrows:
-                flash(f'User has reached the maximum limit of {max_borrows} active borrows.', 'error')
-                return redirect(url_for('borrows.add_borrow'))
+            g.user_id = user_id
             
             borrow_duration = current_app.config.get('BORROW_DURATION', timedelta(days=14))
-            due_date = datetime.utcnow() + borrow_duration
-            
-            borrow = BorrowRecord(
-                book_id=book_id,
-                user_id=user_id,
-                borrow_date=datetime.utcnow(),
-                due_date=due_date,
-                status=BorrowStatus.BORROWED
-            )
-            
-            book.available_quantity -= 1
-            db.session.add(borrow)
-            db.session.commit()
+            checkout(book_id, user_id, borrow_duration)
+            cache.invalidate('books', 'borrows')
             
             flash('Book borrowed successfully!', 'success')
             return redirect(url_for('borrows.list_borrows'))
             
-        except ValueError:
+        except BookUnavailableError as e:
+            # Offer to queue the user for the next returned copy
+            flash(f'{e} You can place a hold instead.', 'warning')
+            return redirect(url_for('holds.place', book_id=book_id, user_id=user_id))
+        except LoanError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('borrows.add_borrow'))
+        except (ValueError, LookupError):
             flash('Invalid book or user selection.', 'error')
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error processing borrow: {str(e)}")
+            current_app.logger.error("Error processing borrow: %s", e)
             flash('Error processing borrow request. Please try again.', 'error')
     
+    # Users and books are looked up as the librarian types, see the api routes below
+    return render_template('borrows/add.html')
+
+@bp.route('/api/users')
+def lookup_users() -> Response:
+    """Find users by name or email prefix for the borrow form typeahead.
+
+    Results are ordered by name and paginated with an opaque ``after`` cursor.
+    """
+    query_text = request.args.get('q', '').strip()
+    try:
+        query = db.session.query(
+            User.id, User.first_name, User.last_name, User.email, User.user_type
+        )
+        if '@' in query_text:
+            query = query.filter(User.email.startswith(query_text, autoescape=True))
+        else:
+            for token in query_text.split():
+                query = query.filter(or_(
+                    User.first_name.startswith(token, autoescape=True),
+                    User.last_name.startswith(token, autoescape=True),
+                    User.email.startswith(token, autoescape=True)
+                ))
+
+        page = keyset_paginate(
+            query,
+            (User.last_name, User.first_name, User.id),
+            _lookup_limit(),
+            after=request.args.get('after')
+        )
+        return jsonify({
+            'results': [{
+                'id': row.id,
+                'full_name': f"{row.first_name} {row.last_name}",
+                'email': row.email,
+                'user_type': row.user_type.value
+            } for row in page.items],
+            'next': page.next_cursor
+        })
+    except Exception as e:
+        current_app.logger.error("Error looking up users: %s", e)
+        return jsonify({'results': [], 'next': None}), 500
+
+@bp.route('/api/books')
+def lookup_books() -> Response:
+    """Find books by title, author or ISBN prefix for the borrow form typeahead."""
+    query_text = request.args.get('q', '').strip()
+    limit = _lookup_limit()
     try:
-        available_books = Book.query.filter(Book.available_quantity > 0).order_by(Book.title).all()
-        users = User.query.order_by(User.last_name, User.first_name).all()
-        return render_template('borrows/add.html', 
-                             books=available_books,
-                             users=users)
+        if not tokenize(query_text):
+            return jsonify({'results': []})
+
+        ranked = search_book_ids(query_text, limit=limit)
+        rows = db.session.query(
+            Book.id, Book.isbn, Book.title, Book.author, Book.available_quantity
+        ).filter(Book.id.in_([book_id for book_id, _ in ranked])).all()
+        by_id = {row.id: row for row in rows}
+
+        return jsonify({
+            'results': [{
+                'id': row.id,
+                'isbn': row.isbn,
+                'title': row.title,
+                'author': row.author,
+                'available_quantity': row.available_quantity
+            } for row in (by_id.get(book_id) for book_id, _ in ranked) if row is not None]
+        })
     except Exception as e:
-        current_app.logger.error(f"Error loading borrow form: {str(e)}")
-        flash("Unable to load the borrow form. Please try again.", "error")
-        return redirect(url_for('borrows.list_borrows'))
+        current_app.logger.error("Error looking up books: %s", e)
+        return jsonify({'results': []}), 500
+
+@bp.route('/api/user-info/<int:id>')
+def user_info(id: int) -> Response:
+    """Borrowing status of a single user, shown once they are selected."""
+    user = User.query.get_or_404(id)
+    active_borrows = user.active_borrows_count
+    return jsonify({
+        'success': True,
+        'user_type': user.user_type.value,
+        'active_borrows': active_borrows,
+        'max_borrows': user.max_borrow_limit,
+        'can_borrow': active_borrows < user.max_borrow_limit
+    })
 
 @bp.route('/return/<int:id>', methods=['POST'])
 def return_book(id: int) -> Response:
-    borrow = BorrowRecord.query.get_or_404(id)
-    
-    if borrow.status == BorrowStatus.RETURNED:
-        flash('This book has already been returned.', 'error')
-        return redirect(url_for('borrows.list_borrows'))
-    
     try:
-        return_date = datetime.utcnow()
-        borrow.return_date = return_date
-        borrow.status = BorrowStatus.RETURNED
-        
-        borrow.book.available_quantity += 1
+        fee_per_day = current_app.config.get('LATE_FEE_PER_DAY', 1.00)
+        pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+        borrow, late_fee, hold = return_loan(id, fee_per_day, hold_pickup=pickup)
+        g.user_id = borrow.user_id
+        cache.invalidate('books', 'borrows')
         
-        if return_date > borrow.due_date:
-            days_late = (return_date - borrow.due_date).days
-            fee_per_day = current_app.config.get('LATE_FEE_PER_DAY', 1.00)
-            late_fee = days_late * fee_per_day
+        if late_fee > 0:
             flash(f'Late return fee: ${late_fee:.2f}', 'warning')
-        
-        db.session.commit()
         flash('Book returned successfully!', 'success')
+        if hold is not None:
+            flash(f'Keep this copy for {hold.user.full_name}, first in the hold queue, '
+                  f'until {hold.expires_at:%Y-%m-%d}.', 'info')
         
+    except LookupError:
+        abort(404)
+    except LoanError as e:
+        flash(str(e), 'error')
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error processing return: {str(e)}")
+        current_app.logger.error("Error processing return: %s", e)
         flash('Error processing return. Please try again.', 'error')
     
     return redirect(url_for('borrows.list_borrows'))
@@ -153,11 +227,69 @@ def extend_borrow(id: int) -> Response:
         borrow.due_date = borrow.due_date + timedelta(days=extension_days)
         
         db.session.commit()
+        cache.invalidate('borrows')
         flash(f'Borrowing period extended by {extension_days} days.', 'success')
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error extending borrow: {str(e)}")
+        current_app.logger.error("Error extending borrow: %s", e)
         flash('Error extending borrowing period. Please try again.', 'error')
     
-    return redirect(url_for('borrows.list_borrows'))
\ No newline at end of file
+    return redirect(url_for('borrows.list_borrows'))
+
+@bp.route('/bulk/return', methods=['POST'])
+def bulk_return_books() -> Response:
+    """Return a batch of loans in one transaction.
+
+    Expects JSON ``{"borrow_ids": [1, 2, ...]}`` and answers with a per-item
+    report including late fees and the holds copies were set aside for.
+    """
+    payload = request.get_json(silent=True) or {}
+    borrow_ids = payload.get('borrow_ids')
+    if (not isinstance(borrow_ids, list) or not borrow_ids
+            or not all(isinstance(i, int) for i in borrow_ids)):
+        return jsonify({'error': 'borrow_ids must be a non-empty list of integers'}), 400
+    if len(borrow_ids) > BULK_MAX_ITEMS:
+        return jsonify({'error': f'At most {BULK_MAX_ITEMS} items per batch'}), 400
+
+    try:
+        fee_per_day = current_app.config.get('LATE_FEE_PER_DAY', 1.00)
+        pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+        results = bulk_return(borrow_ids, fee_per_day, hold_pickup=pickup)
+        cache.invalidate('books', 'borrows')
+    except Exception as e:
+        current_app.logger.error("Error processing bulk return: %s", e)
+        return jsonify({'error': 'Error processing bulk return'}), 500
+
+    return jsonify({
+        'results': results,
+        'returned': sum(1 for r in results if r['status'] == 'returned'),
+        'total_late_fees': round(sum(r['late_fee'] for r in results), 2)
+    })
+
+@bp.route('/bulk/checkout', methods=['POST'])
+def bulk_checkout_books() -> Response:
+    """Check out a batch of books in one transaction.
+
+    Expects JSON ``{"items": [{"user_id": 1, "isbn": "..."}, ...]}``; each
+    item may name the book by ``book_id`` instead of ``isbn``.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('items')
+    if not isinstance(items, list) or not items or not all(isinstance(i, dict) for i in items):
+        return jsonify({'error': 'items must be a non-empty list of objects'}), 400
+    if len(items) > BULK_MAX_ITEMS:
+        return jsonify({'error': f'At most {BULK_MAX_ITEMS} items per batch'}), 400
+
+    try:
+        borrow_duration = current_app.config.get('BORROW_DURATION', timedelta(days=14))
+        results = bulk_checkout(items, borrow_duration)
+        cache.invalidate('books', 'borrows')
+    except Exception as e:
+        current_app.logger.error("Error processing bulk checkout: %s", e)
+        return jsonify({'error': 'Error processing bulk checkout'}), 500
+
+    return jsonify({
+        'results': results,
+        'borrowed': sum(1 for r in results if r['status'] == 'borrowed')
+    })
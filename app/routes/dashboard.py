@@ -1,254 +1,197 @@
 # app/routes/dashboard.py
-from flask import Blueprint, render_template
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from flask import Blueprint, render_template, request, jsonify, current_app, Response
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.db import db
 from app.models.book import Book
-from app.models.user import User, UserType
-from app.models.borrow import BorrowRecord, BorrowStatus
-from typing import Dict, List, Any
-import logging
+from app.models.user import User
+from app.models.borrow import BorrowRecord
+from app.cache import cache
+from app.replicas import read_replica
+from app.stats import (get_library_stats, get_circulation_statistics, get_popular_books,
+                       STATISTICS_WINDOWS, GRANULARITIES)
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-bp = Blueprint('dashboard', __name__)
+bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
-def get_monthly_statistics() -> Dict[str, List[Any]]:
-    """Calculate monthly borrowing and return statistics.
-    
-    Returns:
-        Dictionary containing labels and data for the monthly statistics chart.
-    """
-    try:
-        # Get the last 6 months
-        today = datetime.utcnow()
-        months = []
-        borrows = []
-        returns = []
-        
-        for i in range(5, -1, -1):
-            # Calculate start and end of month
-            end_date = today.replace(day=1) - timedelta(days=1)
-            start_date = end_date.replace(day=1)
-            
-            # Format month label
-            months.append(start_date.strftime('%B %Y'))
-            
-            # Count borrows and returns for the month
-            month_borrows = BorrowRecord.query.filter(
-                and_(
-                    BorrowRecord.borrow_date >= start_date,
-                    BorrowRecord.borrow_date <= end_date
-                )
-            ).count()
-            
-            month_returns = BorrowRecord.query.filter(
-                and_(
-                    BorrowRecord.return_date >= start_date,
-                    BorrowRecord.return_date <= end_date
-                )
-            ).count()
-            
-            borrows.append(month_borrows)
-            returns.append(month_returns)
-            
-            # Move to previous month
-            today = start_date
-            
-        return {
-            'labels': months[::-1],
-            'borrows': borrows[::-1],
-            'returns': returns[::-1]
-        }
-    except Exception as e:
-        logging.error(f"Error calculating monthly statistics: {str(e)}")
-        return {'labels': [], 'borrows': [], 'returns': []}
-
-def get_popular_books(limit: int = 5) -> List[Dict[str, Any]]:
-    """Get the most frequently borrowed books.
-    
-    Args:
-        limit: Maximum number of books to return
-        
-    Returns:
-        List of dictionaries containing book information and borrow counts
-    """
-    try:
-        return db.session.query(
-            Book,
-            func.count(BorrowRecord.id).label('borrow_count')
-        ).join(BorrowRecord).group_by(Book.id).order_by(
-            func.count(BorrowRecord.id).desc()
-        ).limit(limit).all()
-    except Exception as e:
-        logging.error(f"Error retrieving popular books: {str(e)}")
-        return []
+# Browsers may reuse a widget this long (seconds) before asking again
+WIDGET_MAX_AGE = 30
 
 def get_recent_activities(limit: int = 10) -> List[Dict[str, Any]]:
-    """Get recent library activities.
-    
+    """Get the latest checkouts and returns, newest first.
+
     Args:
         limit: Maximum number of activities to return
-        
+
     Returns:
         List of dictionaries containing activity information
     """
-    try:
-        activities = []
-        recent_borrows = BorrowRecord.query.order_by(
-            BorrowRecord.created_at.desc()
-        ).limit(limit).all()
-        
-        for borrow in recent_borrows:
-            if borrow.status == BorrowStatus.BORROWED:
-                activity_type = 'borrow'
-                description = f"{borrow.user.full_name} borrowed {borrow.book.title}"
-            elif borrow.status == BorrowStatus.RETURNED:
-                activity_type = 'return'
-                description = f"{borrow.user.full_name} returned {borrow.book.title}"
-            elif borrow.status == BorrowStatus.OVERDUE:
-                activity_type = 'overdue'
-                description = f"Overdue: {borrow.book.title} by {borrow.user.full_name}"
-            
+    loaded = (
+        joinedload(BorrowRecord.book).load_only(Book.title),
+        joinedload(BorrowRecord.user).load_only(User.first_name, User.last_name)
+    )
+    # One indexed query per kind of event, merged below
+    borrowed = db.session.scalars(
+        select(BorrowRecord).options(*loaded)
+        .order_by(BorrowRecord.borrow_date.desc()).limit(limit)
+    ).all()
+    returned = db.session.scalars(
+        select(BorrowRecord).options(*loaded)
+        .where(BorrowRecord.return_date.isnot(None))
+        .order_by(BorrowRecord.return_date.desc()).limit(limit)
+    ).all()
+
+    activities = []
+    for borrow in borrowed:
+        if borrow.is_overdue():
             activities.append({
-                'type': activity_type,
-                'description': description,
-                'timestamp': borrow.created_at
+                'type': 'overdue',
+                'description': f"Overdue: {borrow.book.title} by {borrow.user.full_name}",
+                'timestamp': borrow.borrow_date
             })
-            
-        return sorted(activities, key=lambda x: x['timestamp'], reverse=True)
-    except Exception as e:
-        logging.error(f"Error retrieving recent activities: {str(e)}")
-        return []
+        else:
+            activities.append({
+                'type': 'borrow',
+                'description': f"{borrow.user.full_name} borrowed {borrow.book.title}",
+                'timestamp': borrow.borrow_date
+            })
+    for borrow in returned:
+        activities.append({
+            'type': 'return',
+            'description': f"{borrow.user.full_name} returned {borrow.book.title}",
+            'timestamp': borrow.return_date
+        })
+
+    activities.sort(key=lambda x: x['timestamp'], reverse=True)
+    return [dict(activity, timestamp=activity['timestamp'].isoformat())
+            for activity in activities[:limit]]
 
-def generate_alerts() -> List[Dict[str, Any]]:
+def generate_alerts(stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """Generate system alerts based on current library status.
-    
+
+    Args:
+        stats: Library statistics already computed; fetched when not given
+
     Returns:
         List of dictionaries containing alert information
     """
+    alerts = []
+    if stats is None:
+        stats = get_library_stats()
+
+    # Check for overdue books
+    overdue_count = stats['overdue_count']
+
+    if overdue_count > 0:
+        alerts.append({
+            'title': 'Overdue Books',
+            'description': f'{overdue_count} books are overdue',
+            'severity': 'danger',
+            'count': overdue_count
+        })
+
+    # Check for books due today
+    due_today_count = stats['due_today']
+
+    if due_today_count > 0:
+        alerts.append({
+            'title': 'Due Today',
+            'description': f'{due_today_count} books are due today',
+            'severity': 'warning',
+            'count': due_today_count
+        })
+
+    # Check for low stock books (less than 2 copies available)
+    low_stock_count = stats['low_stock_count']
+
+    if low_stock_count > 0:
+        alerts.append({
+            'title': 'Low Stock Alert',
+            'description': f'{low_stock_count} books are running low on copies',
+            'severity': 'info',
+            'count': low_stock_count
+        })
+
+    return alerts
+
+def _library_stats() -> Dict[str, Any]:
+    # One aggregate query per table, shared by the summary and the alerts
+    return cache.get_or_set('dashboard:stats', get_library_stats,
+                            tags=('books', 'users', 'borrows'))
+
+def _widget(name: str, producer: Callable[[], Any],
+            tags: Iterable[str]) -> Union[Response, Tuple[Response, int]]:
+    """Serve one dashboard widget as JSON.
+
+    Each widget is cached on its own, server side under its tags and in the
+    browser for WIDGET_MAX_AGE seconds with an ETag, and fails on its own,
+    so a slow or broken aggregate never holds up the rest of the page.
+    """
     try:
-        alerts = []
-        current_time = datetime.utcnow()
-        
-        # Check for overdue books
-        overdue_count = BorrowRecord.query.filter(
-            and_(
-                BorrowRecord.status == BorrowStatus.BORROWED,
-                BorrowRecord.due_date < current_time
-            )
-        ).count()
-        
-        if overdue_count > 0:
-            alerts.append({
-                'title': 'Overdue Books',
-                'description': f'{overdue_count} books are overdue',
-                'severity': 'danger',
-                'count': overdue_count
-            })
-        
-        # Check for books due today
-        due_today_count = BorrowRecord.query.filter(
-            and_(
-                BorrowRecord.status == BorrowStatus.BORROWED,
-                func.date(BorrowRecord.due_date) == func.date(current_time)
-            )
-        ).count()
-        
-        if due_today_count > 0:
-            alerts.append({
-                'title': 'Due Today',
-                'description': f'{due_today_count} books are due today',
-                'severity': 'warning',
-                'count': due_today_count
-            })
-        
-        # Check for low stock books (less than 2 copies available)
-        low_stock_count = Book.query.filter(
-            Book.available_quantity < 2
-        ).count()
-        
-        if low_stock_count > 0:
-            alerts.append({
-                'title': 'Low Stock Alert',
-                'description': f'{low_stock_count} books are running low on copies',
-                'severity': 'info',
-                'count': low_stock_count
-            })
-        
-        return alerts
+        data = cache.get_or_set(f'dashboard:{name}', producer, tags=tags)
     except Exception as e:
-        logging.error(f"Error generating alerts: {str(e)}")
-        return []
+        current_app.logger.error("Error loading dashboard widget %s: %s", name, e)
+        return jsonify({'error': 'Could not load this widget.'}), 503
+
+    response = jsonify(data)
+    response.cache_control.private = True
+    response.cache_control.max_age = WIDGET_MAX_AGE
+    response.add_etag()
+    return response.make_conditional(request)
 
 @bp.route('/')
+@read_replica
 def dashboard() -> str:
-    """Render the main dashboard with all necessary data.
-    
-    Returns:
-        Rendered dashboard template with context data
-    """
-    try:
-        current_time = datetime.utcnow()
-        
-        # Get various counts for dashboard metrics
-        total_books = Book.query.count()
-        available_books = Book.query.with_entities(
-            func.sum(Book.available_quantity)
-        ).scalar() or 0
-        borrowed_books = Book.query.with_entities(
-            func.sum(Book.quantity - Book.available_quantity)
-        ).scalar() or 0
-        
-        total_users = User.query.count()
-        student_count = User.query.filter_by(user_type=UserType.STUDENT).count()
-        staff_count = User.query.filter_by(user_type=UserType.STAFF).count()
-        
-        active_borrows = BorrowRecord.query.filter_by(
-            status=BorrowStatus.BORROWED
-        ).count()
-        
-        # Get counts for attention items
-        overdue_count = BorrowRecord.query.filter(
-            and_(
-                BorrowRecord.status == BorrowStatus.BORROWED,
-                BorrowRecord.due_date < current_time
-            )
-        ).count()
-        
-        due_today = BorrowRecord.query.filter(
-            and_(
-                BorrowRecord.status == BorrowStatus.BORROWED,
-                func.date(BorrowRecord.due_date) == func.date(current_time)
-            )
-        ).count()
-        
-        low_stock_count = Book.query.filter(
-            Book.available_quantity < 2
-        ).count()
-        
-        attention_count = overdue_count + due_today + low_stock_count
-        
-        # Gather all required data for the dashboard
-        context = {
-            'current_time': current_time,
-            'total_books': total_books,
-            'available_books': available_books,
-            'borrowed_books': borrowed_books,
-            'total_users': total_users,
-            'student_count': student_count,
-            'staff_count': staff_count,
-            'active_borrows': active_borrows,
-            'due_today': due_today,
-            'overdue_count': overdue_count,
-            'low_stock_count': low_stock_count,
-            'attention_count': attention_count,
-            'recent_activities': get_recent_activities(),
-            'alerts': generate_alerts(),
-            'popular_books': get_popular_books(),
-            'monthly_stats': get_monthly_statistics()
-        }
-        
-        return render_template('dashboard.html', **context)
-        
-    except Exception as e:
-        logging.error(f"Error rendering dashboard: {str(e)}")
-        return render_template('error.html', 
-                             message="Error loading dashboard. Please try again later.")
\ No newline at end of file
+    """Render the dashboard page; its widgets load in parallel from the endpoints below."""
+    # Chart window, e.g. ?window=12&granularity=week
+    window = request.args.get('window', STATISTICS_WINDOWS[0], type=int)
+    if window not in STATISTICS_WINDOWS:
+        window = STATISTICS_WINDOWS[0]
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        granularity = 'month'
+
+    return render_template('dashboard.html',
+                           current_time=datetime.utcnow(),
+                           stats_window=window,
+                           stats_windows=STATISTICS_WINDOWS,
+                           stats_granularity=granularity)
+
+@bp.route('/widgets/summary')
+@read_replica
+def summary_widget():
+    """Counts shown on the tiles at the top of the dashboard."""
+    def summary() -> Dict[str, Any]:
+        stats = _library_stats()
+        return dict(stats, attention_count=(stats['overdue_count'] + stats['due_today'] +
+                                            stats['low_stock_count']))
+    return _widget('summary', summary, tags=('books', 'users', 'borrows'))
+
+@bp.route('/widgets/recent-activity')
+@read_replica
+def recent_activity_widget():
+    return _widget('recent', get_recent_activities, tags=('books', 'users', 'borrows'))
+
+@bp.route('/widgets/alerts')
+@read_replica
+def alerts_widget():
+    return _widget('alerts', lambda: generate_alerts(_library_stats()),
+                   tags=('books', 'users', 'borrows'))
+
+@bp.route('/widgets/popular-books')
+@read_replica
+def popular_books_widget():
+    return _widget('popular', get_popular_books, tags=('books', 'borrows'))
+
+@bp.route('/widgets/circulation')
+@read_replica
+def circulation_widget():
+    """Borrows and returns per month or week, e.g. ?window=12&granularity=week."""
+    window = request.args.get('window', STATISTICS_WINDOWS[0], type=int)
+    granularity = request.args.get('granularity', 'month')
+    if window not in STATISTICS_WINDOWS or granularity not in GRANULARITIES:
+        return jsonify({'error': 'Unsupported window or granularity'}), 400
+    return _widget(f'monthly:{window}:{granularity}',
+                   lambda: get_circulation_statistics(window, granularity),
+                   tags=('borrows',))
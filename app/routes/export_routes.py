@@ -0,0 +1,41 @@
+# export_routes.py
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, stream_with_context, jsonify
+from app.exporter import EXPORTS, FORMATS, MIMETYPES, iter_export
+from app.replicas import read_replica
+
+bp = Blueprint('exports', __name__, url_prefix='/export')
+
+def _date_arg(name):
+    """Parse an optional YYYY-MM-DD query parameter."""
+    value = request.args.get(name, '').strip()
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+@bp.route('/<name>.<fmt>')
+@read_replica
+def export_table(name: str, fmt: str) -> Response:
+    """Stream a table as CSV or NDJSON.
+
+    Rows are encoded as they are read from the database, so the response
+    starts immediately and memory use does not grow with the table. Borrow
+    records accept ``since`` and ``until`` (YYYY-MM-DD) filters on borrow_date.
+    """
+    if name not in EXPORTS or fmt not in FORMATS:
+        return jsonify({'error': f'Unknown export {name}.{fmt}'}), 404
+    try:
+        since, until = _date_arg('since'), _date_arg('until')
+    except ValueError:
+        return jsonify({'error': 'Dates must be formatted as YYYY-MM-DD'}), 400
+
+    try:
+        chunks = iter_export(name, fmt, since, until)
+    except Exception as e:
+        current_app.logger.error("Error exporting %s: %s", name, e)
+        return jsonify({'error': 'Export failed'}), 500
+
+    stamp = datetime.utcnow().strftime('%Y%m%d')
+    return Response(
+        stream_with_context(chunks),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{name}-{stamp}.{fmt}"'}
+    )
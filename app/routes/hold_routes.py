@@ -0,0 +1,99 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, current_app, abort, g
+from typing import Union
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app import db
+from app.cache import cache
+from app.models.book import Book
+from app.models.user import User
+from app.models.hold import Hold, HoldStatus, OPEN_HOLD_STATUSES
+from app.loans import place_hold, cancel_hold, queue_position, LoanError, HOLD_PICKUP_PERIOD
+
+bp = Blueprint('holds', __name__, url_prefix='/holds')
+
+# Most holds shown on the list page
+HOLDS_LIST_LIMIT = 500
+
+@bp.route('/')
+def list_holds() -> str:
+    """Open holds, grouped by book with ready ones first and the rest in queue order."""
+    status = request.args.get('status')
+    book_id = request.args.get('book_id', type=int)
+    user_id = request.args.get('user_id', type=int)
+    try:
+        query = Hold.query.options(
+            joinedload(Hold.book).load_only(Book.title, Book.isbn),
+            joinedload(Hold.user).load_only(User.first_name, User.last_name, User.email)
+        )
+        if status:
+            query = query.filter(Hold.status == HoldStatus(status))
+        else:
+            query = query.filter(Hold.status.in_(OPEN_HOLD_STATUSES))
+        if book_id:
+            query = query.filter(Hold.book_id == book_id)
+        if user_id:
+            query = query.filter(Hold.user_id == user_id)
+
+        holds = query.order_by(Hold.book_id, Hold.status, *Hold.queue_order()) \
+            .limit(HOLDS_LIST_LIMIT).all()
+        return render_template('holds/list.html', holds=holds, HoldStatus=HoldStatus,
+                             limit=HOLDS_LIST_LIMIT)
+    except ValueError:
+        abort(400)
+    except Exception as e:
+        current_app.logger.error("Error retrieving holds: %s", e)
+        flash('Error loading holds. Please try again.', 'error')
+        return render_template('holds/list.html', holds=[], HoldStatus=HoldStatus,
+                             limit=HOLDS_LIST_LIMIT)
+
+@bp.route('/place', methods=['GET', 'POST'])
+def place() -> Union[str, Response]:
+    """Confirm and place a hold for a book with no copy on the shelf."""
+    book_id = request.values.get('book_id', type=int)
+    user_id = request.values.get('user_id', type=int)
+    book = db.session.get(Book, book_id) if book_id else None
+    user = db.session.get(User, user_id) if user_id else None
+    if book is None or user is None:
+        abort(404)
+
+    if request.method == 'POST':
+        try:
+            g.user_id = user.id
+            hold = place_hold(book.id, user.id)
+            flash(f'Hold placed; {user.full_name} is number {queue_position(hold)} '
+                  f'in the queue for {book.title}.', 'success')
+            return redirect(url_for('holds.list_holds', book_id=book.id))
+        except LoanError as e:
+            flash(str(e), 'error')
+        except LookupError:
+            abort(404)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error("Error placing hold: %s", e)
+            flash('Error placing hold. Please try again.', 'error')
+
+    waiting = db.session.query(func.count(Hold.id)).filter(
+        Hold.book_id == book.id, Hold.status == HoldStatus.WAITING
+    ).scalar()
+    return render_template('holds/place.html', book=book, user=user, waiting=waiting)
+
+@bp.route('/cancel/<int:id>', methods=['POST'])
+def cancel(id: int) -> Response:
+    try:
+        pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+        hold, passed_to = cancel_hold(id, pickup)
+        g.user_id = hold.user_id
+        cache.invalidate('books')
+        flash('Hold cancelled.', 'success')
+        if passed_to is not None:
+            flash(f'The copy is now kept for {passed_to.user.full_name}.', 'info')
+    except LookupError:
+        abort(404)
+    except LoanError as e:
+        flash(str(e), 'error')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error cancelling hold: %s", e)
+        flash('Error cancelling hold. Please try again.', 'error')
+
+    return redirect(url_for('holds.list_holds'))
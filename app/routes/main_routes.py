@@ -1,24 +1,74 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, Response, render_template, jsonify, current_app
+from sqlalchemy import text
+from app.db import db
+from app.cache import cache
+from app.pool import pool_status
+from app.replicas import replica_keys
+from app.metrics import registry
 from app.models.book import Book
 from app.models.user import User
-from app.models.borrow import BorrowRecord, BorrowStatus
+from app.models.borrow import BorrowRecord, BorrowStatus, ACTIVE_STATUSES
 
 bp = Blueprint('main', __name__)
 
-@bp.route('/')
-def index():
-    """Homepage route that displays system overview statistics."""
-    # Get basic statistics for the dashboard
+def get_overview_counts():
+    """Basic statistics for the homepage."""
     total_books = Book.query.count()
     total_users = User.query.count()
-    active_borrows = BorrowRecord.query.filter_by(status=BorrowStatus.BORROWED).count()
+    active_borrows = BorrowRecord.query.filter(
+        BorrowRecord.status.in_(ACTIVE_STATUSES)
+    ).count()
     overdue_borrows = BorrowRecord.query.filter(
-        BorrowRecord.status == BorrowStatus.BORROWED,
-        BorrowRecord.due_date < BorrowRecord.borrow_date
+        BorrowRecord.status_criteria(BorrowStatus.OVERDUE)
     ).count()
 
-    return render_template('main/index.html',
-                         total_books=total_books,
-                         total_users=total_users,
-                         active_borrows=active_borrows,
-                         overdue_borrows=overdue_borrows)
\ No newline at end of file
+    return {
+        'total_books': total_books,
+        'total_users': total_users,
+        'active_borrows': active_borrows,
+        'overdue_borrows': overdue_borrows
+    }
+
+@bp.route('/')
+def index():
+    """Homepage route that displays system overview statistics."""
+    # Counts only change on writes, which invalidate these tags
+    counts = cache.get_or_set('main:overview', get_overview_counts,
+                              tags=('books', 'users', 'borrows'))
+    return render_template('main/index.html', **counts)
+
+@bp.route('/health')
+def health():
+    """Database and replica liveness and connection pool occupancy as JSON.
+
+    Only the primary decides the status code; a failing replica is reported
+    but leaves the writes and most pages working.
+    """
+    try:
+        db.session.execute(text('SELECT 1'))
+        database = 'ok'
+    except Exception as e:
+        current_app.logger.error("Health check failed: %s", e)
+        database = 'unavailable'
+    body = {'database': database, 'pool': pool_status(db.engine)}
+
+    replicas = {}
+    for key in replica_keys():
+        engine = db.engines[key]
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            status = 'ok'
+        except Exception as e:
+            current_app.logger.error("Health check of %s failed: %s", key, e)
+            status = 'unavailable'
+        replicas[key] = {'database': status, 'pool': pool_status(engine)}
+    if replicas:
+        body['replicas'] = replicas
+    return jsonify(body), 200 if database == 'ok' else 503
+
+
+@bp.route('/metrics')
+def metrics():
+    """Request, SQL, template, pool and circulation metrics for Prometheus."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -1,24 +1,41 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from typing import Union
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from email_validator import validate_email, EmailNotValidError
 from app import db
-from app.models.user import User, UserType
+from app.cache import cache
+from app.importer import import_users, detect_format, saved_upload
+from app.models.user import User, UserType, BORROW_LIMITS
+from app.models.borrow import BorrowRecord, ACTIVE_STATUSES
+from app.loans import remove_user, LoanError, HOLD_PICKUP_PERIOD
+from app.replicas import read_replica
 
 bp = Blueprint('users', __name__, url_prefix='/users')
 
 @bp.route('/')
+@read_replica
 def list_users():
     """Display a list of all library users with their basic information."""
     try:
         users = User.query.order_by(User.last_name, User.first_name).all()
-        current_app.logger.debug(f"Found {len(users)} users")
-        return render_template('users/list.html', users=users, UserType=UserType)
+        current_app.logger.debug("Found %s users", len(users))
+
+        # One grouped query instead of loading every user's borrow history
+        active_counts = dict(
+            db.session.query(BorrowRecord.user_id, func.count(BorrowRecord.id))
+            .filter(BorrowRecord.status.in_(ACTIVE_STATUSES))
+            .group_by(BorrowRecord.user_id)
+            .all()
+        )
+        return render_template('users/list.html', users=users, UserType=UserType,
+                             active_counts=active_counts)
     except Exception as e:
-        current_app.logger.error(f"Error retrieving users: {str(e)}")
+        current_app.logger.error("Error retrieving users: %s", e)
         flash('Error loading users. Please try again.', 'error')
-        return render_template('users/list.html', users=[], UserType=UserType)
+        return render_template('users/list.html', users=[], UserType=UserType,
+                             active_counts={})
 
 @bp.route('/add', methods=['GET', 'POST'])
 def add_user():
@@ -40,6 +57,7 @@ def add_user():
             
             db.session.add(user)
             db.session.commit()
+            cache.invalidate('users')
             flash('User added successfully!', 'success')
             return redirect(url_for('users.list_users'))
             
@@ -50,7 +68,7 @@ def add_user():
             flash('A user with this email already exists.', 'error')
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error adding user: {str(e)}")
+            current_app.logger.error("Error adding user: %s", e)
             flash('Error adding user. Please try again.', 'error')
     
     return render_template('users/add.html', UserType=UserType)
@@ -68,11 +86,14 @@ def edit_user(id: int) -> Union[str, redirect]:
             
             # Check user type change restrictions
             new_type = UserType(request.form['user_type'])
-            if (user.user_type == UserType.STAFF and 
-                new_type == UserType.STUDENT and 
-                user.active_borrows_count > 3):
-                flash('Cannot change to student type while having more than 3 active borrows.', 'error')
-                return render_template('users/edit.html', user=user, UserType=UserType)
+            if new_type != user.user_type:
+                limit = BORROW_LIMITS[new_type]
+                if user.active_borrows_count > limit:
+                    flash(f'Cannot change to {new_type.value.lower()} type while having '
+                          f'more than {limit} active borrows.', 'error')
+                    return render_template('users/edit.html', user=user, UserType=UserType)
+                # The borrowing limit follows the type
+                user.max_borrow_limit = limit
             
             # Update user attributes
             user.user_type = new_type
@@ -82,6 +103,7 @@ def edit_user(id: int) -> Union[str, redirect]:
             user.phone = request.form.get('phone', '').strip()
             
             db.session.commit()
+            cache.invalidate('users')
             flash('User updated successfully!', 'success')
             return redirect(url_for('users.list_users'))
             
@@ -94,27 +116,53 @@ def edit_user(id: int) -> Union[str, redirect]:
             flash(str(e), 'error')
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Error updating user: {str(e)}")
+            current_app.logger.error("Error updating user: %s", e)
             flash('Error updating user. Please try again.', 'error')
     
     return render_template('users/edit.html', user=user, UserType=UserType)
 
 @bp.route('/delete/<int:id>')
 def delete_user(id: int):
-    """Delete a user if they have no active borrows."""
+    """Delete a user if they have no active borrows, cancelling their holds."""
     user = User.query.get_or_404(id)
     
-    if user.active_borrows:
-        flash('Cannot delete user while they have active borrows.', 'error')
-        return redirect(url_for('users.list_users'))
-    
     try:
-        db.session.delete(user)
-        db.session.commit()
+        pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+        remove_user(user.id, pickup)
+        cache.invalidate('users', 'borrows', 'books')
         flash('User deleted successfully!', 'success')
+    except LoanError as e:
+        flash(str(e), 'error')
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error deleting user: {str(e)}")
+        current_app.logger.error("Error deleting user: %s", e)
         flash('Error deleting user. Please try again.', 'error')
     
-    return redirect(url_for('users.list_users'))
\ No newline at end of file
+    return redirect(url_for('users.list_users'))
+
+@bp.route('/import', methods=['GET', 'POST'])
+def import_users_upload():
+    """Bulk import users from an uploaded CSV or NDJSON file."""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            flash('Please choose a file to import.', 'error')
+            return redirect(url_for('users.import_users_upload'))
+        try:
+            with saved_upload(upload, current_app.config['UPLOAD_FOLDER']) as path:
+                with open(path, 'rb') as stream:
+                    report = import_users(stream, detect_format(upload.filename))
+            current_app.logger.info("User import: %s", report.summary())
+            cache.invalidate('users')
+            flash(f'Import finished: {report.summary()}.',
+                  'success' if not report.rejected else 'warning')
+            for line, message in report.errors[:10]:
+                flash(f'Line {line}: {message}', 'error')
+            return redirect(url_for('users.list_users'))
+        except Exception as e:
+            current_app.logger.error("Error importing users: %s", e)
+            flash('Error importing users. Please check the file and try again.', 'error')
+
+    return render_template('import.html', title='Import Users',
+                         fields=('email', 'first_name', 'last_name', 'phone', 'user_type'),
+                         cancel_url=url_for('users.list_users'))
@@ -0,0 +1,282 @@
+# app/search.py
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import desc
+from sqlalchemy.dialects.mysql import match
+
+from flask import current_app
+
+from .db import db
+from .models.book import Book
+
+# Relative weight of a term depending on the field it came from
+FIELD_WEIGHTS: Dict[str, float] = {
+    'isbn': 5.0,
+    'title': 3.0,
+    'author': 2.0,
+    'publisher': 1.0,
+}
+
+# Extra weight when a query token matches a whole term rather than a prefix
+EXACT_MATCH_BONUS = 1.5
+
+# Shorter tokens only match whole terms; expanding one- or two-letter
+# prefixes would touch a large share of the vocabulary
+MIN_PREFIX_LENGTH = 3
+
+# InnoDB ignores FULLTEXT tokens shorter than innodb_ft_min_token_size (3)
+MYSQL_MIN_TOKEN_SIZE = 3
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """In-process inverted index over the searchable book fields.
+
+    Terms are kept in a sorted list so that prefix (typeahead) lookups are a
+    binary search plus a short scan rather than a walk over every posting.
+    Used when the database has no FULLTEXT support, e.g. SQLite. Each app
+    keeps its own index in ``app.extensions['search_index']``.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._terms: List[str] = []
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    @staticmethod
+    def _document_terms(book) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(book, field, None)):
+                terms[term] = max(terms.get(term, 0.0), weight)
+        return terms
+
+    def add(self, book) -> None:
+        """Index or re-index a single book (anything with the Book columns)."""
+        terms = self._document_terms(book)
+        with self._lock:
+            self._remove_locked(book.id)
+            for term, weight in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    position = bisect_left(self._terms, term)
+                    self._terms.insert(position, term)
+                postings[book.id] = weight
+            self._doc_terms[book.id] = terms
+
+    def remove(self, book_id: int) -> None:
+        """Drop a book from the index."""
+        with self._lock:
+            self._remove_locked(book_id)
+
+    def _remove_locked(self, book_id: int) -> None:
+        terms = self._doc_terms.pop(book_id, None)
+        if not terms:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._terms, term)
+                if position < len(self._terms) and self._terms[position] == term:
+                    del self._terms[position]
+
+    def rebuild(self, books: Iterable) -> None:
+        """Replace the index contents with the given books."""
+        postings: Dict[str, Dict[int, float]] = {}
+        doc_terms: Dict[int, Dict[str, float]] = {}
+        for book in books:
+            terms = self._document_terms(book)
+            for term, weight in terms.items():
+                postings.setdefault(term, {})[book.id] = weight
+            doc_terms[book.id] = terms
+        # Sort the vocabulary once instead of inserting term by term
+        with self._lock:
+            self._postings = postings
+            self._doc_terms = doc_terms
+            self._terms = sorted(postings)
+            self.loaded = True
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return [prefix] if prefix in self._postings else []
+        terms = self._terms
+        position = bisect_left(terms, prefix)
+        matches = []
+        while position < len(terms) and terms[position].startswith(prefix):
+            matches.append(terms[position])
+            position += 1
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return (book_id, score) pairs matching every query token as a prefix.
+
+        Results are ordered by descending score, ties broken by book id.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            # Start from the most selective token to keep the candidate set small
+            expansions = sorted(
+                ((token, self._prefix_terms(token)) for token in set(tokens)),
+                key=lambda item: sum(len(self._postings[term]) for term in item[1])
+            )
+            first_token, first_terms = expansions[0]
+            scores: Dict[int, float] = {}
+            for term in first_terms:
+                bonus = EXACT_MATCH_BONUS if term == first_token else 1.0
+                for book_id, weight in self._postings[term].items():
+                    scores[book_id] = max(scores.get(book_id, 0.0), weight * bonus)
+
+            # Remaining tokens only need checking against the surviving candidates
+            for token, _ in expansions[1:]:
+                if not scores:
+                    break
+                exact_only = len(token) < MIN_PREFIX_LENGTH
+                narrowed: Dict[int, float] = {}
+                for book_id, score in scores.items():
+                    best = 0.0
+                    for term, weight in self._doc_terms[book_id].items():
+                        if term == token:
+                            best = max(best, weight * EXACT_MATCH_BONUS)
+                        elif not exact_only and term.startswith(token):
+                            best = max(best, weight)
+                    if best:
+                        narrowed[book_id] = score + best
+                scores = narrowed
+
+        return heapq.nsmallest(limit, scores.items(),
+                               key=lambda item: (-item[1], item[0]))
+
+
+def init_app(app) -> None:
+    """Give the app its own fallback index, loaded lazily on first search."""
+    app.extensions['search_index'] = InvertedIndex()
+
+
+def book_index() -> InvertedIndex:
+    """The current app's fallback index."""
+    return current_app.extensions['search_index']
+
+
+def _uses_fulltext() -> bool:
+    return db.engine.dialect.name == 'mysql'
+
+
+def _ensure_loaded() -> InvertedIndex:
+    index = book_index()
+    if not index.loaded:
+        rows = db.session.query(
+            Book.id, Book.isbn, Book.title, Book.author, Book.publisher
+        ).execution_options(yield_per=1000)
+        index.rebuild(rows)
+    return index
+
+
+def _fulltext_search(query: str, limit: int) -> List[Tuple[int, float]]:
+    tokens = tokenize(query)
+    words = [token for token in tokens if len(token) >= MYSQL_MIN_TOKEN_SIZE]
+    isbn_prefix = ''.join(tokens) if tokens and all(t.isdigit() for t in tokens) else None
+
+    # The text and ISBN lookups run as separate queries: OR-ing MATCH with a
+    # LIKE stops MySQL using either index and scans the table instead
+    scores: Dict[int, float] = {}
+    if words:
+        score = match(
+            Book.title, Book.author, Book.publisher,
+            against=' '.join(f'+{word}*' for word in words)
+        ).in_boolean_mode()
+        rows = db.session.query(Book.id, score.label('score')).filter(score).order_by(
+            desc('score'), Book.id
+        ).limit(limit).all()
+        scores.update((row.id, float(row.score or 0.0)) for row in rows)
+    elif tokens:
+        # Tokens too short for the FULLTEXT parser; fall back to a title prefix
+        rows = db.session.query(Book.id).filter(
+            Book.title.startswith(' '.join(tokens), autoescape=True)
+        ).order_by(Book.id).limit(limit).all()
+        scores.update((row.id, 1.0) for row in rows)
+
+    if isbn_prefix:
+        # A constant pattern (digits only, nothing to escape) is a range
+        # scan on the unique isbn index
+        rows = db.session.query(Book.id, Book.isbn).filter(
+            Book.isbn.like(f'{isbn_prefix}%')
+        ).order_by(Book.isbn).limit(limit).all()
+        for row in rows:
+            bonus = EXACT_MATCH_BONUS if row.isbn == isbn_prefix else 1.0
+            scores[row.id] = max(scores.get(row.id, 0.0), FIELD_WEIGHTS['isbn'] * bonus)
+
+    return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def search_book_ids(query: str, limit: int = 10) -> List[Tuple[int, float]]:
+    """Rank books against a free-text or ISBN query.
+
+    Uses the MySQL FULLTEXT index when available and the in-process
+    inverted index otherwise.
+
+    Args:
+        query: Words or word prefixes to search for
+        limit: Maximum number of results
+
+    Returns:
+        List of (book_id, score) pairs, best match first
+    """
+    if not query or not query.strip():
+        return []
+    if _uses_fulltext():
+        return _fulltext_search(query, limit)
+    return _ensure_loaded().search(query, limit)
+
+
+def search_books(query: str, limit: int = 10) -> List[Book]:
+    """Like search_book_ids, but returns the Book objects in rank order."""
+    ranked = search_book_ids(query, limit)
+    if not ranked:
+        return []
+    books = {book.id: book for book in
+             Book.query.filter(Book.id.in_([book_id for book_id, _ in ranked]))}
+    return [books[book_id] for book_id, _ in ranked if book_id in books]
+
+
+def reload_book_index() -> None:
+    """Drop the fallback index so the next search rebuilds it, e.g. after a bulk import."""
+    book_index().loaded = False
+
+
+def index_book(book: Book) -> None:
+    """Refresh a book in the fallback index after its changes are committed."""
+    index = book_index()
+    if index.loaded:
+        index.add(book)
+
+
+def unindex_book(book_id: int) -> None:
+    """Remove a deleted book from the fallback index."""
+    index = book_index()
+    if index.loaded:
+        index.remove(book_id)
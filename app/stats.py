@@ -0,0 +1,224 @@
+# app/stats.py
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, func, select, union_all
+
+from .db import db
+from .models.book import Book
+from .models.user import User, UserType
+from .models.borrow import BorrowRecord, BorrowStatus, ACTIVE_STATUSES
+from .models.circulation import CirculationDaily
+from .rollup import as_date, day_start, rollup_watermark
+
+# Circulation chart windows offered on the dashboard, in buckets
+STATISTICS_WINDOWS = (6, 12, 24)
+GRANULARITIES = ('month', 'week')
+
+# Books with fewer available copies than this are reported as low stock
+LOW_STOCK_THRESHOLD = 2
+
+
+def _count_if(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END)"""
+    return func.sum(case((condition, 1), else_=0))
+
+
+def get_book_stats() -> Dict[str, int]:
+    """Collection-wide book totals from a single aggregate query."""
+    row = db.session.query(
+        func.count(Book.id).label('total_books'),
+        _count_if(Book.available_quantity > 0).label('available_titles'),
+        _count_if(Book.available_quantity < LOW_STOCK_THRESHOLD).label('low_stock_count'),
+        func.sum(Book.quantity).label('total_copies'),
+        func.sum(Book.available_quantity).label('available_copies')
+    ).one()
+    stats = {key: int(value or 0) for key, value in row._asdict().items()}
+    stats['borrowed_copies'] = stats['total_copies'] - stats['available_copies']
+    return stats
+
+
+def get_user_stats() -> Dict[str, int]:
+    """User totals per type from a single aggregate query."""
+    row = db.session.query(
+        func.count(User.id).label('total_users'),
+        _count_if(User.user_type == UserType.STUDENT).label('student_count'),
+        _count_if(User.user_type == UserType.STAFF).label('staff_count'),
+        _count_if(User.user_type == UserType.FACULTY).label('faculty_count')
+    ).one()
+    return {key: int(value or 0) for key, value in row._asdict().items()}
+
+
+def get_borrow_stats(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Active, overdue and due-today loan counts from a single aggregate query.
+
+    Args:
+        now: Reference time, defaults to the current UTC time
+    """
+    now = now or datetime.utcnow()
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = start_of_day + timedelta(days=1)
+    active = BorrowRecord.status.in_(ACTIVE_STATUSES)
+
+    row = db.session.query(
+        _count_if(active).label('active_borrows'),
+        _count_if(BorrowRecord.status_criteria(BorrowStatus.OVERDUE, now)).label('overdue_count'),
+        _count_if(and_(
+            BorrowRecord.status == BorrowStatus.BORROWED,
+            BorrowRecord.due_date >= start_of_day,
+            BorrowRecord.due_date < end_of_day
+        )).label('due_today')
+    ).one()
+    return {key: int(value or 0) for key, value in row._asdict().items()}
+
+
+def get_library_stats(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """All dashboard metrics, one query per table.
+
+    Returns:
+        Dictionary merging the book, user and borrow statistics
+    """
+    stats: Dict[str, Any] = {}
+    stats.update(get_book_stats())
+    stats.update(get_user_stats())
+    stats.update(get_borrow_stats(now))
+    return stats
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    """First day of the month or ISO week (Monday) containing ``day``."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _bucket_starts(periods: int, granularity: str, today: date) -> List[date]:
+    """Start dates of the ``periods`` buckets ending with the current one, oldest first."""
+    current = _bucket_start(today, granularity)
+    starts = [current]
+    for _ in range(periods - 1):
+        # Step into the previous bucket and snap to its start
+        current = _bucket_start(current - timedelta(days=1), granularity)
+        starts.append(current)
+    return starts[::-1]
+
+
+def _daily_counts(column, start: datetime, end: datetime) -> Dict[date, int]:
+    """Count borrow records per calendar day of ``column`` within [start, end)."""
+    day = func.date(column)
+    rows = db.session.query(day, func.count(BorrowRecord.id)).filter(
+        column >= start,
+        column < end
+    ).group_by(day).all()
+    return {as_date(value): count for value, count in rows}
+
+
+def _rolled_up_counts(start: date, last: date) -> Dict[date, Dict[str, int]]:
+    """Borrows and returns per day from the circulation rollup, [start, last]."""
+    rows = db.session.query(
+        CirculationDaily.day,
+        func.sum(CirculationDaily.borrows),
+        func.sum(CirculationDaily.returns)
+    ).filter(
+        CirculationDaily.day >= start,
+        CirculationDaily.day <= last
+    ).group_by(CirculationDaily.day).all()
+    return {as_date(day): {'borrows': int(borrows or 0), 'returns': int(returns or 0)}
+            for day, borrows, returns in rows}
+
+
+def _raw_start(window_start: datetime) -> datetime:
+    """Where raw borrow records take over from the rollup."""
+    watermark = rollup_watermark()
+    if watermark is None:
+        return window_start
+    return max(window_start, day_start(watermark + timedelta(days=1)))
+
+
+def get_circulation_statistics(periods: int = 6, granularity: str = 'month',
+                               now: Optional[datetime] = None) -> Dict[str, List[Any]]:
+    """Borrows and returns per month or week over a trailing window.
+
+    Days already in the circulation rollup are read from it; the remaining
+    days (normally just today) are grouped per day from the raw borrow
+    records. Days are folded into buckets here, which keeps the SQL portable
+    between MySQL and SQLite. The current, partial bucket is the last one.
+
+    Args:
+        periods: Number of buckets in the window
+        granularity: 'month' or 'week'
+        now: Reference time, defaults to the current UTC time
+
+    Returns:
+        Dictionary containing labels and data for the statistics chart
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    now = now or datetime.utcnow()
+    starts = _bucket_starts(periods, granularity, now.date())
+    window_start = datetime.combine(starts[0], datetime.min.time())
+    window_end = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+    borrows = dict.fromkeys(starts, 0)
+    returns = dict.fromkeys(starts, 0)
+
+    # Closed days come from the rollup, the rest from raw borrow records
+    raw_start = _raw_start(window_start)
+    if raw_start > window_start:
+        last_rolled = raw_start.date() - timedelta(days=1)
+        for day, counts in _rolled_up_counts(starts[0], last_rolled).items():
+            borrows[_bucket_start(day, granularity)] += counts['borrows']
+            returns[_bucket_start(day, granularity)] += counts['returns']
+
+    for day, count in _daily_counts(BorrowRecord.borrow_date, raw_start, window_end).items():
+        borrows[_bucket_start(day, granularity)] += count
+    for day, count in _daily_counts(BorrowRecord.return_date, raw_start, window_end).items():
+        returns[_bucket_start(day, granularity)] += count
+
+    label_format = 'Week of %d %b %Y' if granularity == 'week' else '%B %Y'
+    return {
+        'labels': [start.strftime(label_format) for start in starts],
+        'borrows': [borrows[start] for start in starts],
+        'returns': [returns[start] for start in starts]
+    }
+
+
+def get_popular_books(limit: int = 5) -> List[Dict[str, Any]]:
+    """Most borrowed books of all time.
+
+    Combines the per-book totals of the circulation rollup with the raw
+    borrow records the rollup does not cover yet.
+
+    Args:
+        limit: Maximum number of books to return
+
+    Returns:
+        List of dictionaries with book details and borrow counts
+    """
+    rolled = select(
+        CirculationDaily.book_id.label('book_id'),
+        func.sum(CirculationDaily.borrows).label('borrows')
+    ).group_by(CirculationDaily.book_id)
+    recent = select(
+        BorrowRecord.book_id.label('book_id'),
+        func.count(BorrowRecord.id).label('borrows')
+    ).where(
+        BorrowRecord.borrow_date >= _raw_start(datetime.min)
+    ).group_by(BorrowRecord.book_id)
+    combined = union_all(rolled, recent).subquery()
+
+    borrow_count = func.sum(combined.c.borrows).label('borrow_count')
+    rows = db.session.query(
+        Book.id, Book.title, Book.author, Book.available_quantity, borrow_count
+    ).join(combined, combined.c.book_id == Book.id).group_by(
+        Book.id, Book.title, Book.author, Book.available_quantity
+    ).order_by(borrow_count.desc(), Book.id).limit(limit).all()
+
+    return [{
+        'id': row.id,
+        'title': row.title,
+        'author': row.author,
+        'available_quantity': row.available_quantity,
+        'borrow_count': int(row.borrow_count or 0)
+    } for row in rows]
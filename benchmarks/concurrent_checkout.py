@@ -0,0 +1,118 @@
+"""Concurrent checkout/return benchmark.
+
+Spawns N client threads that repeatedly check out and return copies of one
+contended book through app.loans, then reports throughput, conflicts and
+whether the stock invariant held (no copy lent twice, none lost).
+
+Runs against the database configured by the usual MYSQL_* variables, or
+any SQLAlchemy URL given with --database-url. The schema must exist
+(``flask db upgrade`` or ``flask init-db``).
+
+    python benchmarks/concurrent_checkout.py --clients 16 --copies 4 --seconds 10
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.db import db  # noqa: E402
+from app.loans import checkout, return_loan, LoanError  # noqa: E402
+from app.models.book import Book  # noqa: E402
+from app.models.user import User, UserType  # noqa: E402
+from app.models.borrow import BorrowRecord  # noqa: E402
+from config import Config  # noqa: E402
+
+BENCH_ISBN = '0000000000000'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help='parallel clients')
+    parser.add_argument('--copies', type=int, default=4, help='copies of the contended book')
+    parser.add_argument('--seconds', type=float, default=10.0, help='run time')
+    parser.add_argument('--database-url', default=None, help='override SQLALCHEMY_DATABASE_URI')
+    return parser.parse_args()
+
+
+def setup(copies, clients):
+    """Create the contended book and one user per client, clearing old runs."""
+    book = Book.query.filter_by(isbn=BENCH_ISBN).first()
+    if book is not None:
+        BorrowRecord.query.filter_by(book_id=book.id).delete()
+        db.session.delete(book)
+    User.query.filter(User.email.like('bench-%@example.invalid')).delete(synchronize_session=False)
+    db.session.commit()
+
+    book = Book(isbn=BENCH_ISBN, title='Benchmark Copy', author='Bench',
+                publication_year=2000, quantity=copies, available_quantity=copies)
+    users = [User(first_name='Bench', last_name=str(i), email=f'bench-{i}@example.invalid',
+                  user_type=UserType.STAFF) for i in range(clients)]
+    db.session.add(book)
+    db.session.add_all(users)
+    db.session.commit()
+    return book.id, [user.id for user in users]
+
+
+def client(app, book_id, user_id, deadline, results, lock):
+    done = unavailable = errors = 0
+    with app.app_context():
+        while time.monotonic() < deadline:
+            try:
+                borrow = checkout(book_id, user_id, timedelta(days=14))
+                return_loan(borrow.id)
+                done += 1
+            except LoanError:
+                unavailable += 1
+            except Exception:
+                db.session.rollback()
+                errors += 1
+        db.session.remove()
+    with lock:
+        results['cycles'] += done
+        results['unavailable'] += unavailable
+        results['errors'] += errors
+
+
+def main():
+    args = parse_args()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or Config.SQLALCHEMY_DATABASE_URI
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': args.clients, 'max_overflow': 0}
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        book_id, user_ids = setup(args.copies, args.clients)
+
+    results = {'cycles': 0, 'unavailable': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+    threads = [threading.Thread(target=client, args=(app, book_id, user_id, deadline, results, lock))
+               for user_id in user_ids]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        book = db.session.get(Book, book_id)
+        active = BorrowRecord.query.filter_by(book_id=book_id, return_date=None).count()
+        consistent = book.available_quantity + active == book.quantity and book.available_quantity >= 0
+
+    print(f"clients={args.clients} copies={args.copies} elapsed={elapsed:.1f}s")
+    print(f"checkout+return cycles: {results['cycles']} ({results['cycles'] / elapsed:.1f}/s)")
+    print(f"no copy available: {results['unavailable']}  errors: {results['errors']}")
+    print(f"stock invariant: {'OK' if consistent else 'VIOLATED'} "
+          f"(available={book.available_quantity}, on loan={active}, quantity={book.quantity})")
+    return 0 if consistent else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Synthetic library data for the load tests.
+
+Fills the books, users and borrow_records tables with a reproducible data
+set of the requested size. Loan history is mostly returned loans, with a
+share of open and overdue ones; stock and per-user limits stay consistent,
+so checkout and return behave as they would on a real catalogue.
+
+    python benchmarks/datagen.py --database-url sqlite:///bench.db \\
+        --books 50000 --users 20000 --borrows 1000000 --reset
+
+Missing tables are created. Without --reset the tables must be empty.
+--reset drops and recreates the application tables, so never point it at a database you care about.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, func, insert, select, update  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.db import db  # noqa: E402
+from app.models.book import Book  # noqa: E402
+from app.models.borrow import BorrowRecord, BorrowStatus  # noqa: E402
+from app.models.user import BORROW_LIMITS, User, UserType  # noqa: E402
+from config import Config  # noqa: E402
+
+BATCH_SIZE = 10000
+
+# Share of loans still open, and of those the share already past due
+OPEN_SHARE = 0.05
+OVERDUE_SHARE = 0.2
+
+FIRST_NAMES = ('Ada', 'Alan', 'Anna', 'Ben', 'Carla', 'Chen', 'Dana', 'Emil', 'Fatima', 'Grace',
+               'Hugo', 'Ines', 'Jon', 'Kofi', 'Lena', 'Maria', 'Noah', 'Olga', 'Priya', 'Sam')
+LAST_NAMES = ('Adams', 'Brown', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito',
+              'Jensen', 'Khan', 'Lopez', 'Meyer', 'Nakamura', 'Okafor', 'Petrov', 'Rossi',
+              'Schmidt', 'Tanaka', 'Weber')
+WORDS = ('Silent', 'River', 'Empire', 'Garden', 'Winter', 'Stone', 'Light', 'Shadow', 'Ocean',
+         'Machine', 'History', 'Night', 'City', 'Letters', 'Memory', 'Road', 'Fire', 'Glass')
+PUBLISHERS = ('Penguin', 'HarperCollins', 'Macmillan', 'Hachette', 'Springer', 'Wiley', 'Faber')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=10000, help='books to create')
+    parser.add_argument('--users', type=int, default=5000, help='users to create')
+    parser.add_argument('--borrows', type=int, default=100000, help='borrow records to create')
+    parser.add_argument('--days', type=int, default=730, help='days of loan history')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate the tables first')
+    parser.add_argument('--database-url', default=None, help='override SQLALCHEMY_DATABASE_URI')
+    return parser.parse_args()
+
+
+def isbn13(n):
+    """Valid ISBN-13 in the 979 range, unique per ``n``."""
+    digits = f'979{n:09d}'
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return digits + str(check)
+
+
+def insert_batches(table, rows, total, label):
+    """Insert ``rows`` in executemany batches, reporting progress."""
+    batch = []
+    inserted = 0
+    started = time.perf_counter()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(insert(table), batch)
+            db.session.commit()
+            inserted += len(batch)
+            batch = []
+            print(f'\r{label}: {inserted}/{total}', end='', flush=True)
+    if batch:
+        db.session.execute(insert(table), batch)
+        db.session.commit()
+        inserted += len(batch)
+    print(f'\r{label}: {inserted}/{total} in {time.perf_counter() - started:.1f}s')
+
+
+def book_rows(rng, count, quantities):
+    for i in range(count):
+        yield {
+            'isbn': isbn13(i),
+            'title': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+            'author': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'publisher': rng.choice(PUBLISHERS),
+            'publication_year': rng.randint(1900, 2025),
+            'quantity': quantities[i],
+            'available_quantity': quantities[i],
+        }
+
+
+def user_rows(rng, count):
+    weights = ((UserType.STUDENT, 0.8), (UserType.FACULTY, 0.1), (UserType.STAFF, 0.1))
+    types, probabilities = zip(*weights)
+    for i in range(count):
+        user_type = rng.choices(types, probabilities)[0]
+        yield {
+            'user_type': user_type,
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'email': f'user{i}@bench.example',
+            'phone': f'555-{i:07d}',
+            'max_borrow_limit': BORROW_LIMITS[user_type],
+        }
+
+
+def borrow_rows(rng, count, days, book_ids, user_ids, limits, quantities, on_loan):
+    """Loans over the last ``days`` days; open ones respect stock and limits.
+
+    ``on_loan`` is filled with the open loans per book index, so the stock
+    can be adjusted afterwards.
+    """
+    now = datetime.utcnow()
+    active = [0] * len(user_ids)
+    for _ in range(count):
+        b = rng.randrange(len(book_ids))
+        u = rng.randrange(len(user_ids))
+        borrow_date = now - timedelta(days=rng.uniform(0, days))
+        due_date = borrow_date + timedelta(days=14)
+
+        open_loan = (rng.random() < OPEN_SHARE and on_loan[b] < quantities[b]
+                     and active[u] < limits[u])
+        if open_loan:
+            on_loan[b] += 1
+            active[u] += 1
+            if rng.random() < OVERDUE_SHARE:
+                # Recent enough that the loan is only just past due
+                borrow_date = now - timedelta(days=rng.uniform(15, 45))
+                due_date = borrow_date + timedelta(days=14)
+                status = BorrowStatus.OVERDUE
+            else:
+                borrow_date = now - timedelta(days=rng.uniform(0, 13))
+                due_date = borrow_date + timedelta(days=14)
+                status = BorrowStatus.BORROWED
+            return_date = None
+        else:
+            status = BorrowStatus.RETURNED
+            return_date = borrow_date + timedelta(days=rng.uniform(1, 21))
+
+        yield {
+            'book_id': book_ids[b],
+            'user_id': user_ids[u],
+            'borrow_date': borrow_date,
+            'due_date': due_date,
+            'return_date': return_date,
+            'status': status,
+        }
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+
+    quantities = [rng.choice((1, 1, 2, 2, 3, 5, 10)) for _ in range(args.books)]
+    insert_batches(Book.__table__, book_rows(rng, args.books, quantities), args.books, 'books')
+    insert_batches(User.__table__, user_rows(rng, args.users), args.users, 'users')
+
+    book_ids = db.session.scalars(select(Book.id).order_by(Book.id)).all()
+    users = db.session.execute(select(User.id, User.max_borrow_limit).order_by(User.id)).all()
+    user_ids = [row.id for row in users]
+    limits = [row.max_borrow_limit for row in users]
+
+    on_loan = [0] * len(book_ids)
+    insert_batches(BorrowRecord.__table__,
+                   borrow_rows(rng, args.borrows, args.days, book_ids, user_ids, limits,
+                               quantities, on_loan),
+                   args.borrows, 'borrow records')
+
+    # Open loans take their copies off the shelf
+    lent = [(book_ids[i], count) for i, count in enumerate(on_loan) if count]
+    for start in range(0, len(lent), BATCH_SIZE):
+        db.session.execute(
+            update(Book.__table__)
+            .where(Book.__table__.c.id == bindparam('b_id'))
+            .values(available_quantity=Book.__table__.c.quantity - bindparam('b_lent')),
+            [{'b_id': book_id, 'b_lent': count} for book_id, count in lent[start:start + BATCH_SIZE]]
+        )
+    db.session.commit()
+    print(f'open loans: {sum(on_loan)}')
+
+
+def main():
+    args = parse_args()
+
+    class DataConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or Config.SQLALCHEMY_DATABASE_URI
+        LOG_TO_FILE = False
+        SLOW_QUERY_THRESHOLD = 0
+
+    app = create_app(DataConfig)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        # Creates only the missing tables; the app does not create any at startup
+        db.create_all()
+        if any(db.session.scalar(select(func.count()).select_from(model)) for model in
+               (Book, User, BorrowRecord)):
+            print('The database already holds data; use --reset to replace it.')
+            return 1
+        generate(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Check that the hot queries of each route are served by an index.
+
+Requests each hot page through the test client, records the SQL its view
+actually sends to the database, runs the database's EXPLAIN on every
+filtered or ordered statement and exits non-zero when any of them reads a
+table in full (``type = ALL`` on MySQL, a bare ``SCAN <table>`` on SQLite).
+Only GET pages are requested, so the data is left untouched; the write
+paths and scheduled jobs are covered by ``tests/test_query_plans.py``.
+Run it against a migrated database after schema changes:
+
+    python benchmarks/explain_hot_queries.py
+    python benchmarks/explain_hot_queries.py --database-url sqlite:///library.db
+
+Plans depend on table statistics; on a nearly empty table MySQL may
+prefer a scan, so run it against a database holding realistic data.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.db import db  # noqa: E402
+from config import Config  # noqa: E402
+
+# Pages whose queries must be served by an index, keyed by name
+HOT_PAGES = {
+    'borrows list': '/borrows/',
+    'borrows list ?status=OVERDUE': '/borrows/?status=OVERDUE',
+    'borrows list ?user_id=': '/borrows/?user_id=1',
+    'users list': '/users/',
+    'books list': '/books/',
+    'books list ?author=': '/books/?author=Tol',
+    'books list ?availability=unavailable': '/books/?availability=unavailable',
+    'users typeahead': '/borrows/api/users',
+    'users typeahead ?q=': '/borrows/api/users?q=Ann',
+    'holds list': '/holds/',
+    'dashboard popular books': '/dashboard/widgets/popular-books',
+    'dashboard recent activity': '/dashboard/widgets/recent-activity',
+}
+
+# Unfiltered, unordered statements, such as the dashboard totals, read
+# every row by design; a scan is the cheapest plan for them
+_NARROWING_CLAUSES = (' WHERE ', ' JOIN ', ' ORDER BY ')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=None, help='override SQLALCHEMY_DATABASE_URI')
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    return parser.parse_args()
+
+
+def captured_statements(client, path):
+    """(sql, parameters) of the statements the view at ``path`` sends to the primary."""
+    captured = []
+
+    def capture(conn, cursor, sql, parameters, context, executemany):
+        captured.append((sql, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} answered {response.status_code}')
+    return captured
+
+
+def explainable(sql):
+    """Whether EXPLAIN says anything useful about ``sql``."""
+    normalized = ' '.join(sql.split()).upper()
+    if not normalized.startswith(('SELECT ', 'UPDATE ', 'DELETE ')):
+        return False
+    return any(clause in normalized for clause in _NARROWING_CLAUSES)
+
+
+def explain(connection, sql, parameters):
+    """The database's plan for ``sql`` with the driver parameters it was sent with."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    return connection.exec_driver_sql(prefix + sql, parameters).all()
+
+
+def full_scans(dialect, plan):
+    """Tables the plan reads without an index.
+
+    Reading back a subquery the plan materialized, such as the union behind
+    the popular books, is not a table scan.
+    """
+    if dialect == 'mysql':
+        # Derived tables are named like <derived2>
+        return [row._mapping['table'] for row in plan
+                if row._mapping['type'] == 'ALL' and not row._mapping['table'].startswith('<')]
+    details = [row._mapping['detail'] for row in plan]
+    subqueries = {detail.split()[1] for detail in details
+                  if detail.startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+    scans = []
+    for detail in details:
+        # e.g. "SCAN books" versus "SCAN books USING INDEX ix_books_title_id"
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            table = detail.split()[1]
+            if table not in subqueries:
+                scans.append(table)
+    return scans
+
+
+def main():
+    args = parse_args()
+
+    class ExplainConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or Config.SQLALCHEMY_DATABASE_URI
+        # Every read on the primary, and every request running its queries
+        SQLALCHEMY_BINDS = {}
+        CACHE_TYPE = 'null'
+        LOG_TO_FILE = False
+
+    app = create_app(ExplainConfig)
+    client = app.test_client()
+    checked = failures = 0
+    with app.app_context(), db.engine.connect() as connection:
+        for name, path in HOT_PAGES.items():
+            for sql, parameters in captured_statements(client, path):
+                if not explainable(sql):
+                    continue
+                plan = explain(connection, sql, parameters)
+                scans = full_scans(connection.dialect.name, plan)
+                checked += 1
+                failures += bool(scans)
+                print(f'{"FULL SCAN" if scans else "ok":<9}  {name}'
+                      + (f'  ({", ".join(scans)})' if scans else ''))
+                if args.verbose or scans:
+                    print('           ', ' '.join(sql.split()))
+                    for row in plan:
+                        print('           ', tuple(row))
+
+    print(f'{failures} of {checked} queries read a table in full')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
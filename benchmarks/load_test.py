@@ -0,0 +1,368 @@
+"""Load test of the main pages and loan actions.
+
+Drives the application in-process through Flask's test client from several
+client threads and reports, per scenario, throughput, p50/p95/p99 latency,
+SQL statements per request and failures. Results are written as JSON under
+benchmarks/results/ and can be compared with an earlier run:
+
+    python benchmarks/datagen.py --database-url sqlite:///bench.db --reset
+    python benchmarks/load_test.py --database-url sqlite:///bench.db
+    python benchmarks/load_test.py --database-url sqlite:///bench.db \\
+        --compare benchmarks/results/<earlier run>.json --max-regression 20
+
+Scenarios: books, books-filtered, users, borrows, borrows-user, checkout,
+return, extend, dashboard and dashboard-widgets (one of its JSON widgets
+at random), plus borrows-all (the unfiltered loan list,
+which renders every record and is only run when named). The loan actions
+change the data, so regenerate it before comparing runs.
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, select  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.db import db  # noqa: E402
+from app.models.book import Book  # noqa: E402
+from app.models.borrow import ACTIVE_STATUSES, BorrowRecord, BorrowStatus  # noqa: E402
+from app.models.user import User  # noqa: E402
+from config import Config  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Prepared targets per stateful scenario; each is used once
+TARGETS = 2000
+
+DEFAULT_SCENARIOS = ('books', 'books-filtered', 'users', 'borrows', 'borrows-user',
+                     'checkout', 'return', 'extend', 'dashboard', 'dashboard-widgets')
+
+# JSON endpoints the dashboard page loads in parallel
+DASHBOARD_WIDGETS = ('/dashboard/widgets/summary', '/dashboard/widgets/recent-activity',
+                     '/dashboard/widgets/alerts', '/dashboard/widgets/popular-books',
+                     '/dashboard/widgets/circulation?window=12&granularity=week')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', default=list(DEFAULT_SCENARIOS),
+                        choices=list(SCENARIOS), help='scenarios to run, in order')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--seconds', type=float, default=10.0, help='run time per scenario')
+    parser.add_argument('--requests', type=int, default=None,
+                        help='stop a scenario after this many requests')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per scenario')
+    parser.add_argument('--database-url', default=None, help='override SQLALCHEMY_DATABASE_URI')
+    parser.add_argument('--output', default=None, help='results file (default: results/<time>.json)')
+    parser.add_argument('--compare', default=None, help='earlier results file to compare with')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='fail when a p95 grows by more than this percentage')
+    return parser.parse_args()
+
+
+class Scenario:
+    """A page or action requested repeatedly.
+
+    ``targets`` prepares the per-request inputs, each used once; pages
+    without state have none and ``request`` is called with None. ``request``
+    returns the method, URL and form data of one request.
+    """
+
+    def __init__(self, request, targets=None, success_location=None):
+        self.request = request
+        self.targets = targets
+        self.success_location = success_location
+
+
+def _sample(statement, limit=TARGETS):
+    return list(db.session.execute(statement.order_by(func.random()).limit(limit)).all())
+
+
+def checkout_targets():
+    """(book, user) pairs that can check out: copies on the shelf, room under the limit."""
+    active = (select(BorrowRecord.user_id, func.count(BorrowRecord.id).label('active'))
+              .where(BorrowRecord.status.in_(ACTIVE_STATUSES))
+              .group_by(BorrowRecord.user_id).subquery())
+    users = _sample(select(User.id, User.max_borrow_limit - func.coalesce(active.c.active, 0))
+                    .outerjoin(active, active.c.user_id == User.id)
+                    .where(User.max_borrow_limit > func.coalesce(active.c.active, 0)))
+    books = _sample(select(Book.id, Book.available_quantity).where(Book.available_quantity > 0))
+    slots = [user_id for user_id, room in users for _ in range(room)]
+    copies = [book_id for book_id, available in books for _ in range(available)]
+    random.shuffle(slots)
+    random.shuffle(copies)
+    return list(zip(copies, slots))
+
+
+def open_loan_targets():
+    return [row.id for row in _sample(select(BorrowRecord.id)
+                                      .where(BorrowRecord.status.in_(ACTIVE_STATUSES)))]
+
+
+def extendable_targets():
+    return [row.id for row in _sample(select(BorrowRecord.id).where(
+        BorrowRecord.status_criteria(BorrowStatus.BORROWED)))]
+
+
+def user_targets():
+    return [row.user_id for row in _sample(select(BorrowRecord.user_id))]
+
+
+def author_targets():
+    return [row.author.split()[0] for row in _sample(select(Book.author), 200)]
+
+
+SCENARIOS = {
+    'books': Scenario(lambda _: ('GET', '/books/', None)),
+    'books-filtered': Scenario(
+        lambda author: ('GET', f'/books/?availability=available&author={author}', None),
+        author_targets),
+    'users': Scenario(lambda _: ('GET', '/users/', None)),
+    'borrows': Scenario(lambda _: ('GET', '/borrows/?status=OVERDUE', None)),
+    'borrows-user': Scenario(lambda user_id: ('GET', f'/borrows/?user_id={user_id}', None),
+                             user_targets),
+    'borrows-all': Scenario(lambda _: ('GET', '/borrows/', None)),
+    'checkout': Scenario(
+        lambda pair: ('POST', '/borrows/add', {'book_id': pair[0], 'user_id': pair[1]}),
+        checkout_targets, success_location='/borrows/'),
+    'return': Scenario(lambda borrow_id: ('POST', f'/borrows/return/{borrow_id}', None),
+                       open_loan_targets),
+    'extend': Scenario(lambda borrow_id: ('POST', f'/borrows/extend/{borrow_id}', None),
+                       extendable_targets),
+    'dashboard': Scenario(lambda _: ('GET', '/dashboard/', None)),
+    'dashboard-widgets': Scenario(lambda _: ('GET', random.choice(DASHBOARD_WIDGETS), None)),
+}
+
+
+class QueryCounter:
+    """Counts statements executed by the current thread."""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def flashed_errors(client):
+    with client.session_transaction() as session:
+        flashes = session.pop('_flashes', [])
+    return [message for category, message in flashes if category == 'error']
+
+
+def failed(scenario, response, client):
+    if response.status_code >= 400:
+        return f'HTTP {response.status_code}'
+    if scenario.success_location and not response.location.endswith(scenario.success_location):
+        return f'redirected to {response.location}'
+    errors = flashed_errors(client)
+    return errors[0] if errors else None
+
+
+def run_scenario(app, scenario, targets, args, counter):
+    """Run one scenario from ``args.threads`` clients and collect raw samples."""
+    work = queue.Queue()
+    for target in targets if targets is not None else ():
+        work.put(target)
+    remaining = [args.requests]
+    samples = []
+    failures = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def next_target():
+        with lock:
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    raise StopIteration
+                remaining[0] -= 1
+        if targets is None:
+            return None
+        try:
+            return work.get_nowait()
+        except queue.Empty:
+            raise StopIteration from None
+
+    def client_thread():
+        client = app.test_client()
+        local = []
+        while time.monotonic() < deadline:
+            try:
+                target = next_target()
+            except StopIteration:
+                break
+            method, url, data = scenario.request(target)
+            counter.reset()
+            started = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            elapsed = time.perf_counter() - started
+            local.append((elapsed, counter.count))
+            reason = failed(scenario, response, client)
+            if reason:
+                with lock:
+                    failures[reason] = failures.get(reason, 0) + 1
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client_thread) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, failures, time.perf_counter() - started
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(samples, failures, elapsed):
+    latencies = sorted(elapsed_s * 1000 for elapsed_s, _ in samples)
+    queries = [count for _, count in samples]
+    if not latencies:
+        return {'requests': 0, 'failures': failures}
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'max_queries': max(queries),
+        'failures': failures,
+    }
+
+
+def print_result(name, result):
+    if not result['requests']:
+        print(f'{name:<15} no requests completed {result.get("skipped", "")}')
+        return
+    failures = sum(result['failures'].values())
+    print(f'{name:<15} {result["throughput_rps"]:>8.1f} req/s  '
+          f'p50 {result["p50_ms"]:8.2f}  p95 {result["p95_ms"]:8.2f}  p99 {result["p99_ms"]:8.2f} ms  '
+          f'{result["queries_per_request"]:6.1f} queries/req  {failures} failed')
+    for reason, count in result['failures'].items():
+        print(f'{"":<15} {count} x {reason}')
+
+
+def database_summary():
+    counts = {model.__tablename__: db.session.scalar(select(func.count()).select_from(model))
+              for model in (Book, User, BorrowRecord)}
+    counts['dialect'] = db.engine.dialect.name
+    return counts
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, max_regression):
+    """Print p95 changes against an earlier run; return the regressed scenarios."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['scenarios']
+    regressed = []
+    print(f'\nCompared with {baseline_path}:')
+    for name, result in results.items():
+        before = baseline.get(name, {}).get('p95_ms')
+        after = result.get('p95_ms')
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        flag = ''
+        if max_regression is not None and change > max_regression:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<15} p95 {before:8.2f} -> {after:8.2f} ms ({change:+.1f}%){flag}')
+    return regressed
+
+
+def main():
+    args = parse_args()
+
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or Config.SQLALCHEMY_DATABASE_URI
+        SESSION_COOKIE_SECURE = False
+        LOG_TO_FILE = False
+        SLOW_QUERY_THRESHOLD = 0
+
+    app = create_app(LoadTestConfig)
+    results = {}
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        database = database_summary()
+        print(f'{database["dialect"]}: {database["books"]} books, {database["users"]} users, '
+              f'{database["borrow_records"]} borrow records, {args.threads} threads\n')
+
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            targets = scenario.targets() if scenario.targets else None
+            db.session.remove()
+
+            if targets is not None and not targets:
+                results[name] = {'requests': 0, 'failures': {}, 'skipped': '(no data to act on)'}
+                print_result(name, results[name])
+                continue
+
+            # Warm caches and connections with the read-only scenarios only
+            if targets is None:
+                client = app.test_client()
+                url = scenario.request(None)[1]
+                if client.get(url).status_code == 404:
+                    results[name] = {'requests': 0, 'failures': {}, 'skipped': '(route not found)'}
+                    print_result(name, results[name])
+                    continue
+                for _ in range(args.warmup):
+                    client.get(url)
+
+            samples, failures, elapsed = run_scenario(app, scenario, targets, args, counter)
+            results[name] = summarize(samples, failures, elapsed)
+            print_result(name, results[name])
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{database["dialect"]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'database': database,
+            'threads': args.threads,
+            'seconds': args.seconds,
+            'scenarios': results,
+        }, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        if compare(results, args.compare, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
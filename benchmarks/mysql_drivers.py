@@ -0,0 +1,126 @@
+"""MySQL driver benchmark: PyMySQL against mysql-connector-python.
+
+Runs the same workload through each driver with the application's pool
+settings and reports throughput, latency percentiles and pool wait times:
+
+* ping: ``SELECT 1`` round trips (driver and protocol overhead)
+* lookup: primary-key lookups of random books (typical page query)
+* scan: fetching ``--rows`` book rows at once (list pages and exports)
+
+Connects with the usual MYSQL_* variables, or the host/user/database of
+--database-url. The books table must exist and should hold some rows.
+
+    python benchmarks/mysql_drivers.py --threads 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app.pool import TimedQueuePool, pool_status  # noqa: E402
+from config import Config, MYSQL_DRIVERS  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drivers', nargs='+', default=list(MYSQL_DRIVERS),
+                        choices=list(MYSQL_DRIVERS), help='drivers to compare')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--seconds', type=float, default=5.0, help='run time per workload')
+    parser.add_argument('--rows', type=int, default=1000, help='rows fetched by the scan workload')
+    parser.add_argument('--database-url', default=None, help='override SQLALCHEMY_DATABASE_URI')
+    return parser.parse_args()
+
+
+def engine_for(driver, base_url):
+    url = make_url(base_url).set(drivername=MYSQL_DRIVERS[driver])
+    options = dict(Config.SQLALCHEMY_ENGINE_OPTIONS, poolclass=TimedQueuePool)
+    return create_engine(url, **options)
+
+
+def workloads(rows, max_id):
+    def ping(connection):
+        connection.execute(text('SELECT 1')).scalar()
+
+    def lookup(connection):
+        connection.execute(text('SELECT id, isbn, title, author, available_quantity '
+                                'FROM books WHERE id = :id'),
+                           {'id': random.randint(1, max_id)}).first()
+
+    def scan(connection):
+        connection.execute(text('SELECT id, isbn, title, author, publisher, publication_year, '
+                                'quantity, available_quantity FROM books ORDER BY id LIMIT :n'),
+                           {'n': rows}).all()
+
+    return {'ping': ping, 'lookup': lookup, 'scan': scan}
+
+
+def run(engine, operation, threads, seconds):
+    """Run ``operation`` from ``threads`` clients; return per-call latencies in ms."""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        local = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            # A connection per call, as a request would take one from the pool
+            with engine.connect() as connection:
+                operation(connection)
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies
+
+
+def report(driver, name, latencies, seconds, status):
+    if not latencies:
+        print(f'{driver:<15} {name:<7} no completed calls')
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1] if len(ordered) > 1 else ordered[0]
+    print(f'{driver:<15} {name:<7} {len(latencies) / seconds:>9.0f} ops/s  '
+          f'p50 {statistics.median(ordered):7.2f} ms  p95 {p95:7.2f} ms  '
+          f'pool wait avg {status.get("wait_seconds_avg", 0) * 1000:.3f} ms '
+          f'max {status.get("wait_seconds_max", 0) * 1000:.3f} ms')
+
+
+def main():
+    args = parse_args()
+    base_url = args.database_url or Config.SQLALCHEMY_DATABASE_URI
+
+    for driver in args.drivers:
+        try:
+            engine = engine_for(driver, base_url)
+            with engine.connect() as connection:
+                max_id = connection.execute(text('SELECT MAX(id) FROM books')).scalar() or 1
+            engine.dispose()
+        except ImportError as e:
+            print(f'{driver:<15} skipped, driver not installed ({e})')
+            continue
+
+        for name, operation in workloads(args.rows, max_id).items():
+            # A fresh engine per workload so pool statistics are not mixed
+            engine = engine_for(driver, base_url)
+            latencies = run(engine, operation, args.threads, args.seconds)
+            report(driver, name, latencies, args.seconds, pool_status(engine))
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
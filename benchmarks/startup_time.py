@@ -0,0 +1,129 @@
+"""Startup benchmark: how long a fresh worker takes to serve its first request.
+
+Starts the application in new interpreters, as a recycled or newly spawned
+worker would, and reports:
+
+* import: importing the application package and its dependencies
+* create: ``create_app`` (configuration, extensions, blueprints)
+* first request: a ``GET /health`` through the test client, which opens the
+  first database connection
+* total: wall-clock time from spawning the interpreter to the response
+
+One extra run under ``python -X importtime`` lists the modules that cost
+the most to import. Exits non-zero when the median total exceeds --budget
+milliseconds:
+
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --database-url sqlite:///library.db --runs 10 --budget 600
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median time from spawn to first response allowed by default, in ms
+DEFAULT_BUDGET_MS = 800
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='interpreters started')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS,
+                        help='largest acceptable median total, in milliseconds')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports listed')
+    parser.add_argument('--database-url', default=None, help='override SQLALCHEMY_DATABASE_URI')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def child(database_url):
+    """Start the app in this interpreter and print the phase timings as JSON."""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from config import Config
+    from app import create_app
+
+    class StartupConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url or Config.SQLALCHEMY_DATABASE_URI
+        LOG_TO_FILE = False
+
+    imported = time.perf_counter()
+    app = create_app(StartupConfig)
+    created = time.perf_counter()
+    status = app.test_client().get('/health').status_code
+    served = time.perf_counter()
+    print(json.dumps({
+        'import': imported - started,
+        'create': created - imported,
+        'first request': served - created,
+        'status': status,
+    }), flush=True)
+
+
+def spawn(args, importtime=False):
+    """Run one child; returns its timings with the wall-clock total and stderr."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    command += [os.path.abspath(__file__), '--child']
+    if args.database_url:
+        command += ['--database-url', args.database_url]
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    total = time.perf_counter() - started
+    _, stderr = process.communicate()
+    if not line:
+        raise RuntimeError(f'startup failed:\n{stderr}')
+    timings = json.loads(line)
+    timings['total'] = total
+    return timings, stderr
+
+
+def slowest_imports(stderr, top):
+    """(self, cumulative, module) for the modules with the most own import time, in µs."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(own), int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child(args.database_url)
+        return
+
+    _, stderr = spawn(args, importtime=True)
+    print(f'Slowest imports (python -X importtime), top {args.top}:')
+    print(f'{"self ms":>9} {"cumul. ms":>10}  module')
+    for own, cumulative, name in slowest_imports(stderr, args.top):
+        print(f'{own / 1000:9.1f} {cumulative / 1000:10.1f}  {name}')
+
+    runs = [spawn(args)[0] for _ in range(args.runs)]
+    if any(run['status'] != 200 for run in runs):
+        print(f'warning: /health answered {runs[-1]["status"]}; is the database reachable?')
+
+    print(f'\nStartup over {args.runs} runs (ms):')
+    print(f'{"phase":<14} {"median":>8} {"max":>8}')
+    for phase in ('import', 'create', 'first request', 'total'):
+        values = [run[phase] * 1000 for run in runs]
+        print(f'{phase:<14} {statistics.median(values):8.1f} {max(values):8.1f}')
+
+    median_total = statistics.median(run['total'] * 1000 for run in runs)
+    within = median_total <= args.budget
+    print(f'\nMedian time to first request {median_total:.0f} ms, budget {args.budget:.0f} ms: '
+          + ('ok' if within else 'OVER BUDGET'))
+    sys.exit(0 if within else 1)
+
+
+if __name__ == '__main__':
+    main()
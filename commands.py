@@ -1,19 +1,184 @@
 # commands.py
+import csv
+from datetime import timedelta
 import click 
+from flask import current_app
 from flask.cli import with_appcontext
+from sqlalchemy import inspect
 from app.db import db
 from app.models.user import User, UserType
+from app.models.borrow import BorrowRecord
+from app.rollup import refresh_circulation
+from app.cache import cache
+from app.loans import bulk_checkout, bulk_return, expire_holds, HOLD_PICKUP_PERIOD
+from app.importer import FORMATS, IMPORT_BATCH_SIZE, detect_format, import_books, import_users
+from app.search import reload_book_index
+from app.availability import reload_availability
+from app.exporter import EXPORTS, FORMATS as EXPORT_FORMATS, iter_export
 
 @click.command('init-db')
 @with_appcontext
 def init_db_command():
-    """Initialize database tables."""
+    """Initialize database tables.
+
+    The application does not create tables at startup; run this once for a
+    new database. Its tables match the newest migration, which is recorded so
+    that ``flask db upgrade`` later applies only newer ones. A database that
+    already has tables only gets the missing ones; upgrade it with
+    ``flask db upgrade``.
+    """
+    # Imported here, like in create_app, so web workers never load Alembic
+    from flask_migrate import stamp # type: ignore
     try:
+        new_database = not inspect(db.engine).get_table_names()
         db.create_all()
+        if new_database:
+            stamp()
         click.echo('Initialized database.')
     except Exception as e:
         click.echo(f'Error initializing database: {e}')
 
+@click.command('refresh-circulation')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Recompute from this day (YYYY-MM-DD) instead of the last rolled-up day.')
+@click.option('--full', is_flag=True, help='Rebuild the whole rollup from the first borrow.')
+@with_appcontext
+def refresh_circulation_command(since, full):
+    """Update the daily circulation rollup used by the dashboard."""
+    try:
+        start = since.date() if since else None
+        if full:
+            first = db.session.query(db.func.min(BorrowRecord.borrow_date)).scalar()
+            start = first.date() if first else None
+        fee_per_day = current_app.config.get('LATE_FEE_PER_DAY', 1.00)
+        start, end, rows = refresh_circulation(start=start, fee_per_day=fee_per_day)
+        cache.invalidate('borrows')
+        click.echo(f'Rolled up {start} to {end}: {rows} rows written.')
+    except Exception as e:
+        click.echo(f'Error refreshing circulation rollup: {e}')
+
+@click.command('sweep-overdue')
+@with_appcontext
+def sweep_overdue_command():
+    """Mark past-due loans as overdue in a single UPDATE."""
+    try:
+        updated = BorrowRecord.mark_overdue()
+        cache.invalidate('borrows')
+        click.echo(f'Marked {updated} borrow records as overdue.')
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f'Error sweeping overdue borrows: {e}')
+
+@click.command('sweep-holds')
+@with_appcontext
+def sweep_holds_command():
+    """Expire ready holds not picked up in time and pass their copies on."""
+    try:
+        pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+        expired, readied = expire_holds(hold_pickup=pickup)
+        cache.invalidate('books')
+        click.echo(f'Expired {expired} holds; {readied} copies passed to the next in line.')
+    except Exception as e:
+        click.echo(f'Error sweeping holds: {e}')
+
+@click.command('bulk-return')
+@click.argument('source', type=click.File('r'))
+@with_appcontext
+def bulk_return_command(source):
+    """Return the borrow IDs listed in SOURCE (one per line, '-' for stdin)."""
+    try:
+        borrow_ids = [int(line) for line in (l.strip() for l in source) if line]
+        fee_per_day = current_app.config.get('LATE_FEE_PER_DAY', 1.00)
+        pickup = current_app.config.get('HOLD_PICKUP_PERIOD', HOLD_PICKUP_PERIOD)
+        results = bulk_return(borrow_ids, fee_per_day, hold_pickup=pickup)
+        cache.invalidate('books', 'borrows')
+        for result in results:
+            fee = f" late fee {result['late_fee']:.2f}" if result['late_fee'] else ''
+            hold = f" kept for hold {result['hold_id']}" if result.get('hold_id') else ''
+            click.echo(f"{result['borrow_id']}: {result['status']}{fee}{hold}")
+        returned = sum(1 for r in results if r['status'] == 'returned')
+        click.echo(f'Returned {returned} of {len(results)} loans.')
+    except ValueError as e:
+        click.echo(f'Invalid borrow ID: {e}')
+    except Exception as e:
+        click.echo(f'Error processing bulk return: {e}')
+
+@click.command('bulk-checkout')
+@click.argument('source', type=click.File('r'))
+@with_appcontext
+def bulk_checkout_command(source):
+    """Check out books from a CSV of isbn,user_id rows ('-' for stdin)."""
+    try:
+        items = [{'isbn': row[0].strip(), 'user_id': int(row[1])}
+                 for row in csv.reader(source) if row and row[0].strip() != 'isbn']
+        duration = current_app.config.get('BORROW_DURATION', timedelta(days=14))
+        results = bulk_checkout(items, duration)
+        cache.invalidate('books', 'borrows')
+        for result in results:
+            click.echo(f"{result['isbn']} -> user {result['user_id']}: {result['status']}")
+        borrowed = sum(1 for r in results if r['status'] == 'borrowed')
+        click.echo(f'Checked out {borrowed} of {len(results)} items.')
+    except (ValueError, IndexError) as e:
+        click.echo(f'Invalid input row: {e}')
+    except Exception as e:
+        click.echo(f'Error processing bulk checkout: {e}')
+
+def _report_import(report, label):
+    click.echo(f'{label}: {report.summary()}')
+    for line, message in report.errors:
+        click.echo(f'  line {line}: {message}')
+    if report.rejected > len(report.errors):
+        click.echo(f'  ... {report.rejected - len(report.errors)} more rejected rows')
+
+@click.command('import-books')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Input format; guessed from the file name by default.')
+@click.option('--batch-size', type=int, default=IMPORT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_books_command(source, fmt, batch_size):
+    """Import books from a CSV or NDJSON file ('-' for stdin)."""
+    try:
+        report = import_books(source, fmt or detect_format(source.name), batch_size)
+        reload_book_index()
+        reload_availability()
+        cache.invalidate('books')
+        _report_import(report, 'Imported books')
+    except Exception as e:
+        click.echo(f'Error importing books: {e}')
+
+@click.command('import-users')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='Input format; guessed from the file name by default.')
+@click.option('--batch-size', type=int, default=IMPORT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_users_command(source, fmt, batch_size):
+    """Import users from a CSV or NDJSON file ('-' for stdin)."""
+    try:
+        report = import_users(source, fmt or detect_format(source.name), batch_size)
+        cache.invalidate('users')
+        _report_import(report, 'Imported users')
+    except Exception as e:
+        click.echo(f'Error importing users: {e}')
+
+@click.command('export')
+@click.argument('name', type=click.Choice(list(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='csv', show_default=True)
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Borrow records only: first borrow day to include.')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Borrow records only: day after the last one to include.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default stdout).')
+@with_appcontext
+def export_command(name, fmt, since, until, output):
+    """Export books, users or borrow_records as CSV or NDJSON."""
+    try:
+        for chunk in iter_export(name, fmt, since, until):
+            output.write(chunk)
+    except Exception as e:
+        click.echo(f'Error exporting {name}: {e}', err=True)
+
 @click.command('add-test-user')
 @with_appcontext
 def add_test_user():
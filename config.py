@@ -1,12 +1,43 @@
 from dataclasses import dataclass
 from datetime import timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 import os
 from pathlib import Path
 
 from dotenv import load_dotenv # type: ignore
 load_dotenv()
 
+# SQLAlchemy dialect+driver for each supported MySQL driver
+MYSQL_DRIVERS = {
+    'pymysql': 'mysql+pymysql',
+    'mysqlconnector': 'mysql+mysqlconnector',
+}
+
+def mysql_dialect(driver: str) -> str:
+    """SQLAlchemy dialect+driver for a MYSQL_DRIVER value."""
+    try:
+        return MYSQL_DRIVERS[driver]
+    except KeyError:
+        raise ValueError(f"MYSQL_DRIVER must be one of {', '.join(MYSQL_DRIVERS)}, "
+                         f"not {driver!r}") from None
+
+class lazy_setting:
+    """Setting computed from its class when first read rather than at import.
+
+    ``app.config.from_object`` reads it like a plain attribute. Each class
+    gets its own value, so a subclass overriding the settings it is derived
+    from sees the result.
+    """
+
+    def __init__(self, compute: Callable[[type], Any]) -> None:
+        self.compute = compute
+        self._values: Dict[type, Any] = {}
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if owner not in self._values:
+            self._values[owner] = self.compute(owner)
+        return self._values[owner]
+
 @dataclass
 class Config:
     """Application configuration using Python 3.12 features and type hints."""
@@ -15,22 +46,83 @@ class Config:
     MYSQL_USER: str = os.getenv('MYSQL_USER')
     MYSQL_PASSWORD: str = os.getenv('MYSQL_PASSWORD')
     MYSQL_DB: str = os.getenv('MYSQL_DB')
+    # 'pymysql' (pure Python) or 'mysqlconnector' (C extension when installed)
+    MYSQL_DRIVER: str = os.getenv('MYSQL_DRIVER', 'pymysql')
     
-    # SQLAlchemy configuration
-    SQLALCHEMY_DATABASE_URI: str = (
-        f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
-    )
+    # SQLAlchemy configuration, built on first read so that configurations
+    # naming their own database never need the MySQL settings
+    @lazy_setting
+    def SQLALCHEMY_DATABASE_URI(cls) -> str:
+        return f'{mysql_dialect(cls.MYSQL_DRIVER)}://{cls.MYSQL_USER}:{cls.MYSQL_PASSWORD}@{cls.MYSQL_HOST}/{cls.MYSQL_DB}'
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     
+    # Connection pool, per worker process. Connections are recycled before
+    # MySQL's idle timeout closes them and pinged on checkout, so a stale
+    # connection is replaced instead of failing with "server has gone away".
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT: int = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE: int = int(os.getenv('DB_POOL_RECYCLE', 280))
+    # Not a dataclass field: dict defaults must not be shared between instances
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+    
+    # Read replicas, as comma-separated URIs. List pages and the dashboard
+    # read from them; a client that writes reads from the primary for
+    # DB_REPLICA_STICKY_SECONDS, longer than the replicas are expected to lag.
+    DB_REPLICA_STICKY_SECONDS: int = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+    # Not a dataclass field, like SQLALCHEMY_ENGINE_OPTIONS
+    SQLALCHEMY_BINDS = {
+        f'replica_{number}': uri.strip()
+        for number, uri in enumerate(filter(str.strip, os.getenv('DB_REPLICA_URIS', '').split(',')), 1)
+    }
+    
     # Application configuration
-    SECRET_KEY: str = os.getenv('SECRET_KEY', os.urandom(32).hex())
+    # Random per process unless set, which signs sessions out on restart
+    @lazy_setting
+    def SECRET_KEY(cls) -> str:
+        return os.getenv('SECRET_KEY') or os.urandom(32).hex()
     BORROW_DURATION: timedelta = timedelta(days=14)
+    # How long a returned copy is kept aside for the hold at the head of the queue
+    HOLD_PICKUP_PERIOD: timedelta = timedelta(days=int(os.getenv('HOLD_PICKUP_DAYS', 3)))
+    BOOKS_PER_PAGE: int = 50
     
     # Security configuration
     SESSION_COOKIE_SECURE: bool = True
     SESSION_COOKIE_HTTPONLY: bool = True
     SESSION_COOKIE_SAMESITE: str = 'Lax'
     
+    # Logging: records are queued and written by a background thread
+    LOG_FILE: Path = Path(os.getenv('LOG_FILE', 'logs/library.log'))
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'json')  # 'json' or 'text'
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 10
+    
+    # Diagnostics: statements slower than this (seconds, 0 disables) are
+    # logged; requests with the profiler header are profiled when enabled
+    SLOW_QUERY_THRESHOLD: float = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.5))
+    PROFILER_ENABLED: bool = os.getenv('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILER_HEADER: str = 'X-Profile'
+    
+    # Cache configuration ('null', 'lru' or 'filesystem')
+    CACHE_TYPE: str = os.getenv('CACHE_TYPE', 'lru')
+    CACHE_DEFAULT_TTL: int = 60
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_DIR: Path = Path(os.getenv('CACHE_DIR', 'cache'))
+    # Catalogue header totals are refreshed this often (seconds), not on every loan
+    BOOK_STATS_TTL: int = 300
+    
+    # Availability API: each worker's snapshot picks up other workers'
+    # changes this often (seconds) and is rebuilt in full this often
+    AVAILABILITY_REFRESH_SECONDS: float = float(os.getenv('AVAILABILITY_REFRESH_SECONDS', 2))
+    AVAILABILITY_RELOAD_SECONDS: float = float(os.getenv('AVAILABILITY_RELOAD_SECONDS', 300))
+    
     # Upload configuration
     MAX_CONTENT_LENGTH: int = 16 * 1024 * 1024
     UPLOAD_FOLDER: Path = Path(os.getenv('UPLOAD_FOLDER', 'uploads'))
\ No newline at end of file
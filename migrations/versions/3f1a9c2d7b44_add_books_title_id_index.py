@@ -0,0 +1,24 @@
+"""add_books_title_id_index
+
+Revision ID: 3f1a9c2d7b44
+Revises: 8caa50f0f791
+Create Date: 2026-10-18 09:12:04.318520
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7b44'
+down_revision = '8caa50f0f791'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Composite index used by the keyset-paginated book catalogue
+    op.create_index('ix_books_title_id', 'books', ['title', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_books_title_id', table_name='books')
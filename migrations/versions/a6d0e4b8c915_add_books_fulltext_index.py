@@ -0,0 +1,29 @@
+"""add_books_fulltext_index
+
+Revision ID: a6d0e4b8c915
+Revises: 3f1a9c2d7b44
+Create Date: 2026-10-18 10:41:27.902113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d0e4b8c915'
+down_revision = '3f1a9c2d7b44'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT is MySQL-only; other backends search with the in-process index
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.create_index('ft_books_search', 'books', ['title', 'author', 'publisher'],
+                    mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ft_books_search', table_name='books')
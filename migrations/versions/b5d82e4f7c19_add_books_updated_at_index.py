@@ -0,0 +1,25 @@
+"""add_books_updated_at_index
+
+Revision ID: b5d82e4f7c19
+Revises: f1c7a93e2b58
+Create Date: 2026-10-18 17:24:05.913652
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d82e4f7c19'
+down_revision = 'f1c7a93e2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Incremental refresh of the availability snapshot: books changed since
+    # the newest change it has seen
+    op.create_index('ix_books_updated_at', 'books', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_books_updated_at', table_name='books')
@@ -0,0 +1,26 @@
+"""add_borrow_date_indexes
+
+Revision ID: c2e7f15a0b63
+Revises: a6d0e4b8c915
+Create Date: 2026-10-18 12:05:51.640277
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e7f15a0b63'
+down_revision = 'a6d0e4b8c915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Range scans for the dashboard circulation statistics
+    op.create_index('ix_borrow_records_borrow_date', 'borrow_records', ['borrow_date'])
+    op.create_index('ix_borrow_records_return_date', 'borrow_records', ['return_date'])
+
+
+def downgrade():
+    op.drop_index('ix_borrow_records_return_date', table_name='borrow_records')
+    op.drop_index('ix_borrow_records_borrow_date', table_name='borrow_records')
@@ -0,0 +1,41 @@
+"""add_circulation_daily_rollup
+
+Revision ID: d4b19e6c3a27
+Revises: c2e7f15a0b63
+Create Date: 2026-10-18 13:26:09.114852
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b19e6c3a27'
+down_revision = 'c2e7f15a0b63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'circulation_daily',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('day', sa.Date, nullable=False),
+        sa.Column('user_type', sa.Enum('STUDENT', 'FACULTY', 'STAFF', name='usertype'),
+                  nullable=False),
+        sa.Column('book_id', sa.Integer,
+                  sa.ForeignKey('books.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('borrows', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('returns', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('overdues', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('late_fees', sa.Numeric(10, 2), nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime, nullable=False,
+                  server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.UniqueConstraint('day', 'user_type', 'book_id', name='uq_circulation_daily_key'),
+    )
+    op.create_index('ix_circulation_daily_book_id', 'circulation_daily', ['book_id'])
+
+
+def downgrade():
+    op.drop_index('ix_circulation_daily_book_id', table_name='circulation_daily')
+    op.drop_table('circulation_daily')
@@ -0,0 +1,48 @@
+"""add_query_pattern_indexes
+
+Revision ID: e8a3f2c61d05
+Revises: d4b19e6c3a27
+Create Date: 2026-10-18 15:02:11.408913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3f2c61d05'
+down_revision = 'd4b19e6c3a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Overdue sweep, overdue/due-today counts and the status filter of the
+    # borrow list: status equality followed by a due_date range
+    op.create_index('ix_borrow_records_status_due_date', 'borrow_records',
+                    ['status', 'due_date'])
+    # Active loans per user: checkout limits, user list counts, can_borrow
+    op.create_index('ix_borrow_records_user_id_status', 'borrow_records',
+                    ['user_id', 'status'])
+
+    # User list and typeahead, ordered by (last_name, first_name, id)
+    op.create_index('ix_users_last_name_first_name_id', 'users',
+                    ['last_name', 'first_name', 'id'])
+    # First-name prefixes in the typeahead
+    op.create_index('ix_users_first_name', 'users', ['first_name'])
+    # Per-type user counts
+    op.create_index('ix_users_user_type', 'users', ['user_type'])
+
+    # Low-stock and availability filters
+    op.create_index('ix_books_available_quantity', 'books', ['available_quantity'])
+    # Author prefix filter of the catalogue
+    op.create_index('ix_books_author', 'books', ['author'])
+
+
+def downgrade():
+    op.drop_index('ix_books_author', table_name='books')
+    op.drop_index('ix_books_available_quantity', table_name='books')
+    op.drop_index('ix_users_user_type', table_name='users')
+    op.drop_index('ix_users_first_name', table_name='users')
+    op.drop_index('ix_users_last_name_first_name_id', table_name='users')
+    op.drop_index('ix_borrow_records_user_id_status', table_name='borrow_records')
+    op.drop_index('ix_borrow_records_status_due_date', table_name='borrow_records')
@@ -0,0 +1,45 @@
+"""add_holds
+
+Revision ID: f1c7a93e2b58
+Revises: e8a3f2c61d05
+Create Date: 2026-10-18 16:11:42.530217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7a93e2b58'
+down_revision = 'e8a3f2c61d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'holds',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('book_id', sa.Integer,
+                  sa.ForeignKey('books.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_id', sa.Integer,
+                  sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status', sa.Enum('WAITING', 'READY', 'FULFILLED', 'CANCELLED', 'EXPIRED',
+                                    name='holdstatus'), nullable=False),
+        sa.Column('priority', sa.SmallInteger, nullable=False),
+        sa.Column('requested_at', sa.DateTime, nullable=False),
+        sa.Column('ready_at', sa.DateTime),
+        sa.Column('expires_at', sa.DateTime),
+        sa.Column('closed_at', sa.DateTime),
+    )
+    op.create_index('ix_holds_book_id_status_priority_requested_at', 'holds',
+                    ['book_id', 'status', 'priority', 'requested_at', 'id'])
+    op.create_index('ix_holds_user_id_status', 'holds', ['user_id', 'status'])
+    op.create_index('ix_holds_status_expires_at', 'holds', ['status', 'expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_holds_status_expires_at', table_name='holds')
+    op.drop_index('ix_holds_user_id_status', table_name='holds')
+    op.drop_index('ix_holds_book_id_status_priority_requested_at', table_name='holds')
+    op.drop_table('holds')
@@ -0,0 +1,105 @@
+# tests/conftest.py
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.db import db as _db
+from app.models.book import Book
+from app.models.borrow import BorrowRecord, BorrowStatus
+from app.models.user import User, UserType
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = 'test'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    # No replicas and no caching, so every request runs its queries
+    SQLALCHEMY_BINDS = {}
+    CACHE_TYPE = 'null'
+    LOG_TO_FILE = False
+    SESSION_COOKIE_SECURE = False
+
+
+class QueryRecorder:
+    """Records the statements sent to the database while active."""
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.statements: List[Tuple[str, object]] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self) -> 'QueryRecorder':
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def app():
+    """Application on a fresh in-memory SQLite database."""
+    app = create_app(TestConfig)
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def record_queries(db):
+    """Context manager recording the statements run inside it, e.g.
+
+        with record_queries() as queries:
+            client.get('/users/')
+        assert queries.count == 2
+    """
+    @contextmanager
+    def recorder() -> Iterator[QueryRecorder]:
+        with QueryRecorder(db.engine) as queries:
+            yield queries
+    return recorder
+
+
+@pytest.fixture
+def library(db):
+    """A few books and users, each user with an active, an overdue and a returned loan."""
+    now = datetime.utcnow()
+    books = [Book(isbn=f'97800000000{number:02d}', title=f'Book {number}', author=f'Author {number}',
+                  publisher='Press', publication_year=2000 + number, quantity=5, available_quantity=3)
+             for number in range(5)]
+    users = [User(first_name=f'First{number}', last_name=f'Last{number}', email=f'user{number}@example.com',
+                  user_type=UserType.STUDENT if number % 2 else UserType.FACULTY)
+             for number in range(5)]
+    db.session.add_all(books + users)
+    db.session.flush()
+
+    for user, book in zip(users, books):
+        db.session.add_all([
+            BorrowRecord(book_id=book.id, user_id=user.id, borrow_date=now - timedelta(days=3),
+                         due_date=now + timedelta(days=11), status=BorrowStatus.BORROWED),
+            BorrowRecord(book_id=book.id, user_id=user.id, borrow_date=now - timedelta(days=20),
+                         due_date=now - timedelta(days=6), status=BorrowStatus.BORROWED),
+            BorrowRecord(book_id=book.id, user_id=user.id, borrow_date=now - timedelta(days=40),
+                         due_date=now - timedelta(days=26), return_date=now - timedelta(days=30),
+                         status=BorrowStatus.RETURNED),
+        ])
+    db.session.commit()
+    return {'books': books, 'users': users}
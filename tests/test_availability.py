@@ -0,0 +1,49 @@
+# tests/test_availability.py
+from datetime import timedelta
+
+from app.availability import MAX_BATCH
+from app.loans import checkout
+
+
+def test_unchanged_answer_is_a_304(client, db, library, record_queries):
+    first, second = (book.isbn for book in library['books'][:2])
+    response = client.get(f'/api/availability?isbn={first},{second}&isbn=9789999999999')
+    assert response.status_code == 200
+    assert response.get_json() == {'availability': {first: [3, 5], second: [3, 5]},
+                                   'unknown': ['9789999999999']}
+    etag = response.headers['ETag']
+
+    # Answered from the snapshot, without touching the database
+    with record_queries() as queries:
+        again = client.post('/api/availability', json={'isbns': [first, second, '9789999999999']},
+                            headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert queries.count == 0
+
+    # A checkout changes the answer, and so its tag
+    checkout(library['books'][0].id, library['users'][0].id, timedelta(days=14))
+    changed = client.get(f'/api/availability?isbn={first},{second}&isbn=9789999999999',
+                         headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['availability'][first] == [2, 5]
+    assert changed.headers['ETag'] != etag
+
+
+def test_batch_limit(client, db, library):
+    isbns = [f'979{number:010d}' for number in range(MAX_BATCH)]
+    response = client.post('/api/availability', json={'isbns': isbns})
+    assert response.status_code == 200
+    assert len(response.get_json()['unknown']) == MAX_BATCH
+
+    too_many = client.post('/api/availability', json={'isbns': isbns + ['9781111111111']})
+    assert too_many.status_code == 400
+    assert client.post('/api/availability', json={'isbns': 'not a list'}).status_code == 400
+    assert client.get('/api/availability').status_code == 400
+
+
+def test_single_isbn(client, db, library):
+    book = library['books'][0]
+    response = client.get(f'/api/availability/{book.isbn}')
+    assert response.get_json() == {'isbn': book.isbn, 'available': 3, 'quantity': 5}
+    assert client.get('/api/availability/9789999999999').status_code == 404
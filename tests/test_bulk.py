@@ -0,0 +1,55 @@
+# tests/test_bulk.py
+from app.models.book import Book
+from app.models.borrow import BorrowRecord, BorrowStatus
+
+
+def test_bulk_return_reports_each_item(client, db, library):
+    book = library['books'][0]
+    active, overdue, returned = db.session.query(BorrowRecord.id).filter_by(
+        book_id=book.id).order_by(BorrowRecord.id).all()
+    available_before = book.available_quantity
+
+    response = client.post('/borrows/bulk/return', json={
+        'borrow_ids': [active.id, returned.id, overdue.id, 999999, active.id]
+    })
+    assert response.status_code == 200
+    report = response.get_json()
+    assert [(item['borrow_id'], item['status']) for item in report['results']] == [
+        (active.id, 'returned'),
+        (returned.id, 'already_returned'),
+        (overdue.id, 'returned'),
+        (999999, 'not_found'),
+    ]
+    assert report['returned'] == 2
+    # Six days late at the default fee of 1.00 a day
+    assert report['total_late_fees'] == 6.0
+
+    db.session.expire_all()
+    assert db.session.get(Book, book.id).available_quantity == available_before + 2
+    assert db.session.get(BorrowRecord, overdue.id).status == BorrowStatus.RETURNED
+
+    # Returning the same loans again puts nothing back
+    again = client.post('/borrows/bulk/return', json={'borrow_ids': [active.id, overdue.id]})
+    assert again.get_json()['returned'] == 0
+    db.session.expire_all()
+    assert db.session.get(Book, book.id).available_quantity == available_before + 2
+
+
+def test_bulk_return_rejects_bad_payloads(client, db):
+    assert client.post('/borrows/bulk/return', json={'borrow_ids': []}).status_code == 400
+    assert client.post('/borrows/bulk/return', json={'borrow_ids': ['1']}).status_code == 400
+    assert client.post('/borrows/bulk/return', json={'borrow_ids': list(range(1001))}).status_code == 400
+
+
+def test_bulk_checkout_reports_each_item(client, db, library):
+    book, user = library['books'][1], library['users'][1]
+    response = client.post('/borrows/bulk/checkout', json={'items': [
+        {'user_id': user.id, 'isbn': book.isbn},
+        {'user_id': user.id, 'book_id': 999999},
+        {'user_id': 999999, 'book_id': book.id},
+    ]})
+    assert response.status_code == 200
+    assert [item['status'] for item in response.get_json()['results']] == [
+        'borrowed', 'book_not_found', 'user_not_found']
+    db.session.expire_all()
+    assert db.session.get(Book, book.id).available_quantity == 2
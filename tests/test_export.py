@@ -0,0 +1,36 @@
+# tests/test_export.py
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from app.models.borrow import BorrowStatus
+
+
+def test_borrow_records_export_filters_by_date(client, db, library, monkeypatch):
+    # Small batches, so the response arrives in several chunks
+    monkeypatch.setattr('app.exporter.EXPORT_BATCH_SIZE', 2)
+    cutoff = (datetime.utcnow() - timedelta(days=10)).strftime('%Y-%m-%d')
+
+    response = client.get(f'/export/borrow_records.ndjson?since={cutoff}')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'attachment; filename="borrow_records-' in response.headers['Content-Disposition']
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # Only the loan each user took out three days ago
+    assert len(rows) == len(library['users'])
+    assert {row['status'] for row in rows} == {BorrowStatus.BORROWED.value}
+    assert all(row['borrow_date'] >= cutoff for row in rows)
+    assert rows == sorted(rows, key=lambda row: row['id'])
+
+    response = client.get(f'/export/borrow_records.csv?until={cutoff}')
+    reader = csv.DictReader(io.StringIO(response.get_data(as_text=True)))
+    assert reader.fieldnames[:3] == ['id', 'book_id', 'book_isbn']
+    assert len(list(reader)) == 2 * len(library['users'])
+
+
+def test_export_rejects_bad_requests(client, db):
+    assert client.get('/export/borrow_records.csv?since=01/02/2024').status_code == 400
+    assert client.get('/export/passwords.csv').status_code == 404
+    assert client.get('/export/books.xml').status_code == 404
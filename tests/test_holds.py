@@ -0,0 +1,121 @@
+# tests/test_holds.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.loans import (HoldError, checkout, expire_holds, place_hold, remove_user, return_loan,
+                       update_stock)
+from app.models.book import Book
+from app.models.hold import Hold, HoldStatus
+from app.models.user import User, UserType
+
+LOAN = timedelta(days=14)
+
+
+@pytest.fixture
+def single_copy(db):
+    """A book with one copy and four users: two students, one faculty, one staff."""
+    book = Book(isbn='9780000000200', title='Single Copy', author='Author', publication_year=2020,
+                quantity=1, available_quantity=1)
+    users = [User(first_name=f'Hold{number}', last_name='User', email=f'hold{number}@example.com',
+                  user_type=user_type)
+             for number, user_type in enumerate((UserType.STUDENT, UserType.STUDENT,
+                                                 UserType.FACULTY, UserType.STAFF))]
+    db.session.add_all([book] + users)
+    db.session.commit()
+    return book.id, [user.id for user in users]
+
+
+def status(db, hold_id):
+    db.session.expire_all()
+    return db.session.get(Hold, hold_id).status
+
+
+def available(db, book_id):
+    db.session.expire_all()
+    return db.session.get(Book, book_id).available_quantity
+
+
+def test_hold_queue_round_trip(db, single_copy):
+    book_id, (lender, student, faculty, _) = single_copy
+    loan = checkout(book_id, lender, LOAN)
+    student_hold = place_hold(book_id, student).id
+    faculty_hold = place_hold(book_id, faculty).id
+
+    # Faculty go first, whoever asked earlier
+    _, _, readied = return_loan(loan.id)
+    assert readied.id == faculty_hold
+    assert status(db, faculty_hold) == HoldStatus.READY
+    assert status(db, student_hold) == HoldStatus.WAITING
+    assert available(db, book_id) == 0
+
+    # The kept-aside copy is lent without touching the shelf
+    second_loan = checkout(book_id, faculty, LOAN)
+    assert status(db, faculty_hold) == HoldStatus.FULFILLED
+    assert available(db, book_id) == 0
+
+    return_loan(second_loan.id)
+    assert status(db, student_hold) == HoldStatus.READY
+
+    # Not picked up in time: nobody else waits, so the copy goes back on the shelf
+    expired, passed_on = expire_holds(now=datetime.utcnow() + timedelta(days=30))
+    assert (expired, passed_on) == (1, 0)
+    assert status(db, student_hold) == HoldStatus.EXPIRED
+    assert available(db, book_id) == 1
+
+
+def test_expired_hold_passes_copy_to_next_in_line(db, single_copy):
+    book_id, (lender, student, faculty, _) = single_copy
+    loan = checkout(book_id, lender, LOAN)
+    faculty_hold = place_hold(book_id, faculty).id
+    student_hold = place_hold(book_id, student).id
+    return_loan(loan.id)
+
+    assert expire_holds(now=datetime.utcnow() + timedelta(days=30)) == (1, 1)
+    assert status(db, faculty_hold) == HoldStatus.EXPIRED
+    assert status(db, student_hold) == HoldStatus.READY
+    assert available(db, book_id) == 0
+
+
+def test_hold_refused_while_a_copy_is_on_the_shelf(db, single_copy):
+    book_id, (_, student, _, _) = single_copy
+    with pytest.raises(HoldError):
+        place_hold(book_id, student)
+
+
+def test_added_copies_go_to_waiting_holds(db, single_copy):
+    book_id, (lender, student, faculty, _) = single_copy
+    checkout(book_id, lender, LOAN)
+    student_hold = place_hold(book_id, student).id
+
+    readied = update_stock(book_id, 3)
+    assert [hold.id for hold in readied] == [student_hold]
+    assert available(db, book_id) == 1
+
+
+def test_checkout_closes_a_waiting_hold(db, single_copy):
+    book_id, (lender, student, _, _) = single_copy
+    checkout(book_id, lender, LOAN)
+    student_hold = place_hold(book_id, student).id
+    # A copy on the shelf despite the queue, as stock edited before holds
+    # were passed on could leave it
+    db.session.execute(db.update(Book).where(Book.id == book_id)
+                       .values(quantity=2, available_quantity=1))
+    db.session.commit()
+
+    checkout(book_id, student, LOAN)
+    assert status(db, student_hold) == HoldStatus.FULFILLED
+    assert available(db, book_id) == 0
+
+
+def test_removed_user_passes_their_copy_on(db, single_copy):
+    book_id, (lender, student, faculty, _) = single_copy
+    loan = checkout(book_id, lender, LOAN)
+    place_hold(book_id, faculty)
+    student_hold = place_hold(book_id, student).id
+    return_loan(loan.id)
+
+    remove_user(faculty)
+    assert db.session.get(User, faculty) is None
+    assert status(db, student_hold) == HoldStatus.READY
+    assert available(db, book_id) == 0
@@ -0,0 +1,82 @@
+# tests/test_importer.py
+import io
+import json
+
+from app.importer import import_books, import_users
+from app.models.book import Book
+from app.models.user import User, UserType
+
+
+def ndjson(*records):
+    lines = [record if isinstance(record, str) else json.dumps(record) for record in records]
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+def test_csv_books_import_rejects_bad_rows(db):
+    stream = io.BytesIO(
+        b'isbn,title,author,publisher,publication_year,quantity\n'
+        b'978-0-306-40615-7,Good Book,Author,Press,2001,4\n'
+        b'9780306406158,Bad Checksum,Author,Press,2001,1\n'
+        b'9780000000002,Half Copy,Author,Press,2001,3.5\n'
+        b'9780000000002,,Author,Press,2001,1\n'
+        b'9780000000002,Future,Author,Press,3001,1\n'
+    )
+    report = import_books(stream, 'csv')
+
+    assert (report.processed, report.written, report.rejected) == (5, 1, 4)
+    # Line numbers count the header
+    assert [line for line, _ in report.errors] == [3, 4, 5, 6]
+    assert 'quantity must be a whole number' in report.errors[1][1]
+    assert report.errors[2][1] == 'Missing title'
+    book = db.session.query(Book).filter_by(isbn='9780306406157').one()
+    assert (book.quantity, book.available_quantity) == (4, 4)
+
+
+def test_ndjson_books_import_rejects_floats_and_non_objects(db):
+    report = import_books(ndjson(
+        {'isbn': '9780306406157', 'title': 'Good Book', 'author': 'Author',
+         'publication_year': 2001, 'quantity': 2},
+        {'isbn': '9780000000002', 'title': 'Float', 'author': 'Author',
+         'publication_year': 2001, 'quantity': 3.5},
+        {'isbn': '9780000000002', 'title': 'Bool', 'author': 'Author',
+         'publication_year': True},
+        '[1, 2]',
+        '{not json',
+        {'isbn': '9780000000002', 'title': 'x' * 1000, 'author': 'Author',
+         'publication_year': 2001},
+    ), 'ndjson')
+
+    assert (report.processed, report.written, report.rejected) == (6, 1, 5)
+    assert [line for line, _ in report.errors] == [2, 3, 4, 5, 6]
+    assert report.errors[0][1] == 'quantity must be a whole number, got 3.5'
+    assert report.errors[2][1] == 'Expected a JSON object, got list'
+    assert report.errors[3][1].startswith('Invalid JSON')
+    assert 'longer than' in report.errors[4][1]
+    assert db.session.query(Book).filter_by(isbn='9780000000002').count() == 0
+
+
+def test_reimport_updates_details_but_not_stock(db):
+    record = {'isbn': '9780306406157', 'title': 'First Title', 'author': 'Author',
+              'publication_year': 2001, 'quantity': 2}
+    import_books(ndjson(record), 'ndjson')
+    record.update(title='Second Title', quantity=9)
+    assert import_books(ndjson(record), 'ndjson').written == 1
+
+    book = db.session.query(Book).filter_by(isbn='9780306406157').one()
+    db.session.refresh(book)
+    assert (book.title, book.quantity) == ('Second Title', 2)
+
+
+def test_users_import_sets_the_borrow_limit(db):
+    stream = io.BytesIO(
+        b'email,first_name,last_name,phone,user_type\n'
+        b'ann@example.com,Ann,Reader,,faculty\n'
+        b'not-an-email,Bob,Reader,,student\n'
+        b'cy@example.com,Cy,Reader,,visitor\n'
+    )
+    report = import_users(stream, 'csv')
+
+    assert (report.written, report.rejected) == (1, 2)
+    user = db.session.query(User).filter_by(email='ann@example.com').one()
+    assert user.user_type == UserType.FACULTY
+    assert user.max_borrow_limit == 5
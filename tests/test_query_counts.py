@@ -0,0 +1,51 @@
+# tests/test_query_counts.py
+"""Statements per request for the list views, which must not grow with the rows shown."""
+
+from app.cache import cache
+
+
+def test_overdue_borrows_list(client, library, record_queries):
+    with record_queries() as queries:
+        response = client.get('/borrows/?status=OVERDUE')
+    assert response.status_code == 200
+    assert response.data.count(b'Book 4') == 1
+    assert queries.count == 1
+
+
+def test_borrows_list_for_one_user(client, library, record_queries):
+    user_id = library['users'][0].id
+    with record_queries() as queries:
+        response = client.get(f'/borrows/?user_id={user_id}')
+    assert response.status_code == 200
+    assert response.data.count(b'Book 0') == 3
+    assert queries.count == 1
+
+
+def test_users_list(client, library, record_queries):
+    with record_queries() as queries:
+        response = client.get('/users/')
+    assert response.status_code == 200
+    assert b'user4@example.com' in response.data
+    assert queries.count == 2
+
+
+def test_recent_activity_widget(client, library, record_queries):
+    with record_queries() as queries:
+        response = client.get('/dashboard/widgets/recent-activity')
+    assert response.status_code == 200
+    assert len(response.get_json()) == 10
+    assert queries.count == 2
+
+
+def test_books_list_stats_survive_loans(app, client, library, record_queries):
+    app.config['CACHE_TYPE'] = 'lru'
+    cache.init_app(app)
+    client.get('/books/')
+    client.post('/borrows/add', data={'book_id': library['books'][0].id,
+                                      'user_id': library['users'][0].id})
+
+    with record_queries() as queries:
+        response = client.get('/books/')
+    assert response.status_code == 200
+    # The page of books only; the totals are still cached
+    assert queries.count == 1
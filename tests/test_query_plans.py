@@ -0,0 +1,58 @@
+# tests/test_query_plans.py
+"""EXPLAIN the SQL the views and jobs really send; none may read a table in full."""
+import pytest
+
+from app.models.book import Book
+from app.models.borrow import BorrowRecord
+from app.models.hold import Hold
+from benchmarks.explain_hot_queries import HOT_PAGES, explain, explainable, full_scans
+
+
+def assert_index_served(db, statements):
+    connection = db.session.connection()
+    checked = 0
+    for sql, parameters in statements:
+        if not explainable(sql):
+            continue
+        plan = explain(connection, sql, parameters)
+        checked += 1
+        assert not full_scans(connection.dialect.name, plan), \
+            f"{' '.join(sql.split())}\n" + '\n'.join(str(tuple(row)) for row in plan)
+    assert checked
+
+
+@pytest.mark.parametrize('path', HOT_PAGES.values(), ids=list(HOT_PAGES))
+def test_hot_page(client, db, library, record_queries, path):
+    with record_queries() as queries:
+        response = client.get(path)
+    assert response.status_code == 200
+    assert_index_served(db, queries.statements)
+
+
+def test_checkout_hold_and_return(client, db, library, record_queries):
+    book = Book(isbn='9780000000100', title='Only Copy', author='Author', publication_year=2020,
+                quantity=1, available_quantity=1)
+    db.session.add(book)
+    db.session.commit()
+    first, second = library['users'][:2]
+
+    with record_queries() as checkout:
+        client.post('/borrows/add', data={'book_id': book.id, 'user_id': first.id})
+        client.post(f'/holds/place?book_id={book.id}&user_id={second.id}')
+    borrow_id = db.session.query(BorrowRecord.id).filter_by(book_id=book.id).scalar()
+    with record_queries() as handover:
+        client.post(f'/borrows/return/{borrow_id}')
+        # Picks up the copy kept aside for the hold
+        client.post('/borrows/add', data={'book_id': book.id, 'user_id': second.id})
+
+    assert db.session.query(BorrowRecord).filter_by(book_id=book.id).count() == 2
+    assert db.session.query(Hold).filter_by(book_id=book.id).count() == 1
+    assert_index_served(db, checkout.statements + handover.statements)
+
+
+def test_scheduled_jobs(app, db, library, record_queries):
+    runner = app.test_cli_runner()
+    with record_queries() as queries:
+        assert 'Marked 5 borrow records' in runner.invoke(args=['sweep-overdue']).output
+        assert 'Expired 0 holds' in runner.invoke(args=['sweep-holds']).output
+    assert_index_served(db, queries.statements)
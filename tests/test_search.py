@@ -0,0 +1,62 @@
+# tests/test_search.py
+from app.models.book import Book
+from app.search import InvertedIndex, book_index
+
+
+def titles(client, query):
+    response = client.get('/books/search', query_string={'q': query})
+    assert response.status_code == 200
+    return [result['title'] for result in response.get_json()['results']]
+
+
+def test_ranking_prefers_fields_and_whole_words():
+    index = InvertedIndex()
+    for book_id, (title, author, publisher) in enumerate([
+        ('Gardens of the Moon', 'Steven Erikson', 'Tor'),
+        ('Moonraker', 'Ian Fleming', 'Cape'),
+        ('Night Watch', 'Terry Moon', 'Gollancz'),
+        ('Dust', 'Hugh Howey', 'Moon Press'),
+    ], start=1):
+        index.add(Book(id=book_id, isbn=f'978000000000{book_id}', title=title, author=author,
+                       publisher=publisher))
+
+    # A whole title word first; a title prefix ties with a whole author word
+    assert index.search('moon') == [(1, 4.5), (2, 3.0), (3, 3.0), (4, 1.5)]
+    assert index.search('9780000000003') == [(3, 5.0 * 1.5)]
+    # Every token must match
+    assert [book_id for book_id, _ in index.search('moon gardens')] == [1]
+    assert index.search('moon zebra') == []
+
+
+def test_prefix_matching():
+    index = InvertedIndex()
+    index.add(Book(id=1, isbn='9780000000001', title='The Hobbit', author='J. R. R. Tolkien'))
+    index.add(Book(id=2, isbn='9780000000002', title='Tolstoy Stories', author='Leo Tolstoy'))
+
+    assert [book_id for book_id, _ in index.search('tol')] == [2, 1]
+    assert [book_id for book_id, _ in index.search('tolk')] == [1]
+    assert [book_id for book_id, _ in index.search('hob tol')] == [1]
+    # Tokens shorter than MIN_PREFIX_LENGTH only match whole words
+    assert index.search('to') == []
+    assert [book_id for book_id, _ in index.search('r')] == [1]
+
+
+def test_index_follows_added_edited_and_deleted_books(app, client, db, library):
+    assert titles(client, 'book') == [f'Book {number}' for number in range(5)]
+    assert book_index().loaded
+
+    client.post('/books/add', data={'isbn': '9780306406157', 'title': 'Quiet Harbour',
+                                    'author': 'Author', 'publisher': '',
+                                    'publication_year': '2001', 'quantity': '1'})
+    assert titles(client, 'harb') == ['Quiet Harbour']
+
+    book = db.session.query(Book).filter_by(isbn='9780306406157').one()
+    client.post(f'/books/edit/{book.id}', data={'title': 'Loud Harbour', 'author': 'Author',
+                                                'publisher': '', 'publication_year': '2001',
+                                                'quantity': '1'})
+    assert titles(client, 'harbour') == ['Loud Harbour']
+    assert titles(client, 'quiet') == []
+
+    client.get(f'/books/delete/{book.id}')
+    assert titles(client, 'harbour') == []
+